@@ -0,0 +1,206 @@
+"""
+Async counterparts of the API helpers, used to fan out independent calls with asyncio.gather
+
+The calls are made by the synchronous helpers in worker threads, which share the instance's pooled HTTP
+session. The number of concurrent calls and their rate are limited per instance.
+
+Notes:
+------
+Playwright's sync API keeps an event loop running in the main thread, so tasks cannot use asyncio.run.
+Use run_sync or gather_sync to run coroutines from synchronous code (e.g., in setup_goal or validate).
+
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+import weakref
+
+from typing import Any, Callable, Coroutine, Optional
+
+from ..config import SNOW_API_MAX_CALLS_PER_SECOND, SNOW_API_MAX_CONCURRENCY
+from ..instance import SNowInstance
+from . import change_request, computer_asset, expense_line, incident, problem, report, user, utils
+
+
+class _RateLimiter:
+    """
+    Thread-safe limiter that spaces out calls to at most max_calls_per_second
+
+    """
+
+    def __init__(self, max_calls_per_second: float) -> None:
+        self.interval = 1.0 / max_calls_per_second
+        self.next_call_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            delay = max(0.0, self.next_call_time - now)
+            self.next_call_time = max(now, self.next_call_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Per-instance limits, indexed by instance URL
+_LIMITS = {}
+_RATE_LIMITERS = {}
+_LIMITS_LOCK = threading.Lock()
+# Concurrency semaphores, indexed by event loop and instance URL (asyncio primitives are bound to a loop)
+_SEMAPHORES = weakref.WeakKeyDictionary()
+
+
+def set_instance_limits(
+    snow_url: str,
+    max_concurrency: int = SNOW_API_MAX_CONCURRENCY,
+    max_calls_per_second: Optional[float] = SNOW_API_MAX_CALLS_PER_SECOND,
+) -> None:
+    """
+    Set the limits on concurrent API calls made to an instance through the async API
+
+    Parameters:
+    -----------
+    snow_url: str
+        The URL of the ServiceNow instance
+    max_concurrency: int
+        The maximum number of calls in flight at the same time (per event loop)
+    max_calls_per_second: float
+        The maximum number of calls started per second (across all event loops). None for no limit.
+
+    """
+    snow_url = snow_url.rstrip("/")
+    with _LIMITS_LOCK:
+        _LIMITS[snow_url] = (max_concurrency, max_calls_per_second)
+        _RATE_LIMITERS.pop(snow_url, None)
+        for semaphores in _SEMAPHORES.values():
+            semaphores.pop(snow_url, None)
+
+
+def _get_limits(snow_url: str) -> tuple:
+    return _LIMITS.get(snow_url, (SNOW_API_MAX_CONCURRENCY, SNOW_API_MAX_CALLS_PER_SECOND))
+
+
+def _get_semaphore(snow_url: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    with _LIMITS_LOCK:
+        semaphores = _SEMAPHORES.setdefault(loop, {})
+        if snow_url not in semaphores:
+            semaphores[snow_url] = asyncio.Semaphore(_get_limits(snow_url)[0])
+        return semaphores[snow_url]
+
+
+def _get_rate_limiter(snow_url: str) -> Optional[_RateLimiter]:
+    with _LIMITS_LOCK:
+        max_calls_per_second = _get_limits(snow_url)[1]
+        if not max_calls_per_second:
+            return None
+        if snow_url not in _RATE_LIMITERS:
+            _RATE_LIMITERS[snow_url] = _RateLimiter(max_calls_per_second)
+        return _RATE_LIMITERS[snow_url]
+
+
+def _call_rate_limited(func: Callable, instance: SNowInstance, *args, **kwargs) -> Any:
+    rate_limiter = _get_rate_limiter(instance.snow_url)
+    if rate_limiter is not None:
+        rate_limiter.wait()
+    return func(instance, *args, **kwargs)
+
+
+async def call_async(func: Callable, instance: SNowInstance, *args, **kwargs) -> Any:
+    """
+    Call a synchronous API helper in a worker thread, subject to the instance's limits
+
+    Parameters:
+    -----------
+    func: Callable
+        The helper to call. Its first argument must be the instance.
+    instance: SNowInstance
+        The ServiceNow instance to interact with
+    *args, **kwargs:
+        The other arguments of the helper
+
+    Returns:
+    --------
+    The value returned by the helper
+
+    """
+    async with _get_semaphore(instance.snow_url):
+        return await asyncio.to_thread(_call_rate_limited, func, instance, *args, **kwargs)
+
+
+def to_async(func: Callable) -> Callable[..., Coroutine]:
+    """
+    Make an async counterpart of a synchronous API helper whose first argument is the instance
+
+    """
+
+    @functools.wraps(func)
+    async def async_func(instance: SNowInstance, *args, **kwargs):
+        return await call_async(func, instance, *args, **kwargs)
+
+    return async_func
+
+
+# Background event loop used to run coroutines from threads that already run an event loop
+_BACKGROUND_LOOP = None
+_BACKGROUND_LOOP_LOCK = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    global _BACKGROUND_LOOP
+    with _BACKGROUND_LOOP_LOCK:
+        # The loop's thread does not survive a fork
+        if _BACKGROUND_LOOP is None or _BACKGROUND_LOOP[0] != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, daemon=True).start()
+            _BACKGROUND_LOOP = (os.getpid(), loop)
+        return _BACKGROUND_LOOP[1]
+
+
+def run_sync(coroutine: Coroutine) -> Any:
+    """
+    Run a coroutine to completion from synchronous code and return its result
+
+    Works even if an event loop is already running in the current thread (e.g., Playwright's sync API),
+    in which case the coroutine is run in a background event loop.
+
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_background_loop()).result()
+
+
+def gather_sync(*coroutines: Coroutine) -> list:
+    """
+    Run coroutines concurrently from synchronous code and return their results in order
+
+    Example:
+    --------
+    records = gather_sync(*[table_api_call(instance, table=f"incident/{s}") for s in sys_ids])
+
+    """
+
+    async def _gather():
+        return await asyncio.gather(*coroutines)
+
+    return run_sync(_gather())
+
+
+# Async counterparts of the core helpers
+table_api_call = to_async(utils.table_api_call)
+table_column_info = to_async(utils.table_column_info)
+db_delete_from_table = to_async(utils.db_delete_from_table)
+
+# Async counterparts of the record creation helpers
+create_change_request = to_async(change_request.create_change_request)
+create_computer_asset = to_async(computer_asset.create_computer_asset)
+create_expense_line = to_async(expense_line.create_expense_line)
+create_incident = to_async(incident.create_incident)
+create_problem = to_async(problem.create_problem)
+create_report = to_async(report.create_report)
+create_user = to_async(user.create_user)
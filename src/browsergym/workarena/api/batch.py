@@ -0,0 +1,217 @@
+"""
+API to group many Table API calls into a single call to the ServiceNow Batch API
+
+"""
+
+import base64
+import json
+
+from requests.exceptions import HTTPError
+from urllib.parse import urlencode
+
+from ..config import SNOW_API_BATCH_SIZE
+from ..instance import SNowInstance
+from .utils import SNOW_API_HEADERS
+
+
+def _encode_body(body: dict) -> str:
+    return base64.b64encode(json.dumps(body).encode("utf-8")).decode("utf-8")
+
+
+def _decode_body(body: str):
+    if not body:
+        return None
+    return json.loads(base64.b64decode(body).decode("utf-8"))
+
+
+def batch_api_call(
+    instance: SNowInstance,
+    requests: list[dict],
+    batch_size: int = SNOW_API_BATCH_SIZE,
+    raise_on_error: bool = True,
+) -> list[dict]:
+    """
+    Make many calls to the ServiceNow Table API using as few calls to the Batch API as possible
+
+    Parameters:
+    -----------
+    instance: SNowInstance
+        The ServiceNow instance to interact with
+    requests: list[dict]
+        The Table API calls to make. Each call is a dict with keys "table" (e.g., "incident" or
+        "incident/<sys_id>"), "method" (default: "GET"), "params" (optional) and "json" (optional).
+    batch_size: int
+        The maximum number of calls sent in a single call to the Batch API
+    raise_on_error: bool
+        If True, will raise an exception if any of the calls failed or was not serviced.
+
+    Returns:
+    --------
+    list[dict]
+        The outcome of each call, in the same order as requests. Each outcome is a dict with keys
+        "status_code" (None if the call was not serviced) and "result" (the decoded "result" of the
+        call's JSON response, None if there is none).
+
+    """
+    outcomes = []
+    for start in range(0, len(requests), batch_size):
+        chunk = requests[start : start + batch_size]
+
+        rest_requests = []
+        for i, request in enumerate(chunk):
+            url = f"/api/now/table/{request['table']}"
+            if request.get("params"):
+                url += "?" + urlencode(request["params"])
+            rest_request = {
+                "id": str(i),
+                "headers": [{"name": k, "value": v} for k, v in SNOW_API_HEADERS.items()],
+                "url": url,
+                "method": request.get("method", "GET"),
+            }
+            if request.get("json") is not None:
+                rest_request["body"] = _encode_body(request["json"])
+            rest_requests.append(rest_request)
+
+        response = instance.session.post(
+            url=instance.snow_url + "/api/now/v1/batch",
+            auth=instance.snow_credentials,
+            headers=SNOW_API_HEADERS,
+            json={"batch_request_id": str(start), "rest_requests": rest_requests},
+        )
+        response.raise_for_status()
+        response = response.json()
+
+        # Serviced requests are not guaranteed to be returned in the order they were sent
+        serviced = {r["id"]: r for r in response.get("serviced_requests", [])}
+        for i in range(len(chunk)):
+            serviced_request = serviced.get(str(i))
+            if serviced_request is None:
+                outcomes.append({"status_code": None, "result": None})
+                continue
+
+            body = _decode_body(serviced_request.get("body"))
+            outcomes.append(
+                {
+                    "status_code": serviced_request["status_code"],
+                    "result": body.get("result") if isinstance(body, dict) else None,
+                }
+            )
+
+    if raise_on_error:
+        failed = [
+            (request, outcome)
+            for request, outcome in zip(requests, outcomes)
+            if outcome["status_code"] is None or outcome["status_code"] >= 400
+        ]
+        if failed:
+            request, outcome = failed[0]
+            raise HTTPError(
+                f"{len(failed)} of {len(requests)} batched calls failed. First failure: "
+                f"{request.get('method', 'GET')} {request['table']} (status: {outcome['status_code']})"
+            )
+
+    return outcomes
+
+
+def batch_create_records(
+    instance: SNowInstance,
+    table: str,
+    records: list[dict],
+    params: dict = {},
+    batch_size: int = SNOW_API_BATCH_SIZE,
+) -> list[dict]:
+    """
+    Create many records in a ServiceNow table using the Batch API
+
+    Parameters:
+    -----------
+    instance: SNowInstance
+        The ServiceNow instance to interact with
+    table: str
+        The name of the table to create the records in
+    records: list[dict]
+        The records to create
+    params: dict
+        The parameters to pass to the Table API for each record (e.g., sysparm_input_display_value)
+
+    Returns:
+    --------
+    list[dict]
+        The created records, in the same order as records
+
+    """
+    outcomes = batch_api_call(
+        instance=instance,
+        requests=[
+            {"table": table, "method": "POST", "params": params, "json": record}
+            for record in records
+        ],
+        batch_size=batch_size,
+    )
+    return [outcome["result"] for outcome in outcomes]
+
+
+def batch_update_records(
+    instance: SNowInstance,
+    table: str,
+    updates: dict[str, dict],
+    params: dict = {},
+    batch_size: int = SNOW_API_BATCH_SIZE,
+) -> list[dict]:
+    """
+    Update many records of a ServiceNow table using the Batch API
+
+    Parameters:
+    -----------
+    instance: SNowInstance
+        The ServiceNow instance to interact with
+    table: str
+        The name of the table that contains the records
+    updates: dict[str, dict]
+        The fields to update for each record, indexed by the sys_id of the record
+
+    Returns:
+    --------
+    list[dict]
+        The updated records, in the same order as updates
+
+    """
+    outcomes = batch_api_call(
+        instance=instance,
+        requests=[
+            {"table": f"{table}/{sys_id}", "method": "PATCH", "params": params, "json": fields}
+            for sys_id, fields in updates.items()
+        ],
+        batch_size=batch_size,
+    )
+    return [outcome["result"] for outcome in outcomes]
+
+
+def batch_delete_records(
+    instance: SNowInstance,
+    table: str,
+    sys_ids: list[str],
+    batch_size: int = SNOW_API_BATCH_SIZE,
+    raise_on_error: bool = True,
+) -> None:
+    """
+    Delete many records from a ServiceNow table using the Batch API
+
+    Parameters:
+    -----------
+    instance: SNowInstance
+        The ServiceNow instance to interact with
+    table: str
+        The name of the table to delete from
+    sys_ids: list[str]
+        The sys_ids of the records to delete
+    raise_on_error: bool
+        If False, ignore records that could not be deleted (e.g., already deleted)
+
+    """
+    batch_api_call(
+        instance=instance,
+        requests=[{"table": f"{table}/{sys_id}", "method": "DELETE"} for sys_id in sys_ids],
+        batch_size=batch_size,
+        raise_on_error=raise_on_error,
+    )
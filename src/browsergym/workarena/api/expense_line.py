@@ -5,12 +5,52 @@ from faker import Faker
 
 fake = Faker()
 
+from .batch import batch_create_records
 from .cost_center import get_cost_center_sysid
 from .utils import table_api_call
 
 from ..instance import SNowInstance
 
 
+def _get_engineering_cost_center_sysid(instance: SNowInstance) -> str:
+    # sys_id of the engineering cost center
+    return table_api_call(
+        instance=instance,
+        table="cmn_cost_center",
+        params={"sysparm_query": "name=Engineering"},
+    )["result"][0]["sys_id"]
+
+
+def _get_expense_line_config(
+    amount: float,
+    number: str,
+    date: str,
+    short_description: str = None,
+    expense_hashtag: str = "",
+    task_sys_id: str = None,
+    cost_center_sys_id: str = None,
+    summary_type: str = "run_business",
+    user_sys_id: str = None,
+) -> dict:
+    if short_description is None:
+        short_description = fake.sentence(4)
+
+    return {
+        "date": date,
+        "base_expense": "",
+        "short_description": short_description + " " + expense_hashtag,
+        "summary_type": summary_type,
+        "summary_type": "run_business",
+        "type": "one-time",
+        "number": f"{number}",
+        "task": f"{task_sys_id}",
+        "state": "processed",
+        "amount": f"{amount}",
+        "cost_center": f"{cost_center_sys_id}",
+        "user": f"{user_sys_id}",
+    }
+
+
 def create_expense_line(
     instance: SNowInstance,
     amount: float,
@@ -54,30 +94,19 @@ def create_expense_line(
         The number of the created expense_line
     """
     if cost_center_sys_id is None:
-        # sys_id of the engineering cost center
-        cost_center_sys_id = table_api_call(
-            instance=instance,
-            table="cmn_cost_center",
-            params={"sysparm_query": "name=Engineering"},
-        )["result"][0]["sys_id"]
-
-    if short_description is None:
-        short_description = fake.sentence(4)
+        cost_center_sys_id = _get_engineering_cost_center_sysid(instance)
 
-    expense_cfg = {
-        "date": date,
-        "base_expense": "",
-        "short_description": short_description + " " + expense_hashtag,
-        "summary_type": summary_type,
-        "summary_type": "run_business",
-        "type": "one-time",
-        "number": f"{number}",
-        "task": f"{task_sys_id}",
-        "state": "processed",
-        "amount": f"{amount}",
-        "cost_center": f"{cost_center_sys_id}",
-        "user": f"{user_sys_id}",
-    }
+    expense_cfg = _get_expense_line_config(
+        amount=amount,
+        number=number,
+        date=date,
+        short_description=short_description,
+        expense_hashtag=expense_hashtag,
+        task_sys_id=task_sys_id,
+        cost_center_sys_id=cost_center_sys_id,
+        summary_type=summary_type,
+        user_sys_id=user_sys_id,
+    )
 
     result = table_api_call(
         instance=instance,
@@ -87,3 +116,34 @@ def create_expense_line(
     )["result"]
 
     return result["sys_id"], result["number"]
+
+
+def create_expense_lines(
+    instance: SNowInstance, expense_lines: list[dict]
+) -> list[tuple[str, str]]:
+    """Create many expense lines at once using the Batch API
+    Args:
+    --------
+    instance (SNowInstance):
+        The instance to create the expense lines in
+    expense_lines (list[dict]):
+        The keyword arguments of create_expense_line (except instance) for each expense line
+    Returns:
+    --------
+    list[tuple[str, str]]:
+        The sys_id and number of each created expense line, in the same order as expense_lines
+    """
+    # Only look up the default cost center once for all expense lines
+    if any(line.get("cost_center_sys_id") is None for line in expense_lines):
+        default_cost_center_sys_id = _get_engineering_cost_center_sysid(instance)
+
+    expense_cfgs = []
+    for line in expense_lines:
+        line = dict(line)
+        if line.get("cost_center_sys_id") is None:
+            line["cost_center_sys_id"] = default_cost_center_sys_id
+        expense_cfgs.append(_get_expense_line_config(**line))
+
+    results = batch_create_records(instance=instance, table="fm_expense_line", records=expense_cfgs)
+
+    return [(result["sys_id"], result["number"]) for result in results]
@@ -3,11 +3,11 @@ from ..instance import SNowInstance
 
 fake = Faker()
 
+from .batch import batch_create_records
 from .utils import table_api_call
 
 
-def create_incident(
-    instance: SNowInstance,
+def _get_incident_config(
     incident_number: int,
     caller_sys_id: str,
     category: str,
@@ -16,7 +16,7 @@ def create_incident(
     priority: int,
     incident_hastag: str = None,
     assigned_to: str = None,
-):
+) -> dict:
     incident_config = {
         "task_effective_number": incident_number,
         "number": incident_number,
@@ -35,6 +35,30 @@ def create_incident(
     }
     if assigned_to:
         incident_config["assigned_to"] = assigned_to
+    return incident_config
+
+
+def create_incident(
+    instance: SNowInstance,
+    incident_number: int,
+    caller_sys_id: str,
+    category: str,
+    impact: int,
+    urgency: int,
+    priority: int,
+    incident_hastag: str = None,
+    assigned_to: str = None,
+):
+    incident_config = _get_incident_config(
+        incident_number=incident_number,
+        caller_sys_id=caller_sys_id,
+        category=category,
+        impact=impact,
+        urgency=urgency,
+        priority=priority,
+        incident_hastag=incident_hastag,
+        assigned_to=assigned_to,
+    )
 
     incident_response = table_api_call(
         instance=instance,
@@ -43,3 +67,27 @@ def create_incident(
         method="POST",
     )["result"]
     return incident_response
+
+
+def create_incidents(instance: SNowInstance, incidents: list[dict]) -> list[dict]:
+    """
+    Create many incidents at once using the Batch API
+
+    Parameters:
+    -----------
+    instance: SNowInstance
+        The instance to create the incidents in
+    incidents: list[dict]
+        The keyword arguments of create_incident (except instance) for each incident
+
+    Returns:
+    --------
+    list[dict]
+        The created incidents, in the same order as incidents
+
+    """
+    return batch_create_records(
+        instance=instance,
+        table="incident",
+        records=[_get_incident_config(**incident) for incident in incidents],
+    )
@@ -0,0 +1,151 @@
+"""
+Resolution of references (sys_ids of records in other tables) to the values of the referenced records
+
+"""
+
+import threading
+
+from collections import OrderedDict
+from typing import Optional
+
+from ..config import SNOW_REFERENCE_CACHE_SIZE, SNOW_REFERENCE_QUERY_SIZE
+from ..instance import SNowInstance
+from .utils import table_api_call
+
+
+# Resolved references shared by all resolvers in the process, indexed by
+# (instance URL, table, field, display_value, sys_id)
+_SHARED_CACHE = OrderedDict()
+_SHARED_CACHE_LOCK = threading.Lock()
+
+
+def _get_shared(key: tuple):
+    with _SHARED_CACHE_LOCK:
+        if key in _SHARED_CACHE:
+            _SHARED_CACHE.move_to_end(key)
+            return _SHARED_CACHE[key]
+    return None
+
+
+def _set_shared(key: tuple, value: str) -> None:
+    with _SHARED_CACHE_LOCK:
+        _SHARED_CACHE[key] = value
+        _SHARED_CACHE.move_to_end(key)
+        while len(_SHARED_CACHE) > SNOW_REFERENCE_CACHE_SIZE:
+            _SHARED_CACHE.popitem(last=False)
+
+
+def clear_reference_cache() -> None:
+    """
+    Clear the references resolved by all resolvers in the process
+
+    """
+    with _SHARED_CACHE_LOCK:
+        _SHARED_CACHE.clear()
+
+
+class ReferenceResolver:
+    """
+    Resolves sys_ids of referenced records to the value of one of their fields (e.g., their display field)
+
+    All unresolved sys_ids of a table are fetched with a single "sys_idIN" query. Results are memoized by the
+    resolver (use one resolver per episode) and in an LRU cache shared by all resolvers of the process.
+
+    """
+
+    def __init__(self, instance: SNowInstance, use_shared_cache: bool = True) -> None:
+        """
+        Parameters:
+        -----------
+        instance: SNowInstance
+            The ServiceNow instance that contains the referenced records
+        use_shared_cache: bool
+            If True, also use the references resolved by other resolvers of the process
+
+        """
+        self.instance = instance
+        self.use_shared_cache = use_shared_cache
+        self._resolved = {}
+
+    def _key(self, table: str, field: str, display_value: bool, sys_id: str) -> tuple:
+        return (self.instance.snow_url, table, field, display_value, sys_id)
+
+    def resolve(
+        self, table: str, field: str, sys_ids: list[str], display_value: bool = True
+    ) -> dict[str, Optional[str]]:
+        """
+        Resolve sys_ids of records of a table to the value of one of their fields
+
+        Parameters:
+        -----------
+        table: str
+            The table that contains the referenced records
+        field: str
+            The field of the referenced records to return (e.g., the table's display field)
+        sys_ids: list[str]
+            The sys_ids of the referenced records
+        display_value: bool
+            If True, return the display value of the field. Otherwise, return its raw value.
+
+        Returns:
+        --------
+        dict
+            The value of the field for each sys_id (None for sys_ids that do not match any record)
+
+        """
+        values = {}
+        unresolved = []
+        for sys_id in dict.fromkeys(sys_ids):
+            key = self._key(table, field, display_value, sys_id)
+            value = self._resolved.get(key)
+            if value is None and self.use_shared_cache:
+                value = _get_shared(key)
+            if value is None:
+                unresolved.append(sys_id)
+            else:
+                self._resolved[key] = value
+                values[sys_id] = value
+
+        for start in range(0, len(unresolved), SNOW_REFERENCE_QUERY_SIZE):
+            chunk = unresolved[start : start + SNOW_REFERENCE_QUERY_SIZE]
+            records = table_api_call(
+                instance=self.instance,
+                table=table,
+                params={
+                    "sysparm_query": f"sys_idIN{','.join(chunk)}",
+                    "sysparm_fields": f"sys_id,{field}",
+                    "sysparm_display_value": "all",
+                },
+            )["result"]
+            for record in records:
+                sys_id = record["sys_id"]["value"]
+                value = record[field]["display_value" if display_value else "value"]
+                key = self._key(table, field, display_value, sys_id)
+                self._resolved[key] = value
+                if self.use_shared_cache:
+                    _set_shared(key, value)
+                values[sys_id] = value
+
+        return {sys_id: values.get(sys_id) for sys_id in sys_ids}
+
+    def resolve_many(
+        self, references: dict[tuple[str, str], list[str]], display_value: bool = True
+    ) -> dict[tuple[str, str], dict[str, Optional[str]]]:
+        """
+        Resolve references to many tables, with one query per table
+
+        Parameters:
+        -----------
+        references: dict
+            The sys_ids to resolve, indexed by (table, field)
+
+        Returns:
+        --------
+        dict
+            The value of the field for each sys_id, indexed by (table, field)
+
+        """
+        return {
+            (table, field): self.resolve(table, field, sys_ids, display_value=display_value)
+            for (table, field), sys_ids in references.items()
+        }
@@ -7,6 +7,7 @@ import json
 
 from collections import defaultdict
 
+from . import async_utils
 from .utils import SNowInstance, table_api_call, db_delete_from_table
 
 
@@ -22,14 +23,17 @@ def delete_request(instance: SNowInstance, sys_id: str) -> None:
     """
     # Delete all items
     for item in get_request_items(instance, sys_id):
-        # Delete all options for each item
-        for option in item["options"].values():
-            db_delete_from_table(
-                instance,
-                option["sys_ids"]["sc_item_option_mtom"],
-                "sc_item_option_mtom",
-            )
-            db_delete_from_table(instance, option["sys_ids"]["sc_item_option"], "sc_item_option")
+        # Delete all options for each item (concurrently, since they are independent)
+        async_utils.gather_sync(
+            *[
+                async_utils.db_delete_from_table(instance, option_sys_id, option_table)
+                for option in item["options"].values()
+                for option_table, option_sys_id in [
+                    ("sc_item_option_mtom", option["sys_ids"]["sc_item_option_mtom"]),
+                    ("sc_item_option", option["sys_ids"]["sc_item_option"]),
+                ]
+            ]
+        )
         db_delete_from_table(instance, item["sys_id"], "sc_req_item")
 
     # Delete the request
@@ -0,0 +1,282 @@
+"""
+Cache for table metadata (column information), which does not change once WorkArena is installed
+
+Entries are indexed by (instance URL, table, release), where the release is the instance's WorkArena
+installation date: it changes whenever the installer reconfigures the instance. The cache has an in-memory
+LRU tier and an optional on-disk JSON tier shared by all processes. Both tiers expire entries after a TTL.
+
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Optional
+
+from ..config import (
+    BENCHMARK_TABLES,
+    SNOW_METADATA_CACHE_DIR,
+    SNOW_METADATA_CACHE_SIZE,
+    SNOW_METADATA_CACHE_TTL,
+)
+from ..instance import SNowInstance
+
+
+class TableMetadataCache:
+    """
+    Two-tier (memory and disk) cache of table metadata
+
+    """
+
+    def __init__(
+        self,
+        max_size: int = SNOW_METADATA_CACHE_SIZE,
+        ttl: float = SNOW_METADATA_CACHE_TTL,
+        cache_dir: Optional[str] = SNOW_METADATA_CACHE_DIR,
+    ) -> None:
+        """
+        Parameters:
+        -----------
+        max_size: int
+            The maximum number of entries kept in memory
+        ttl: float
+            The number of seconds after which an entry expires
+        cache_dir: str
+            The directory of the on-disk tier. If None or empty, only the in-memory tier is used.
+
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_dir = cache_dir or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key: tuple) -> str:
+        return os.path.join(
+            self.cache_dir, hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest() + ".json"
+        )
+
+    def _is_expired(self, timestamp: float) -> bool:
+        return time.time() - timestamp > self.ttl
+
+    def get(self, key: tuple) -> Optional[dict]:
+        """
+        Get the metadata for a (instance URL, table, release) key, or None if it is not cached
+
+        """
+        with self._lock:
+            if key in self._entries:
+                timestamp, value = self._entries[key]
+                if not self._is_expired(timestamp):
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry["key"] != list(key) or self._is_expired(entry["timestamp"]):
+            return None
+
+        self._set_in_memory(key, entry["value"], entry["timestamp"])
+        return entry["value"]
+
+    def _set_in_memory(self, key: tuple, value: dict, timestamp: float) -> None:
+        with self._lock:
+            self._entries[key] = (timestamp, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def set(self, key: tuple, value: dict) -> None:
+        """
+        Cache the metadata for a (instance URL, table, release) key
+
+        """
+        timestamp = time.time()
+        self._set_in_memory(key, value, timestamp)
+
+        if self.cache_dir is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write atomically, since the directory can be shared by many processes
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"key": list(key), "timestamp": timestamp, "value": value}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not write table metadata to the on-disk cache: {e}")
+
+    def invalidate(self, snow_url: Optional[str] = None, table: Optional[str] = None) -> None:
+        """
+        Remove entries from both tiers of the cache
+
+        Parameters:
+        -----------
+        snow_url: str
+            Only remove the entries of this instance (default: all instances)
+        table: str
+            Only remove the entries of this table (default: all tables)
+
+        """
+
+        def matches(key):
+            return (snow_url is None or key[0] == snow_url.rstrip("/")) and (
+                table is None or key[1] == table
+            )
+
+        with self._lock:
+            for key in [k for k in self._entries if matches(k)]:
+                del self._entries[key]
+
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return
+        for filename in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    key = json.load(f)["key"]
+                if matches(key):
+                    os.remove(path)
+            except (OSError, ValueError, KeyError):
+                continue
+
+
+_CACHE = TableMetadataCache()
+
+# Release of each instance, indexed by URL (only read once per process)
+_RELEASES = {}
+_RELEASES_LOCK = threading.Lock()
+
+
+def get_table_metadata_cache() -> TableMetadataCache:
+    """
+    Get the table metadata cache shared by all callers in the process
+
+    """
+    return _CACHE
+
+
+def get_instance_release(instance: SNowInstance) -> str:
+    """
+    Get the release used to index the table metadata of an instance (its WorkArena installation date)
+
+    """
+    # XXX: Need to include the import here to avoid circular imports
+    from .utils import table_api_call
+
+    with _RELEASES_LOCK:
+        if instance.snow_url in _RELEASES:
+            return _RELEASES[instance.snow_url]
+
+    release = table_api_call(
+        instance=instance,
+        table="sys_properties",
+        params={"sysparm_query": "name=workarena.installation.date", "sysparm_fields": "value"},
+    )["result"]
+    release = release[0]["value"] if release else "unknown"
+
+    with _RELEASES_LOCK:
+        _RELEASES[instance.snow_url] = release
+    return release
+
+
+def invalidate_table_metadata(instance: Optional[SNowInstance] = None, table: Optional[str] = None):
+    """
+    Invalidate the cached table metadata
+
+    Parameters:
+    -----------
+    instance: SNowInstance
+        Only invalidate the metadata of this instance (default: all instances)
+    table: str
+        Only invalidate the metadata of this table (default: all tables)
+
+    """
+    with _RELEASES_LOCK:
+        if instance is None:
+            _RELEASES.clear()
+        elif table is None:
+            _RELEASES.pop(instance.snow_url, None)
+    _CACHE.invalidate(snow_url=instance.snow_url if instance else None, table=table)
+
+
+def warm_table_metadata(instance: SNowInstance, tables: list[str] = BENCHMARK_TABLES) -> None:
+    """
+    Fetch and cache the metadata of a list of tables
+
+    Parameters:
+    -----------
+    instance: SNowInstance
+        The ServiceNow instance to fetch the metadata from
+    tables: list[str]
+        The tables to fetch the metadata of (default: all tables used by the benchmark)
+
+    """
+    # XXX: Need to include the import here to avoid circular imports
+    from .utils import table_column_info
+
+    for table in tables:
+        logging.info(f"Caching metadata for table {table}...")
+        table_column_info(instance=instance, table=table)
+
+
+def main():
+    """
+    Entrypoint for the CLI command that pre-warms the table metadata cache
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Pre-warm the WorkArena table metadata cache for a ServiceNow instance."
+    )
+    parser.add_argument(
+        "--instance-url",
+        help="URL of the ServiceNow instance (default: SNOW_INSTANCE_URL or the instance pool).",
+    )
+    parser.add_argument(
+        "--instance-password",
+        help="Password of the admin user on the ServiceNow instance (required with --instance-url).",
+    )
+    parser.add_argument(
+        "--tables",
+        nargs="+",
+        default=BENCHMARK_TABLES,
+        help="Tables to cache (default: all tables used by the benchmark).",
+    )
+    parser.add_argument(
+        "--invalidate",
+        action="store_true",
+        help="Invalidate the cached metadata of the instance before fetching it again.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.instance_url:
+        instance = SNowInstance(
+            snow_url=args.instance_url, snow_credentials=("admin", args.instance_password)
+        )
+    else:
+        instance = SNowInstance()
+
+    if _CACHE.cache_dir is None:
+        logging.warning(
+            "The on-disk cache is disabled (WORKARENA_METADATA_CACHE_DIR is empty). "
+            "The metadata will not be available to other processes."
+        )
+
+    if args.invalidate:
+        invalidate_table_metadata(instance)
+    warm_table_metadata(instance, tables=args.tables)
+    logging.info(f"Cached metadata for {len(args.tables)} tables of {instance.snow_url}.")
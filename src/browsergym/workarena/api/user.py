@@ -5,6 +5,7 @@ import time
 fake = Faker()
 
 from ..instance import SNowInstance
+from .batch import batch_create_records
 from .ui_themes import get_workarena_theme_variants
 from .utils import table_api_call
 
@@ -84,6 +85,98 @@ def create_user(
     return user_name, user_password, user_sys_id
 
 
+def create_users(
+    instance: SNowInstance,
+    users: list[dict],
+    return_full_response: bool = False,
+    user_roles: list[str] = ["admin"],
+    random: np.random = np.random,
+) -> list:
+    """
+    Create many users at once using the Batch API (same behavior as calling create_user for each user)
+
+    Parameters:
+    -----------
+    users: list[dict]
+        The first_name, last_name and user_name of each user (all optional, see create_user)
+    user_roles: list[str]
+        The roles to assign to all the users, defaults to ['admin']
+
+    Returns:
+    --------
+    list of (username, password, sys_id), or of full user records if return_full_response is True
+
+    """
+    user_password = "aStrongPassword!"
+    themes = get_workarena_theme_variants(instance)
+
+    # Draw random values in the same order as successive calls to create_user
+    users_data = []
+    user_themes = []
+    for user in users:
+        user_idx = str(random.randint(1000, 9999))
+        first_name = user.get("first_name") or fake.first_name()
+        last_name = user.get("last_name") or fake.last_name()
+        users_data.append(
+            {
+                "user_name": user.get("user_name") or f"{first_name}.{last_name}.{user_idx}",
+                "first_name": first_name,
+                "last_name": last_name,
+                "email": f"{first_name}.{last_name}.{user_idx}@workarena.com".lower(),
+                "user_password": user_password,
+                "active": True,
+            }
+        )
+        user_themes.append(random.choice(themes))
+
+    # Create users
+    user_responses = batch_create_records(
+        instance=instance,
+        table="sys_user",
+        records=users_data,
+        params={"sysparm_input_display_value": True},
+    )
+
+    # Get role sys_id's
+    roles = table_api_call(
+        instance=instance,
+        table="sys_user_role",
+        params={"sysparm_query": f"nameIN{','.join(user_roles)}", "sysparm_fields": "name,sys_id"},
+        method="GET",
+    )["result"]
+    role_sys_ids = {role["name"]: role["sys_id"] for role in roles}
+
+    # Give permissions and set the UI theme of each user
+    batch_create_records(
+        instance=instance,
+        table="sys_user_has_role",
+        records=[
+            {"user": user["sys_id"], "role": role_sys_ids[role]}
+            for user in user_responses
+            for role in user_roles
+        ],
+    )
+    # The users were just created, so they have no preferences yet
+    batch_create_records(
+        instance=instance,
+        table="sys_user_preference",
+        records=[
+            {
+                "name": "glide.ui.polaris.theme.variant",
+                "value": theme["style.sys_id"],
+                "user": user["sys_id"],
+                "system": False,
+                "description": "Updated by WorkArena",
+            }
+            for user, theme in zip(user_responses, user_themes)
+        ],
+    )
+
+    if return_full_response:
+        return user_responses
+    return [(user["user_name"], user_password, user["sys_id"]) for user in user_responses]
+
+
 def set_user_preference(instance: SNowInstance, key: str, value: str, user=None) -> dict:
     """
     Set a user preference in the ServiceNow instance
@@ -0,0 +1,375 @@
+"""
+Pool of pre-provisioned users that are leased to tasks instead of creating (and deleting) a user per episode
+
+The pool of an instance is recorded in a JSON state file (one per instance URL) protected by a file lock, so
+that all the worker processes of a machine share it safely. Each user is either free or leased. Leases held
+by dead processes (or older than a TTL, for processes of other hosts) are reclaimed: since the episode that held
+them was not torn down, these users may still own records created by the episode, so they are deleted rather
+than reused.
+
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+
+from ..config import (
+    SNOW_USER_POOL_DIR,
+    SNOW_USER_POOL_LEASE_TTL,
+    SNOW_USER_POOL_SIZE,
+)
+from ..instance import SNowInstance
+from ..locking import file_lock, lease_is_leaked
+from .batch import batch_delete_records
+from .ui_themes import get_workarena_theme_variants
+from .user import create_user, create_users, set_user_preference
+from .utils import table_api_call
+
+
+def _roles_key(user_roles: list[str]) -> str:
+    return ",".join(sorted(set(user_roles)))
+
+
+class UserPool:
+    """
+    Pool of users of a ServiceNow instance, shared by all the processes of the machine
+
+    """
+
+    def __init__(
+        self,
+        instance: SNowInstance,
+        size: int = SNOW_USER_POOL_SIZE,
+        lease_ttl: float = SNOW_USER_POOL_LEASE_TTL,
+        state_dir: str = SNOW_USER_POOL_DIR,
+    ) -> None:
+        """
+        Parameters:
+        -----------
+        instance: SNowInstance
+            The instance on which the users are created (with admin credentials)
+        size: int
+            The number of free users to keep for each set of roles
+        lease_ttl: float
+            The number of seconds after which an unreleased lease of another host is considered leaked
+        state_dir: str
+            The directory where the state of the pool is recorded
+
+        """
+        self.instance = instance
+        self.size = size
+        self.lease_ttl = lease_ttl
+        os.makedirs(state_dir, exist_ok=True)
+        url_hash = hashlib.sha1(instance.snow_url.rstrip("/").encode()).hexdigest()
+        self.state_path = os.path.join(state_dir, f"{url_hash}.json")
+        self.lock_path = self.state_path + ".lock"
+        self._fill_threads = {}
+        self._fill_lock = threading.Lock()
+
+    @contextmanager
+    def _state(self):
+        """
+        Lock the state of the pool and yield it. Changes to the state are saved on exit.
+
+        """
+        with file_lock(self.lock_path):
+            if os.path.exists(self.state_path):
+                with open(self.state_path, "r") as f:
+                    state = json.load(f)
+            else:
+                state = {"snow_url": self.instance.snow_url, "users": {}}
+            yield state
+            tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+
+    def _is_leaked(self, lease: dict) -> bool:
+        return lease_is_leaked(lease, self.lease_ttl)
+
+    def _reset_preferences(self, user_sys_ids: list[str]) -> None:
+        """
+        Delete all the preferences of users (e.g., list layouts and UI theme set during an episode)
+
+        """
+        preferences = table_api_call(
+            instance=self.instance,
+            table="sys_user_preference",
+            params={
+                "sysparm_query": f"userIN{','.join(user_sys_ids)}",
+                "sysparm_fields": "sys_id",
+            },
+        )["result"]
+        if preferences:
+            batch_delete_records(
+                instance=self.instance,
+                table="sys_user_preference",
+                sys_ids=[preference["sys_id"] for preference in preferences],
+            )
+
+    def reclaim(self) -> list[str]:
+        """
+        Delete the users whose lease leaked (e.g., the process holding them crashed)
+
+        Returns:
+        --------
+        list[str]
+            The sys_ids of the deleted users
+
+        """
+        with self._state() as state:
+            leaked = [
+                sys_id
+                for sys_id, user in state["users"].items()
+                if user["lease"] is not None and self._is_leaked(user["lease"])
+            ]
+            for sys_id in leaked:
+                del state["users"][sys_id]
+        if leaked:
+            logging.info(f"Deleting {len(leaked)} leaked users from the pool of {self.state_path}.")
+            batch_delete_records(
+                instance=self.instance, table="sys_user", sys_ids=leaked, raise_on_error=False
+            )
+        return leaked
+
+    def lease(
+        self, user_roles: list[str] = ["admin"], random: np.random = np.random
+    ) -> tuple[str, str, str]:
+        """
+        Lease a free user of the pool (a new user is created if none is available)
+
+        Parameters:
+        -----------
+        user_roles: list[str]
+            The roles of the user
+        random: np.random
+            The random number generator used to pick the user's UI theme. Draws the same random numbers as
+            create_user, so that the rest of the task's configuration does not depend on the pool.
+
+        Returns:
+        --------
+        username, password, sys_id
+
+        """
+        roles_key = _roles_key(user_roles)
+        self.reclaim()
+
+        with self._state() as state:
+            free = [
+                sys_id
+                for sys_id, user in state["users"].items()
+                if user["roles"] == roles_key and user["lease"] is None
+            ]
+            if free:
+                sys_id = free[0]
+                state["users"][sys_id]["lease"] = {
+                    "pid": os.getpid(),
+                    "host": socket.gethostname(),
+                    "leased_at": time.time(),
+                }
+                user = state["users"][sys_id]
+
+        if free:
+            # Same random draws as create_user (user index, then theme)
+            random.randint(1000, 9999)
+            theme = random.choice(get_workarena_theme_variants(self.instance))
+            set_user_preference(
+                self.instance, "glide.ui.polaris.theme.variant", theme["style.sys_id"], user=sys_id
+            )
+            user_name, user_password = user["user_name"], user["password"]
+        else:
+            logging.info(f"The user pool has no free user with roles {roles_key}, creating one.")
+            user_name, user_password, sys_id = create_user(
+                instance=self.instance, user_roles=user_roles, random=random
+            )
+            with self._state() as state:
+                state["users"][sys_id] = {
+                    "user_name": user_name,
+                    "password": user_password,
+                    "roles": roles_key,
+                    "lease": {
+                        "pid": os.getpid(),
+                        "host": socket.gethostname(),
+                        "leased_at": time.time(),
+                    },
+                }
+
+        self.fill(user_roles=user_roles)
+        return user_name, user_password, sys_id
+
+    def release(self, user_sys_id: str) -> None:
+        """
+        Reset the preferences of a leased user and return it to the pool
+
+        Notes:
+        ------
+        The records created by the user are kept. Tasks that validate records by their creator don't use the
+        pool (see AbstractServiceNowTask.user_pool_compatible).
+
+        Parameters:
+        -----------
+        user_sys_id: str
+            The sys_id of the user
+
+        """
+        self._reset_preferences([user_sys_id])
+        with self._state() as state:
+            if user_sys_id in state["users"]:
+                state["users"][user_sys_id]["lease"] = None
+
+    def _fill(self, user_roles: list[str]) -> None:
+        roles_key = _roles_key(user_roles)
+        with self._state() as state:
+            n_free = sum(
+                user["roles"] == roles_key and user["lease"] is None
+                for user in state["users"].values()
+            )
+        if n_free >= self.size:
+            return
+
+        # Use a private generator to leave the global random state untouched
+        users = create_users(
+            instance=self.instance,
+            users=[{} for _ in range(self.size - n_free)],
+            user_roles=user_roles,
+            random=np.random.RandomState(),
+        )
+        # The UI theme is set when the user is leased
+        self._reset_preferences([sys_id for _, _, sys_id in users])
+        with self._state() as state:
+            for user_name, user_password, sys_id in users:
+                state["users"][sys_id] = {
+                    "user_name": user_name,
+                    "password": user_password,
+                    "roles": roles_key,
+                    "lease": None,
+                }
+
+    def fill(
+        self, user_roles: list[str] = ["admin"], background: bool = True
+    ) -> Optional[threading.Thread]:
+        """
+        Create users until the pool has `size` free users with the given roles
+
+        Parameters:
+        -----------
+        user_roles: list[str]
+            The roles of the users
+        background: bool
+            If True, create the users in a background thread (at most one per set of roles)
+
+        Returns:
+        --------
+        threading.Thread or None
+            The thread creating the users, if background is True
+
+        """
+        if not background:
+            self._fill(user_roles)
+            return None
+
+        roles_key = _roles_key(user_roles)
+        with self._fill_lock:
+            thread = self._fill_threads.get(roles_key)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._fill, args=(user_roles,), daemon=True)
+                self._fill_threads[roles_key] = thread
+                thread.start()
+        return thread
+
+    def clear(self) -> list[str]:
+        """
+        Delete all the free users of the pool from the instance
+
+        Returns:
+        --------
+        list[str]
+            The sys_ids of the deleted users
+
+        """
+        with self._state() as state:
+            free = [sys_id for sys_id, user in state["users"].items() if user["lease"] is None]
+            for sys_id in free:
+                del state["users"][sys_id]
+        if free:
+            batch_delete_records(
+                instance=self.instance, table="sys_user", sys_ids=free, raise_on_error=False
+            )
+        return free
+
+
+# Pools indexed by instance URL
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_user_pool(instance: SNowInstance) -> UserPool:
+    """
+    Get the user pool of an instance (one per instance URL and process)
+
+    """
+    key = instance.snow_url.rstrip("/")
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = UserPool(instance)
+        return _POOLS[key]
+
+
+def main():
+    """
+    Entrypoint for the CLI command that manages the user pool of an instance
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Manage the pool of pre-provisioned WorkArena users of a ServiceNow instance."
+    )
+    parser.add_argument("action", choices=["fill", "reclaim", "clear"])
+    parser.add_argument(
+        "--instance-url",
+        help="URL of the ServiceNow instance (default: SNOW_INSTANCE_URL or the instance pool).",
+    )
+    parser.add_argument(
+        "--instance-password",
+        help="Password of the admin user on the ServiceNow instance (required with --instance-url).",
+    )
+    parser.add_argument(
+        "--roles",
+        nargs="+",
+        default=["admin"],
+        help="Roles of the users to create (fill only, default: admin).",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=SNOW_USER_POOL_SIZE,
+        help="Number of free users to keep per set of roles (fill only).",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.instance_url:
+        instance = SNowInstance(
+            snow_url=args.instance_url, snow_credentials=("admin", args.instance_password)
+        )
+    else:
+        instance = SNowInstance()
+
+    pool = UserPool(instance, size=args.size)
+    if args.action == "fill":
+        pool.fill(user_roles=args.roles, background=False)
+        logging.info(f"The pool of {instance.snow_url} has {args.size} free users.")
+    elif args.action == "reclaim":
+        logging.info(f"Deleted {len(pool.reclaim())} leaked users.")
+    else:
+        logging.info(f"Deleted {len(pool.clear())} free users.")
@@ -1,12 +1,110 @@
-import requests
+import threading
 
+from copy import deepcopy
+
+from ..config import (
+    SNOW_API_CONFIRM_INITIAL_DELAY,
+    SNOW_API_CONFIRM_MAX_DELAY,
+    SNOW_API_CONSISTENCY,
+)
 from ..instance import SNowInstance
+from .table_metadata import get_instance_release, get_table_metadata_cache
 
 from requests.exceptions import HTTPError
 from time import sleep
+from typing import Optional
 
 # ServiceNow API configuration
 SNOW_API_HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
+CONSISTENCY_MODES = ["trust_response", "confirm"]
+
+# Per-table statistics on read-after-write confirmations
+_READ_AFTER_WRITE_STATS = {}
+_READ_AFTER_WRITE_STATS_LOCK = threading.Lock()
+
+
+def _record_read_after_write(
+    table: str, confirmed: bool, polls: int = 0, wait_time: float = 0.0, expired: bool = False
+) -> None:
+    """
+    Record the outcome of a read-after-write check in the per-table statistics
+
+    """
+    # Strip any record sys_id from the table name (e.g., sys_user/<sys_id>)
+    table = table.split("/")[0]
+    with _READ_AFTER_WRITE_STATS_LOCK:
+        stats = _READ_AFTER_WRITE_STATS.setdefault(
+            table, {"checks": 0, "confirmations": 0, "polls": 0, "wait_time": 0.0, "expired": 0}
+        )
+        stats["checks"] += 1
+        stats["confirmations"] += int(confirmed)
+        stats["polls"] += polls
+        stats["wait_time"] += wait_time
+        stats["expired"] += int(expired)
+
+
+def get_read_after_write_stats() -> dict:
+    """
+    Get per-table statistics on how often records had to be confirmed after being written
+
+    Returns:
+    --------
+    dict
+        For each table: the number of checks (POST or wait_for_record calls), the number of times a
+        confirmation by polling was actually needed, the number of polling GETs, the total time spent
+        waiting (seconds) and the number of waits that expired before the record was found.
+
+    """
+    with _READ_AFTER_WRITE_STATS_LOCK:
+        return {table: dict(stats) for table, stats in _READ_AFTER_WRITE_STATS.items()}
+
+
+def reset_read_after_write_stats() -> None:
+    """
+    Reset the read-after-write statistics
+
+    """
+    with _READ_AFTER_WRITE_STATS_LOCK:
+        _READ_AFTER_WRITE_STATS.clear()
+
+
+def _is_trusted_post_response(result: dict, json: dict) -> bool:
+    """
+    Check if the body of a POST response can be trusted as the created record, i.e., it has a sys_id
+    and includes all the fields that were sent
+
+    """
+    if not isinstance(result, dict) or not result.get("sys_id"):
+        return False
+    return all(field in result for field in (json or {}))
+
+
+def _poll_for_record(instance: SNowInstance, table: str, params: dict, max_retries: int) -> tuple:
+    """
+    Poll the Table API with exponential backoff until the query returns a record
+
+    The total wait is bounded by max_retries * SNOW_API_CONFIRM_MAX_DELAY seconds.
+
+    Returns:
+    --------
+    (dict or None, int, float)
+        The GET response (None if the record was not found in time), the number of polls and the time waited
+
+    """
+    budget = max_retries * SNOW_API_CONFIRM_MAX_DELAY
+    delay = SNOW_API_CONFIRM_INITIAL_DELAY
+    waited = 0.0
+    polls = 0
+    while waited < budget:
+        delay = min(delay, budget - waited)
+        sleep(delay)
+        waited += delay
+        get_response = table_api_call(instance=instance, table=table, params=params, method="GET")
+        polls += 1
+        if len(get_response["result"]) > 0:
+            return get_response, polls, waited
+        delay = min(delay * 2, SNOW_API_CONFIRM_MAX_DELAY)
+    return None, polls, waited
 
 
 def table_api_call(
@@ -19,6 +117,7 @@ def table_api_call(
     wait_for_record: bool = False,
     max_retries: int = 5,
     raise_on_wait_expired: bool = True,
+    consistency: Optional[str] = None,
 ) -> dict:
     """
     Make a call to the ServiceNow Table API
@@ -38,12 +137,17 @@ def table_api_call(
     method: str
         The HTTP method to use (GET, POST, PUT, DELETE).
     wait_for_record: bool
-        If True, will wait up to 2 seconds for the record to be present before returning
+        If True, will wait up to max_retries * 0.5 seconds for the record to be present before returning
     max_retries: int
-        The number of retries to attempt before failing
+        Bounds the time spent waiting for a record (max_retries * 0.5 seconds). The record is polled with
+        exponential backoff starting at a few tens of milliseconds.
     raise_on_wait_expired: bool
         If True, will raise an exception if the record is not found after max_retries.
         Otherwise, will return an empty result.
+    consistency: str
+        How to make sure that a created record can be read back (POST only). One of "trust_response" (trust
+        the POST response when it contains the sys_id and all the fields that were sent) or "confirm"
+        (always poll for the record). Defaults to SNOW_API_CONSISTENCY.
 
     Returns:
     --------
@@ -51,9 +155,14 @@ def table_api_call(
         The JSON response from the API
 
     """
+    consistency = consistency if consistency is not None else SNOW_API_CONSISTENCY
+    if consistency not in CONSISTENCY_MODES:
+        raise ValueError(
+            f"Unknown consistency mode {consistency}. Expected one of {CONSISTENCY_MODES}."
+        )
 
     # Query API
-    response = requests.request(
+    response = instance.session.request(
         method=method,
         url=instance.snow_url + f"/api/now/table/{table}",
         auth=instance.snow_credentials,
@@ -62,30 +171,32 @@ def table_api_call(
         params=params,
         json=json,
     )
-    if method == "POST":
-        sys_id = response.json()["result"]["sys_id"]
-        data = {}
-        params = {"sysparm_query": f"sys_id={sys_id}"}
 
     # Check for HTTP success code (fail otherwise)
     response.raise_for_status()
 
-    record_exists = False
-    num_retries = 0
-    if method == "POST" or wait_for_record:
-        while not record_exists:
-            sleep(0.5)
-            get_response = table_api_call(
-                instance=instance,
-                table=table,
-                params=params,
-                json=json,
-                data=data,
-                method="GET",
+    # Nothing to wait for when a record is deleted
+    if method == "POST" or (wait_for_record and method != "DELETE"):
+        if method == "POST":
+            result = response.json()["result"]
+            params = {"sysparm_query": f"sys_id={result['sys_id']}"}
+            needs_confirmation = wait_for_record or not (
+                consistency == "trust_response" and _is_trusted_post_response(result, json)
+            )
+        else:
+            response = response.json()
+            needs_confirmation = len(response["result"]) == 0
+
+        if not needs_confirmation:
+            _record_read_after_write(table, confirmed=False)
+        else:
+            get_response, polls, waited = _poll_for_record(
+                instance=instance, table=table, params=params, max_retries=max_retries
             )
-            record_exists = len(get_response["result"]) > 0
-            num_retries += 1
-            if num_retries > max_retries:
+            _record_read_after_write(
+                table, confirmed=True, polls=polls, wait_time=waited, expired=get_response is None
+            )
+            if get_response is None:
                 if raise_on_wait_expired:
                     raise HTTPError(f"Record not found after {max_retries} retries")
                 else:
@@ -95,7 +206,7 @@ def table_api_call(
 
     if method != "DELETE":
         # Decode the JSON response into a dictionary if necessary
-        # When using wait_for_record=True, the response is already a dict as it is a recursive call
+        # When using wait_for_record=True, the response may already be a dict from a polling call
         if type(response) == dict:
             return response
         else:
@@ -104,7 +215,7 @@ def table_api_call(
         return response
 
 
-def table_column_info(instance: SNowInstance, table: str) -> dict:
+def table_column_info(instance: SNowInstance, table: str, use_cache: bool = True) -> dict:
     """
     Get the column information for a ServiceNow table
 
@@ -112,6 +223,8 @@ def table_column_info(instance: SNowInstance, table: str) -> dict:
     -----------
     table: str
         The name of the table to interact with
+    use_cache: bool
+        If True, the information is read from the table metadata cache when available (see table_metadata.py)
 
     Returns:
     --------
@@ -119,8 +232,18 @@ def table_column_info(instance: SNowInstance, table: str) -> dict:
         The JSON response from the API
 
     """
+    if use_cache:
+        cache = get_table_metadata_cache()
+        key = (instance.snow_url, table, get_instance_release(instance))
+        meta_info = cache.get(key)
+        if meta_info is None:
+            meta_info = table_column_info(instance=instance, table=table, use_cache=False)
+            cache.set(key, meta_info)
+        # Callers may modify the returned information
+        return deepcopy(meta_info)
+
     # Query the Meta API to get most of the column info (e.g., valid choices)
-    response = requests.get(
+    response = instance.session.get(
         url=instance.snow_url + f"/api/now/ui/meta/{table}",
         auth=instance.snow_credentials,
         headers=SNOW_API_HEADERS,
@@ -164,7 +287,7 @@ def db_delete_from_table(instance: SNowInstance, sys_id: str, table: str) -> Non
 
     """
     # Query API
-    response = requests.delete(
+    response = instance.session.delete(
         url=instance.snow_url + f"/api/now/table/{table}/{sys_id}",
         auth=instance.snow_credentials,
         headers=SNOW_API_HEADERS,
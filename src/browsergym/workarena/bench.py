@@ -0,0 +1,535 @@
+"""
+Benchmark harness that measures the latency of the phases of WorkArena tasks (setup, cheat, validate, teardown)
+
+The phases are the construction of the task (init), setup (which includes setup_goal and start), cheat, validate
+and teardown. For each phase, it reports percentiles of the wall time, as well as the REST calls made (count and
+bytes sent and received), the Playwright navigations and the time spent in explicit waits (page.wait_for_timeout
+and time.sleep).
+Everything is measured by monkey patching requests, Playwright and time.sleep while the tasks run, so the task
+code does not need to be modified.
+
+With --idle-report, it reports the time each task class still spends in explicit waits, by call site, to find the
+fixed delays that remain to be replaced by waits on events (see bounded_wait in tasks/utils/utils.py).
+
+With --cassette, the REST calls of each episode are recorded to (or replayed from) a cassette (see cassette.py), so
+that the REST latency of replayed episodes excludes the network.
+
+Usage:
+------
+workarena-bench --tasks "workarena.servicenow.sort-*" --episodes 5 --output results.json
+workarena-bench --tasks "workarena.servicenow.*" --episodes 1 --idle-report
+workarena-bench --tasks "workarena.servicenow.sort-*" --instance-url <url> --instance-password <password> \
+    --cassette sort.sqlite --cassette-mode auto
+
+"""
+
+import argparse
+import csv
+import fnmatch
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+
+import numpy as np
+import playwright.sync_api
+import requests
+
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from playwright.sync_api import sync_playwright
+from typing import Callable
+
+from .cassette import CASSETTE_MODES, Cassette
+from .instance import SNowInstance
+
+
+PHASES = ["init", "setup", "setup_goal", "start", "cheat", "validate", "teardown"]
+COUNTERS = ["rest_calls", "rest_bytes", "navigations", "sleep_time"]
+PERCENTILES = [50, 95, 99]
+# Phases that do not run within another phase
+TOP_LEVEL_PHASES = ["init", "setup", "cheat", "validate", "teardown"]
+
+
+class PhaseRecorder:
+    """
+    Records the duration and counters of the phases of an episode
+
+    Phases can be nested (e.g., setup_goal runs within setup), in which case counters are added to all active
+    phases.
+
+    """
+
+    def __init__(self) -> None:
+        self._active = []
+        self.phases = {}
+        # Time spent in explicit waits, by call site ("<file>:<line>")
+        self.idle_sites = defaultdict(float)
+
+    @contextmanager
+    def phase(self, name: str):
+        stats = self.phases.setdefault(name, {"duration": 0.0, **{c: 0 for c in COUNTERS}})
+        self._active.append(stats)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats["duration"] += time.perf_counter() - start
+            self._active.remove(stats)
+
+    def add(self, counter: str, value: float) -> None:
+        for stats in self._active:
+            stats[counter] += value
+
+
+def _call_site() -> str:
+    """
+    Get the innermost caller that is part of WorkArena (outside of this module), as "<file>:<line>"
+
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    frame = sys._getframe(1)
+    while frame is not None:
+        path = os.path.abspath(frame.f_code.co_filename)
+        if path.startswith(package_dir) and path != os.path.abspath(__file__):
+            return f"{os.path.relpath(path, package_dir)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "other"
+
+
+def _body_size(body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    if isinstance(body, bytes):
+        return len(body)
+    return 0  # Streamed bodies are not measured
+
+
+@contextmanager
+def instrument(recorder: PhaseRecorder):
+    """
+    Patch requests, Playwright and time.sleep to report REST calls, waits and sleeps to a recorder
+
+    Notes:
+    ------
+    Navigations are page events, so they are recorded by `watch_page`.
+
+    """
+    patches = []
+
+    def patch(owner, name, wrapper):
+        original = getattr(owner, name)
+        setattr(owner, name, wrapper(original))
+        patches.append((owner, name, original))
+
+    def wrap_send(send):
+        def wrapped(session, request, **kwargs):
+            response = send(session, request, **kwargs)
+            recorder.add("rest_calls", 1)
+            recorder.add("rest_bytes", _body_size(request.body) + len(response.content))
+            return response
+
+        return wrapped
+
+    def wrap_wait(wait):
+        def wrapped(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return wait(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                recorder.add("sleep_time", elapsed)
+                recorder.idle_sites[_call_site()] += elapsed
+
+        return wrapped
+
+    patch(requests.Session, "send", wrap_send)
+    patch(playwright.sync_api.Page, "wait_for_timeout", wrap_wait)
+    patch(playwright.sync_api.Frame, "wait_for_timeout", wrap_wait)
+    # Modules that use "from time import sleep" hold their own reference to time.sleep
+    original_sleep = time.sleep
+    for module in list(sys.modules.values()):
+        if getattr(module, "__name__", "").startswith("browsergym") and (
+            getattr(module, "sleep", None) is original_sleep
+        ):
+            patch(module, "sleep", wrap_wait)
+    patch(time, "sleep", wrap_wait)
+
+    try:
+        yield recorder
+    finally:
+        for owner, name, original in reversed(patches):
+            setattr(owner, name, original)
+
+
+def watch_page(page: playwright.sync_api.Page, recorder: PhaseRecorder) -> None:
+    """
+    Record the navigations of the main frame of a page
+
+    """
+
+    def on_navigation(frame):
+        if frame == page.main_frame:
+            recorder.add("navigations", 1)
+
+    page.on("framenavigated", on_navigation)
+
+
+def run_episode(
+    task_cls,
+    seed: int,
+    instance: SNowInstance,
+    get_browser: Callable[[int], playwright.sync_api.Browser],
+    cheat: bool = True,
+    cassette: Cassette = None,
+    cassette_mode: str = "replay",
+) -> dict:
+    """
+    Run one episode of a task and measure its phases
+
+    Parameters:
+    -----------
+    task_cls: type
+        The class of the task
+    seed: int
+        The random seed of the episode
+    instance: SNowInstance
+        The instance on which to run the task
+    get_browser: callable
+        Returns a browser that uses a given slow_mo (milliseconds)
+    cheat: bool
+        Whether to run the cheat before validating the task
+    cassette: Cassette
+        If provided, the REST calls of the episode are recorded to or replayed from this cassette
+    cassette_mode: str
+        The mode of the cassette ("record", "replay" or "auto")
+
+    Returns:
+    --------
+    dict
+        The task id and class, seed, error (if any), the measurements of each phase and the time spent in explicit
+        waits by call site
+
+    """
+    recorder = PhaseRecorder()
+    error = None
+    task = None
+    context = None
+    episode = nullcontext()
+    if cassette is not None:
+        name = f"{task_cls.get_task_id()}:{seed}"
+        if cassette_mode == "replay" and not cassette.has_episode(name):
+            return {
+                "task": task_cls.get_task_id(),
+                "task_class": task_cls.__name__,
+                "seed": seed,
+                "error": f"Episode {name} was not recorded in {cassette.path}.",
+                "phases": {},
+                "idle_sites": {},
+            }
+        episode = cassette.episode(name, instance.snow_url, cassette_mode)
+    with instrument(recorder), episode:
+        try:
+            with recorder.phase("init"):
+                task = task_cls(seed=seed, instance=instance)
+            # Time the setup_goal and start phases, which are called by setup
+            for name in ["setup_goal", "start"]:
+
+                def timed(*args, _method=getattr(task, name), _name=name, **kwargs):
+                    with recorder.phase(_name):
+                        return _method(*args, **kwargs)
+
+                setattr(task, name, timed)
+
+            context = get_browser(task.slow_mo).new_context(viewport=task.viewport)
+            page = context.new_page()
+            watch_page(page, recorder)
+
+            with recorder.phase("setup"):
+                task.setup(page=page)
+            chat_messages = []
+            if cheat:
+                with recorder.phase("cheat"):
+                    task.cheat(page=page, chat_messages=chat_messages)
+            with recorder.phase("validate"):
+                reward, _, _, _ = task.validate(page, chat_messages)
+            if cheat and reward != 1.0:
+                error = f"The cheat did not solve the task (reward: {reward})."
+        except Exception:
+            error = traceback.format_exc()
+        finally:
+            try:
+                if task is not None and task.task_is_setup:
+                    with recorder.phase("teardown"):
+                        task.teardown()
+            except Exception:
+                error = error or traceback.format_exc()
+            if context is not None:
+                context.close()
+
+    return {
+        "task": task_cls.get_task_id(),
+        "task_class": task_cls.__name__,
+        "seed": seed,
+        "error": error,
+        "phases": recorder.phases,
+        "idle_sites": dict(recorder.idle_sites),
+    }
+
+
+def summarize(episodes: list[dict]) -> list[dict]:
+    """
+    Compute the percentiles of the phase durations and the mean counters, per task and over all tasks
+
+    Episodes that failed are excluded.
+
+    Returns:
+    --------
+    list[dict]
+        One row per (task, phase)
+
+    """
+    groups = defaultdict(list)
+    for episode in episodes:
+        if episode["error"] is None:
+            groups[episode["task"]].append(episode)
+            groups["all"].append(episode)
+
+    rows = []
+    for task, task_episodes in groups.items():
+        for phase in PHASES:
+            measurements = [e["phases"][phase] for e in task_episodes if phase in e["phases"]]
+            if not measurements:
+                continue
+            durations = np.array([m["duration"] for m in measurements])
+            row = {"task": task, "phase": phase, "n": len(measurements)}
+            row.update(
+                {
+                    f"p{p}": float(v)
+                    for p, v in zip(PERCENTILES, np.percentile(durations, PERCENTILES))
+                }
+            )
+            row["mean"] = float(durations.mean())
+            row.update({c: float(np.mean([m[c] for m in measurements])) for c in COUNTERS})
+            rows.append(row)
+    return rows
+
+
+def summarize_idle(episodes: list[dict]) -> list[dict]:
+    """
+    Compute the mean time spent in explicit waits per task class, overall, per phase and per call site
+
+    Episodes that failed are excluded.
+
+    Returns:
+    --------
+    list[dict]
+        One row per task class, from the class that waits the most to the one that waits the least
+
+    """
+    groups = defaultdict(list)
+    for episode in episodes:
+        if episode["error"] is None:
+            groups[episode.get("task_class", episode["task"])].append(episode)
+
+    rows = []
+    for task_class, class_episodes in groups.items():
+        n = len(class_episodes)
+        phases = {
+            phase: sum(e["phases"].get(phase, {}).get("sleep_time", 0) for e in class_episodes) / n
+            for phase in TOP_LEVEL_PHASES
+        }
+        sites = defaultdict(float)
+        for episode in class_episodes:
+            for site, idle_time in episode.get("idle_sites", {}).items():
+                sites[site] += idle_time / n
+        rows.append(
+            {
+                "task_class": task_class,
+                "n": n,
+                "idle_time": sum(phases.values()),
+                "phases": phases,
+                "sites": dict(sorted(sites.items(), key=lambda item: -item[1])),
+            }
+        )
+    return sorted(rows, key=lambda row: -row["idle_time"])
+
+
+def write_results(results: dict, path: str) -> None:
+    """
+    Write the results to a JSON file, or the summary to a CSV file (based on the file extension)
+
+    """
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(
+                f,
+                fieldnames=[
+                    "task",
+                    "phase",
+                    "n",
+                    *[f"p{p}" for p in PERCENTILES],
+                    "mean",
+                    *COUNTERS,
+                ],
+            )
+            writer.writeheader()
+            writer.writerows(results["summary"])
+    else:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def select_tasks(patterns: list[str]) -> list:
+    """
+    Select the tasks whose id matches any of the patterns (shell-style wildcards)
+
+    """
+    # XXX: Need to include the import here to avoid circular imports
+    from . import ALL_WORKARENA_TASKS
+
+    tasks = [
+        task
+        for task in ALL_WORKARENA_TASKS
+        if any(fnmatch.fnmatch(task.get_task_id(), pattern) for pattern in patterns)
+    ]
+    if not tasks:
+        raise ValueError(f"No task matches {patterns}.")
+    return tasks
+
+
+def main():
+    """
+    Entrypoint for the benchmark CLI command
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure the latency of the setup, cheat, validate and teardown phases of WorkArena tasks."
+    )
+    parser.add_argument(
+        "--tasks",
+        nargs="+",
+        default=["*"],
+        help="Ids of the tasks to run, with shell-style wildcards (default: all tasks).",
+    )
+    parser.add_argument("--episodes", type=int, default=3, help="Episodes (seeds) per task.")
+    parser.add_argument(
+        "--instance-url",
+        help="URL of the ServiceNow instance, or of a local mock of its REST API (default: SNOW_INSTANCE_URL "
+        "or the instance pool).",
+    )
+    parser.add_argument(
+        "--instance-password",
+        help="Password of the admin user on the ServiceNow instance (required with --instance-url).",
+    )
+    parser.add_argument(
+        "--no-cheat", action="store_true", help="Only measure setup, validate and teardown."
+    )
+    parser.add_argument(
+        "--slow-mo",
+        type=int,
+        default=None,
+        help="Playwright slow_mo in milliseconds (default: the value used by each task).",
+    )
+    parser.add_argument("--headed", action="store_true", help="Show the browser.")
+    parser.add_argument(
+        "--cassette",
+        help="Cassette (SQLite file) to record the REST calls of the episodes to, or replay them from "
+        "(requires --instance-url).",
+    )
+    parser.add_argument(
+        "--cassette-mode",
+        choices=CASSETTE_MODES,
+        default="auto",
+        help="record: record all episodes, replay: replay recorded episodes without REST calls to the "
+        "instance, auto: replay the recorded episodes and record the others (default: auto).",
+    )
+    parser.add_argument(
+        "--idle-report",
+        action="store_true",
+        help="Print the time each task class spends in explicit waits (per phase and call site) instead of the "
+        "summary.",
+    )
+    parser.add_argument(
+        "--output",
+        help="File to write the results to: .json for the summary and all episodes, .csv for the summary "
+        "(default: print the summary).",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.cassette and not args.instance_url:
+        parser.error("--cassette requires --instance-url.")
+    cassette = Cassette(args.cassette) if args.cassette else None
+
+    if args.instance_url:
+        # The health checks of the instance are recorded like an episode
+        with (
+            cassette.episode("instance", args.instance_url, args.cassette_mode)
+            if cassette is not None
+            else nullcontext()
+        ):
+            instance = SNowInstance(
+                snow_url=args.instance_url, snow_credentials=("admin", args.instance_password)
+            )
+    else:
+        instance = SNowInstance()
+
+    tasks = select_tasks(args.tasks)
+    episodes = []
+    with sync_playwright() as p:
+        browsers = {}
+
+        def get_browser(slow_mo: int) -> playwright.sync_api.Browser:
+            # Use the slow_mo of the task (like BrowserEnv), unless it is overridden
+            slow_mo = args.slow_mo if args.slow_mo is not None else slow_mo
+            if slow_mo not in browsers:
+                browsers[slow_mo] = p.chromium.launch(headless=not args.headed, slow_mo=slow_mo)
+            return browsers[slow_mo]
+
+        for task_cls in tasks:
+            for seed in range(args.episodes):
+                logging.info(f"Running {task_cls.get_task_id()} (seed {seed})")
+                episode = run_episode(
+                    task_cls,
+                    seed,
+                    instance,
+                    get_browser,
+                    cheat=not args.no_cheat,
+                    cassette=cassette,
+                    cassette_mode=args.cassette_mode,
+                )
+                if episode["error"] is not None:
+                    logging.warning(f"Episode failed: {episode['error']}")
+                episodes.append(episode)
+        for browser in browsers.values():
+            browser.close()
+
+    results = {
+        "metadata": {
+            "date": datetime.now().isoformat(),
+            "instance": instance.snow_url,
+            "episodes_per_task": args.episodes,
+            "cheat": not args.no_cheat,
+            "slow_mo": args.slow_mo,
+            "cassette": args.cassette,
+            "cassette_mode": args.cassette_mode if args.cassette else None,
+            "failed_episodes": sum(e["error"] is not None for e in episodes),
+        },
+        "summary": summarize(episodes),
+        "idle": summarize_idle(episodes),
+        "episodes": episodes,
+    }
+    if args.output:
+        write_results(results, args.output)
+        logging.info(f"Results written to {args.output}")
+    if args.idle_report:
+        print(json.dumps(results["idle"], indent=2))
+    elif not args.output:
+        print(json.dumps(results["summary"], indent=2))
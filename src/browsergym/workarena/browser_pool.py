@@ -0,0 +1,168 @@
+"""
+Pool of warm browsers that hands out fresh browser contexts
+
+Launching Chromium takes about a second and logging into an instance takes a few more. The pool keeps one browser
+per worker (thread, in each process) and hands out fresh BrowserContexts, which are isolated from each other (cookies,
+storage, pages) and cheap to create. Contexts logged into an instance reuse the cached session of their user, if any
+(see session_cache.py).
+
+Usage:
+------
+pool = get_browser_pool()
+with pool.page(instance) as page:  # A page of a fresh context, logged into the instance
+    page.goto(instance.snow_url + "/stats.do")
+
+Notes:
+------
+* Playwright objects can only be used by the thread that created them, hence one browser per thread.
+* The pool starts its own Playwright driver, so it can't be used in a thread that already runs the sync API of
+  Playwright (e.g., within pytest-playwright tests or a BrowserEnv).
+
+"""
+
+import atexit
+import os
+import playwright.sync_api
+import threading
+
+from contextlib import contextmanager
+from playwright.sync_api import sync_playwright
+from typing import Callable
+
+from .config import SNOW_SLOW_MO
+from .instance import SNowInstance
+from .session_cache import login_with_cache
+from .utils import url_login
+
+
+class BrowserPool:
+    """
+    One warm browser per worker, handing out fresh contexts
+
+    Parameters:
+    -----------
+    headless: bool
+        Whether to run the browsers in headless mode
+    slow_mo: int
+        Playwright slow_mo of the browsers, in milliseconds (default: the one of the execution profile)
+
+    """
+
+    def __init__(self, headless: bool = True, slow_mo: int = SNOW_SLOW_MO) -> None:
+        self.headless = headless
+        self.slow_mo = slow_mo
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        # Number of browsers launched, contexts handed out and logins made (to measure reuse)
+        self.stats = {"launches": 0, "contexts": 0, "logins": 0}
+
+    def browser(self) -> playwright.sync_api.Browser:
+        """
+        Get the browser of the current worker, launching it if needed (e.g., if it crashed)
+
+        """
+        worker = getattr(self._local, "worker", None)
+        # A worker inherited from the parent process (fork) can't be used
+        if worker is None or worker["pid"] != os.getpid():
+            worker = {"pid": os.getpid(), "playwright": sync_playwright().start(), "browser": None}
+            self._local.worker = worker
+        if worker["browser"] is None or not worker["browser"].is_connected():
+            worker["browser"] = worker["playwright"].chromium.launch(
+                headless=self.headless, slow_mo=self.slow_mo
+            )
+            with self.lock:
+                self.stats["launches"] += 1
+        return worker["browser"]
+
+    @contextmanager
+    def context(
+        self,
+        instance: SNowInstance = None,
+        login: Callable[[SNowInstance, playwright.sync_api.Page], None] = url_login,
+        **kwargs,
+    ):
+        """
+        Get a fresh context of the browser of the current worker (closed on exit)
+
+        Parameters:
+        -----------
+        instance: SNowInstance
+            If provided, the context is logged into this instance (with the credentials of the instance)
+        login: callable
+            The function used to log in when the user has no valid cached session (url_login or ui_login)
+        kwargs: dict
+            Additional arguments of Browser.new_context (e.g., viewport)
+
+        Yields:
+        -------
+        playwright.sync_api.BrowserContext
+            The context
+
+        """
+        context = self.browser().new_context(**kwargs)
+        with self.lock:
+            self.stats["contexts"] += 1
+        try:
+            if instance is not None:
+                page = context.new_page()
+                if not login_with_cache(instance, page, login=login):
+                    with self.lock:
+                        self.stats["logins"] += 1
+                page.close()
+            yield context
+        finally:
+            context.close()
+
+    @contextmanager
+    def page(
+        self,
+        instance: SNowInstance = None,
+        login: Callable[[SNowInstance, playwright.sync_api.Page], None] = url_login,
+        **kwargs,
+    ):
+        """
+        Get a page of a fresh context (see context)
+
+        """
+        with self.context(instance=instance, login=login, **kwargs) as context:
+            yield context.new_page()
+
+    def close(self) -> None:
+        """
+        Close the browser of the current worker
+
+        """
+        worker = getattr(self._local, "worker", None)
+        if worker is None or worker["pid"] != os.getpid():
+            return
+        self._local.worker = None
+        if worker["browser"] is not None and worker["browser"].is_connected():
+            worker["browser"].close()
+        worker["playwright"].stop()
+
+
+# Pools indexed by (headless, slow_mo)
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_browser_pool(headless: bool = True, slow_mo: int = SNOW_SLOW_MO) -> BrowserPool:
+    """
+    Get the browser pool with the given settings (one per process)
+
+    """
+    with _POOLS_LOCK:
+        if (headless, slow_mo) not in _POOLS:
+            _POOLS[(headless, slow_mo)] = BrowserPool(headless=headless, slow_mo=slow_mo)
+        return _POOLS[(headless, slow_mo)]
+
+
+@atexit.register
+def _close_browser_pools() -> None:
+    # Only the browsers of the main thread can be closed here, the others are closed with their driver
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            try:
+                pool.close()
+            except Exception:
+                pass
@@ -0,0 +1,365 @@
+"""
+Record and replay the REST traffic of WorkArena episodes
+
+A cassette is a SQLite file that stores the REST calls made to a ServiceNow instance during episodes (e.g., a task
+class and seed), so that they can later be replayed without network access. This covers every call made through the
+pooled HTTP session of the instance: the Table, Batch and UI metadata APIs (table_api_call, table_column_info,
+db_delete_from_table, etc.) and the health checks of SNowInstance.
+
+Calls are matched by their normalized request: method, path, sorted query parameters, authenticated user and a hash
+of the (canonicalized) JSON body. Identical calls are replayed in the order in which they were recorded. Response
+bodies are compressed and stored once per cassette, whatever the number of episodes that received them.
+
+Usage:
+------
+cassette = Cassette("cassettes.sqlite")
+with cassette.episode("workarena.servicenow.create-incident:0", instance.snow_url, mode="record"):
+    ...  # Run the episode against the instance
+with cassette.episode("workarena.servicenow.create-incident:0", instance.snow_url, mode="replay"):
+    ...  # Run the same episode again, without network access
+
+Notes:
+------
+* Only REST traffic is recorded. Pages loaded by the browser still require the instance.
+* Tasks tag the data they create with random identifiers (uuid4). During an episode, the identifiers of the tasks are
+  drawn from a generator seeded by the episode name, so that a replayed episode makes the same calls as the recorded one.
+
+"""
+
+import base64
+import hashlib
+import json
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import zlib
+
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from .instance import get_http_session
+
+
+CASSETTE_MODES = ["record", "replay", "auto"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS episodes (name TEXT PRIMARY KEY, recorded_on TEXT NOT NULL, interactions BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS episode_blobs (name TEXT NOT NULL, hash TEXT NOT NULL, PRIMARY KEY (name, hash));
+CREATE INDEX IF NOT EXISTS episode_blobs_hash ON episode_blobs (hash);
+"""
+
+
+class CassetteMissError(RuntimeError):
+    """
+    Raised when a replayed episode makes a call that was not recorded
+
+    """
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_request(
+    method: str, url: str, body: Optional[bytes], authorization: Optional[str]
+) -> tuple:
+    """
+    Normalize a request to the keys used to match it with recorded calls
+
+    Returns:
+    --------
+    (str, str)
+        The exact key (method, path, sorted parameters, user and body hash) and the loose key (without the body
+        hash), which is used when no call with the exact key was recorded
+
+    """
+    url = urlparse(url)
+    params = urlencode(sorted(parse_qsl(url.query, keep_blank_values=True)))
+
+    # Only keep the user name of the credentials
+    user = ""
+    if authorization and authorization.startswith("Basic "):
+        try:
+            user = base64.b64decode(authorization[len("Basic ") :]).decode().split(":", 1)[0]
+        except Exception:
+            pass
+
+    if body:
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode()
+        except ValueError:
+            pass
+    body_hash = _hash(body)[:16] if body else ""
+
+    loose_key = " ".join([method.upper(), url.path.rstrip("/") or "/", params, user])
+    return f"{loose_key} {body_hash}", loose_key
+
+
+class Cassette:
+    """
+    Store of recorded REST calls, shared by many episodes
+
+    Parameters:
+    -----------
+    path: str
+        Path to the cassette (SQLite file, created if needed)
+
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.executescript(_SCHEMA)
+
+    def _put_blob(self, data: bytes) -> str:
+        key = _hash(data)
+        self.db.execute(
+            "INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)", (key, zlib.compress(data))
+        )
+        return key
+
+    def _get_blob(self, key: str) -> bytes:
+        (data,) = self.db.execute("SELECT data FROM blobs WHERE hash = ?", (key,)).fetchone()
+        return zlib.decompress(data)
+
+    def episodes(self) -> list[str]:
+        """
+        Get the names of the recorded episodes
+
+        """
+        with self.lock:
+            return [name for (name,) in self.db.execute("SELECT name FROM episodes ORDER BY name")]
+
+    def has_episode(self, name: str) -> bool:
+        with self.lock:
+            return (
+                self.db.execute("SELECT 1 FROM episodes WHERE name = ?", (name,)).fetchone()
+                is not None
+            )
+
+    def save_episode(self, name: str, interactions: list[dict]) -> None:
+        """
+        Store the calls of an episode (replacing any previous recording)
+
+        Parameters:
+        -----------
+        name: str
+            The name of the episode
+        interactions: list[dict]
+            The calls, in order, with keys "key", "loose_key", "status", "content_type", "body" (bytes) and
+            "elapsed" (seconds)
+
+        """
+        with self.lock, self.db:
+            stored = [{**i, "body": self._put_blob(i["body"])} for i in interactions]
+            self.db.execute(
+                "INSERT OR REPLACE INTO episodes (name, recorded_on, interactions) VALUES (?, ?, ?)",
+                (name, datetime.now().isoformat(), zlib.compress(json.dumps(stored).encode())),
+            )
+            self.db.execute("DELETE FROM episode_blobs WHERE name = ?", (name,))
+            self.db.executemany(
+                "INSERT INTO episode_blobs (name, hash) VALUES (?, ?)",
+                [(name, key) for key in {i["body"] for i in stored}],
+            )
+            # Drop the bodies that are no longer used by any episode (e.g., those of a previous recording)
+            self.db.execute(
+                "DELETE FROM blobs WHERE NOT EXISTS "
+                "(SELECT 1 FROM episode_blobs WHERE episode_blobs.hash = blobs.hash)"
+            )
+
+    def load_episode(self, name: str) -> Optional[list[dict]]:
+        """
+        Get the calls of an episode (None if it was not recorded)
+
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT interactions FROM episodes WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            interactions = json.loads(zlib.decompress(row[0]))
+            return [{**i, "body": self._get_blob(i["body"])} for i in interactions]
+
+    @contextmanager
+    def episode(self, name: str, snow_url: str, mode: str = "replay"):
+        """
+        Record or replay the REST calls made to an instance during an episode
+
+        Parameters:
+        -----------
+        name: str
+            The name of the episode (e.g., "<task id>:<seed>")
+        snow_url: str
+            The URL of the instance
+        mode: str
+            One of "record" (make the calls and store them), "replay" (serve the stored calls, without network
+            access) or "auto" (replay the episode if it was recorded, record it otherwise)
+
+        Yields:
+        -------
+        CassetteAdapter
+            The adapter that records or replays the calls
+
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode {mode}. Expected one of {CASSETTE_MODES}.")
+        if mode == "auto":
+            mode = "replay" if self.has_episode(name) else "record"
+        if mode == "replay":
+            interactions = self.load_episode(name)
+            if interactions is None:
+                raise CassetteMissError(f"Episode {name} was not recorded in {self.path}.")
+        else:
+            interactions = []
+
+        snow_url = snow_url.rstrip("/")
+        session = get_http_session(snow_url)
+        previous = session.adapters.get(snow_url)
+        adapter = CassetteAdapter(
+            mode=mode,
+            interactions=interactions,
+            transport=session.get_adapter(snow_url) if mode == "record" else None,
+        )
+        session.mount(snow_url, adapter)
+        try:
+            with _deterministic_uuid4(name):
+                yield adapter
+        finally:
+            if previous is not None:
+                session.mount(snow_url, previous)
+            else:
+                session.adapters.pop(snow_url, None)
+        if mode == "record":
+            self.save_episode(name, adapter.interactions)
+
+
+class CassetteAdapter(BaseAdapter):
+    """
+    Transport adapter for requests that records calls (sent through another adapter) or replays recorded calls
+
+    """
+
+    def __init__(
+        self, mode: str, interactions: list[dict], transport: Optional[BaseAdapter] = None
+    ) -> None:
+        super().__init__()
+        self.mode = mode
+        self.transport = transport
+        self.interactions = interactions
+        self.lock = threading.Lock()
+        # Recorded responses, in order, by exact and loose key
+        self._replay = defaultdict(deque)
+        self._replay_loose = defaultdict(deque)
+        for interaction in interactions:
+            self._replay[interaction["key"]].append(interaction)
+            self._replay_loose[interaction["loose_key"]].append(interaction)
+        # Ids of the interactions replayed through either queue
+        self._consumed = set()
+        # Number of calls replayed with an exact match and with a loose match (replay mode)
+        self.hits = 0
+        self.loose_hits = 0
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        body = request.body.encode() if isinstance(request.body, str) else request.body
+        key, loose_key = normalize_request(
+            request.method, request.url, body, request.headers.get("Authorization")
+        )
+
+        if self.mode == "record":
+            start = time.perf_counter()
+            response = self.transport.send(
+                request, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies
+            )
+            with self.lock:
+                self.interactions.append(
+                    {
+                        "key": key,
+                        "loose_key": loose_key,
+                        "status": response.status_code,
+                        "content_type": response.headers.get("Content-Type", ""),
+                        "body": response.content,
+                        "elapsed": time.perf_counter() - start,
+                    }
+                )
+            return response
+
+        with self.lock:
+            interaction = self._next(self._replay, key)
+            if interaction is not None:
+                self.hits += 1
+            else:
+                interaction = self._next(self._replay_loose, loose_key)
+                self.loose_hits += interaction is not None
+        if interaction is None:
+            raise CassetteMissError(f"No recorded call matches {key}.")
+
+        response = Response()
+        response.status_code = interaction["status"]
+        response.reason = "OK" if interaction["status"] < 400 else "Error"
+        response.headers = CaseInsensitiveDict(
+            {
+                "Content-Type": interaction["content_type"],
+                "Content-Length": str(len(interaction["body"])),
+            }
+        )
+        response._content = interaction["body"]
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def _next(self, queues: dict, key: str) -> Optional[dict]:
+        # Identical calls are replayed in order, and the last one is repeated if more calls are made
+        queue = queues.get(key)
+        if not queue:
+            return None
+        # Skip the calls already replayed through the other queue (e.g., exact matches of a loose key)
+        while len(queue) > 1 and id(queue[0]) in self._consumed:
+            queue.popleft()
+        interaction = queue.popleft() if len(queue) > 1 else queue[0]
+        self._consumed.add(id(interaction))
+        return interaction
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+
+@contextmanager
+def _deterministic_uuid4(seed: str):
+    """
+    Draw the uuid4 of the task modules from a generator seeded by a string
+
+    """
+    generator = random.Random(seed)
+
+    def uuid4():
+        return uuid.UUID(int=generator.getrandbits(128), version=4)
+
+    # Modules that use "from uuid import uuid4" hold their own reference to it
+    modules = [
+        module
+        for module in list(sys.modules.values())
+        if getattr(module, "__name__", "").startswith("browsergym.workarena.tasks")
+        and getattr(module, "uuid4", None) is uuid.uuid4
+    ]
+    for module in modules:
+        module.uuid4 = uuid4
+    try:
+        yield
+    finally:
+        for module in modules:
+            module.uuid4 = uuid.uuid4
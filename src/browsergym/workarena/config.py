@@ -1,3 +1,5 @@
+import os
+
 from importlib import resources
 from json import load as json_load
 from os.path import exists
@@ -8,9 +10,121 @@ from ..workarena.tasks import utils
 # ServiceNow configuration
 SNOW_DATA_LOOKBACK_MINUTES = 5
 SNOW_BROWSER_TIMEOUT = 30000  # Milliseconds
+SNOW_AWAIT_READY_GRACE_PERIOD = 1000  # Milliseconds the page waits after await_ready timed out
 SNOW_JS_UTILS_FILEPATH = str(resources.files(utils).joinpath("js_utils.js"))
 SNOW_SUPPORTED_RELEASES = ["washingtondc"]
 
+# Execution profiles: Playwright slow_mo (milliseconds) of the browsers that run the tasks and the installer
+# The fast profile relies on the waits of the cheats (see bounded_wait in tasks/utils/utils.py) instead of slow_mo.
+# Use workarena-stress to compare the success rates of the profiles.
+SNOW_EXECUTION_PROFILES = {"default": 1000, "fast": 0}
+SNOW_EXECUTION_PROFILE = os.environ.get("WORKARENA_EXECUTION_PROFILE", "default")
+if SNOW_EXECUTION_PROFILE not in SNOW_EXECUTION_PROFILES:
+    raise ValueError(
+        f"Unknown execution profile {SNOW_EXECUTION_PROFILE} (WORKARENA_EXECUTION_PROFILE). "
+        f"Expected one of {list(SNOW_EXECUTION_PROFILES)}."
+    )
+SNOW_SLOW_MO = SNOW_EXECUTION_PROFILES[SNOW_EXECUTION_PROFILE]
+
+# Authenticated sessions reused by new browser contexts instead of logging in (see session_cache.py)
+SNOW_SESSION_CACHE_ENABLED = os.environ.get("WORKARENA_SESSION_CACHE", "1") == "1"
+SNOW_SESSION_CACHE_SIZE = 256  # Maximum number of sessions kept in memory
+SNOW_SESSION_CACHE_TTL = 3600  # Seconds after the login during which a session is reused
+
+# REST API connection pooling (shared by all API calls made to the same instance in a process)
+SNOW_API_POOL_SIZE = 16  # Maximum number of keep-alive connections kept per instance
+SNOW_API_MAX_RETRIES = 3  # Retries on connection errors (e.g., connection reset by the instance)
+SNOW_API_RETRY_BACKOFF = 0.1  # Seconds, exponential backoff factor between retries
+
+# REST API read-after-write consistency
+# "trust_response": trust the body of a POST when it contains the sys_id and the fields that were sent
+# "confirm": always confirm that a created record can be read back before returning
+SNOW_API_CONSISTENCY = "trust_response"
+SNOW_API_CONFIRM_INITIAL_DELAY = 0.025  # Seconds, first delay when polling for a record
+SNOW_API_CONFIRM_MAX_DELAY = 0.5  # Seconds, maximum delay between polls and wait budget per retry
+
+# Maximum number of Table API calls sent in a single call to the Batch API
+SNOW_API_BATCH_SIZE = 50
+
+# Limits on concurrent API calls made through the async API (per instance)
+SNOW_API_MAX_CONCURRENCY = SNOW_API_POOL_SIZE  # Never use more connections than the pool keeps open
+SNOW_API_MAX_CALLS_PER_SECOND = None  # No rate limit
+
+# Table metadata cache (used by table_column_info)
+SNOW_METADATA_CACHE_SIZE = 128  # Maximum number of tables kept in memory
+SNOW_METADATA_CACHE_TTL = 7 * 24 * 3600  # Seconds
+# Directory of the on-disk cache tier (set WORKARENA_METADATA_CACHE_DIR to "" to disable it)
+SNOW_METADATA_CACHE_DIR = os.environ.get(
+    "WORKARENA_METADATA_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "browsergym-workarena", "table_metadata"),
+)
+# Tables whose metadata is used by the benchmark's tasks (pre-warmed by workarena-metadata-cache)
+BENCHMARK_TABLES = [
+    "alm_asset",
+    "alm_hardware",
+    "asmt_assessment_instance_question",
+    "asmt_m2m_stakeholder",
+    "ast_contract",
+    "change_request",
+    "cmdb_ci_computer",
+    "fm_expense_line",
+    "incident",
+    "problem",
+    "sc_cat_item",
+    "sc_req_item",
+    "sys_user",
+]
+
+# Reference resolution cache (display values of referenced records, shared by all tasks on an instance)
+SNOW_REFERENCE_CACHE_SIZE = 10000  # Maximum number of resolved references kept in memory
+SNOW_REFERENCE_QUERY_SIZE = 100  # Maximum number of sys_ids per query
+
+# Pool of pre-provisioned users leased to tasks (instead of creating and deleting a user per episode)
+SNOW_USER_POOL_ENABLED = os.environ.get("WORKARENA_USER_POOL", "0") == "1"
+SNOW_USER_POOL_SIZE = 4  # Free users kept per set of roles (refilled in the background)
+SNOW_USER_POOL_LEASE_TTL = 3 * 3600  # Seconds after which a lease of another host is leaked
+# Directory of the pool state files, shared by all the processes of the machine
+SNOW_USER_POOL_DIR = os.environ.get(
+    "WORKARENA_USER_POOL_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "browsergym-workarena", "user_pool"),
+)
+
+# Load-aware scheduling of the instances of the instance pool (see instance_scheduler.py), enabled by setting
+# WORKARENA_INSTANCE_SCHEDULER=1
+SNOW_INSTANCE_SCHEDULER_ENABLED = os.environ.get("WORKARENA_INSTANCE_SCHEDULER", "0") == "1"
+SNOW_INSTANCE_MAX_CONCURRENCY = int(os.environ.get("WORKARENA_INSTANCE_MAX_CONCURRENCY", "8"))
+SNOW_INSTANCE_LEASE_TTL = 3 * 3600  # Seconds after which a lease of another host is leaked
+SNOW_INSTANCE_LEASE_WAIT = 600  # Seconds to wait for an instance below its concurrency cap
+SNOW_INSTANCE_LEASE_POLL = 1  # Seconds between two attempts to lease an instance
+SNOW_INSTANCE_UNHEALTHY_COOLDOWN = 300  # Seconds during which an unhealthy instance is avoided
+SNOW_INSTANCE_LATENCY_SMOOTHING = 0.3  # Weight of the last latency in the moving average
+# Directory of the scheduler state file, shared by all the processes of the machine
+SNOW_INSTANCE_SCHEDULER_DIR = os.environ.get(
+    "WORKARENA_INSTANCE_SCHEDULER_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "browsergym-workarena", "instance_scheduler"),
+)
+
+# Maximum number of parsed encoded queries kept in memory (see encoded_query.py)
+SNOW_ENCODED_QUERY_CACHE_SIZE = 1024
+
+# Maximum number of pages whose charts are kept in memory (see DashboardRetrievalTask)
+SNOW_CHART_CACHE_SIZE = 64
+
+# Event-driven waits of the cheats (see bounded_wait in tasks/utils/utils.py)
+# Milliseconds, maximum time a cheat waits for an event before failing
+SNOW_CHEAT_WAIT_TIMEOUT = 10000
+# Milliseconds without requests after which the scripts of a page have settled
+SNOW_REQUESTS_QUIET_PERIOD = 250
+# Seconds a cheat waits for the record it submitted to be readable through the REST API
+SNOW_CHEAT_RECORD_TIMEOUT = 7.5
+
+# URL at which the REST API emulator is mounted in-process (see emulator.py)
+SNOW_EMULATOR_URL = "http://workarena-emulator.local"
+
+# Number of knapsack instances drawn at once when generating investment tasks ("random" mode)
+# None draws one instance at a time, which reproduces the tasks generated by published seeds
+KNAPSACK_BATCH_SIZE = None
+
 # Hugging Face dataset containing available instances
 INSTANCE_REPO_ID = "ServiceNow/WorkArena-Instances"
 INSTANCE_REPO_FILENAME = "instances_v2.json"
@@ -233,3 +347,7 @@ EXPECTED_REQUEST_ITEM_FORM_FIELDS_PATH = str(
 # Report date filter patch flag
 REPORT_PATCH_FLAG = "WORKARENA_DATE_FILTER_PATCH"
 REPORT_FILTER_PROPERTY = "workarena.report.filter.config"
+
+# Knowledge base integrity verdicts (recorded at install time, revalidated cheaply by tasks)
+KB_INTEGRITY_PROPERTY = "workarena.knowledge_base.integrity"
+SNOW_KB_INTEGRITY_TTL = 3600  # Seconds during which a verdict is trusted without revalidation
@@ -0,0 +1,172 @@
+"""
+Process-level store for the static JSON files shipped with WorkArena (task configurations, expected fields, etc.)
+
+Each file is read once per process. Files that contain a JSON array (e.g., task configurations) are memory-mapped
+and indexed by the offset of each of their elements, so that a random configuration can be picked without parsing
+the whole file. Call `prewarm_config_store` before forking worker processes to share the store with them.
+
+"""
+
+import json
+import mmap
+import os
+import re
+import threading
+
+from array import array
+from collections.abc import Sequence
+from copy import deepcopy
+from importlib import resources
+
+import numpy as np
+
+from . import data_files
+
+
+_WHITESPACE_AND_COMMAS = re.compile(r"[\s,]*")
+
+
+def _index_json_array(data: bytes) -> tuple[array, array]:
+    """
+    Find the start and end offsets of the elements of a JSON array
+
+    """
+    # Decoding as latin-1 maps each byte to one character, so character offsets are byte offsets. This is safe for
+    # UTF-8 data, since multi-byte sequences only contain bytes >= 0x80, which never match JSON delimiters.
+    text = data.decode("latin-1")
+    decoder = json.JSONDecoder()
+    starts, ends = array("q"), array("q")
+
+    idx = _WHITESPACE_AND_COMMAS.match(text, 0).end()
+    if idx >= len(text) or text[idx] != "[":
+        raise ValueError("The file does not contain a JSON array.")
+    idx = _WHITESPACE_AND_COMMAS.match(text, idx + 1).end()
+    while text[idx] != "]":
+        _, end = decoder.raw_decode(text, idx)
+        starts.append(idx)
+        ends.append(end)
+        idx = _WHITESPACE_AND_COMMAS.match(text, end).end()
+    return starts, ends
+
+
+class ConfigView(Sequence):
+    """
+    Read-only view of a JSON array stored in a file
+
+    Elements are parsed on access, so each access returns a new copy that can safely be modified by the caller.
+
+    """
+
+    def __init__(self, path: str, data: mmap.mmap, starts: array, ends: array) -> None:
+        self.path = path
+        self._data = data
+        self._starts = starts
+        self._ends = ends
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ConfigView index out of range")
+        return json.loads(self._data[self._starts[index] : self._ends[index]])
+
+    def __repr__(self) -> str:
+        return f"ConfigView({self.path!r}, {len(self)} elements)"
+
+
+# Views and parsed documents, indexed by (path, modification time, size)
+_VIEWS = {}
+_DOCUMENTS = {}
+_LOCK = threading.Lock()
+
+
+def _key(path: str) -> tuple:
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def get_configs(path: str) -> ConfigView:
+    """
+    Get a read-only view of a JSON file that contains an array (e.g., task configurations)
+
+    Parameters:
+    -----------
+    path: str
+        The path to the JSON file
+
+    Returns:
+    --------
+    ConfigView
+        A sequence whose elements are parsed on access
+
+    """
+    key = _key(path)
+    with _LOCK:
+        if key not in _VIEWS:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            starts, ends = _index_json_array(data[:])
+            _VIEWS[key] = ConfigView(path, data, starts, ends)
+        return _VIEWS[key]
+
+
+def get_json(path: str):
+    """
+    Get a copy of the content of a JSON file (parsed once per process)
+
+    Parameters:
+    -----------
+    path: str
+        The path to the JSON file
+
+    """
+    key = _key(path)
+    with _LOCK:
+        if key not in _DOCUMENTS:
+            with open(path, "r") as f:
+                _DOCUMENTS[key] = json.load(f)
+        return deepcopy(_DOCUMENTS[key])
+
+
+def choose_config(random: np.random.RandomState, configs: Sequence):
+    """
+    Pick a random element of a sequence of configurations
+
+    Draws the same random numbers and returns the same element as random.choice(configs), without converting
+    the whole sequence to an array.
+
+    """
+    return configs[random.randint(0, len(configs))]
+
+
+def prewarm_config_store(paths: list[str] = None) -> int:
+    """
+    Load JSON files into the store (e.g., before forking worker processes, which then share it)
+
+    Parameters:
+    -----------
+    paths: list[str]
+        The JSON files that contain arrays to load. Defaults to all the task configurations shipped with WorkArena.
+
+    Returns:
+    --------
+    int
+        The number of files loaded
+
+    """
+    if paths is None:
+        data_dir = resources.files(data_files)
+        paths = [
+            str(f)
+            for directory in ("task_configs", "setup_files/knowledge")
+            for f in data_dir.joinpath(directory).iterdir()
+            if f.name.endswith(".json")
+        ]
+    for path in paths:
+        get_configs(path)
+    return len(paths)
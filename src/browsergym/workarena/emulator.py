@@ -0,0 +1,956 @@
+"""
+Local emulator of the ServiceNow REST APIs used by WorkArena, backed by SQLite
+
+The emulator implements the subset of the Table API (including encoded queries, sysparm_display_value,
+sysparm_fields, sysparm_limit and sysparm_offset), the Batch API and the UI metadata API that the package uses, so
+that the setup and validation code of the tasks (everything but the browser) can run without a ServiceNow instance.
+It can run in-process (REST calls never leave the process) or serve the APIs on localhost.
+
+Usage:
+------
+emulator = SNowEmulator(tables={"sys_user": [{"user_name": "beth.anglin", "first_name": "Beth"}]})
+
+# In-process
+with emulator.mount() as instance:
+    table_api_call(instance=instance, table="sys_user", params={"sysparm_query": "first_nameSTARTSWITHbe"})
+
+# On localhost
+with emulator.serve() as url:
+    instance = SNowInstance(snow_url=url, snow_credentials=("admin", "admin"))
+
+Notes:
+------
+* Only the REST APIs are emulated. Pages (e.g., forms and lists) are not, so tasks cannot be cheated or solved in a
+  browser against the emulator.
+* Field values are stored as strings, like the real API returns them. String comparisons are case-insensitive, like
+  in the databases of ServiceNow instances.
+
+"""
+
+import argparse
+import base64
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from typing import Callable, Optional
+from urllib.parse import parse_qsl, urlparse
+from uuid import uuid4
+
+from .config import SNOW_EMULATOR_URL
+from .encoded_query import Condition, EncodedQuery, parse_encoded_query
+from .instance import SNowInstance, get_http_session
+
+
+# Prefix of the numbers given to new records (e.g., INC0010001), per table
+NUMBER_PREFIXES = {
+    "incident": "INC",
+    "problem": "PRB",
+    "change_request": "CHG",
+    "sc_request": "REQ",
+    "sc_req_item": "RITM",
+    "sc_task": "SCTASK",
+    "kb_knowledge": "KB",
+    "task": "TASK",
+}
+FIRST_NUMBER = 10001
+# Fields used as the display value of a record, in order of preference
+DISPLAY_FIELDS = ["name", "number", "user_name", "title", "short_description"]
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tbl TEXT NOT NULL,
+    sys_id TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_tbl ON records (tbl);
+CREATE TABLE IF NOT EXISTS ui_meta (tbl TEXT PRIMARY KEY, columns TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS numbers (prefix TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+# Functions of the GlideSystem API that can be used in query values (e.g., "javascript:gs.daysAgoStart(3)")
+_JAVASCRIPT_VALUE = re.compile(r"^javascript:\s*gs\.(\w+)\((.*)\)\s*;?\s*$")
+
+
+class EmulatorError(Exception):
+    """
+    An error returned to the client with an HTTP status code
+
+    """
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _to_str(value) -> str:
+    # The API returns booleans as "true"/"false" and missing values as empty strings
+    if value is None:
+        return ""
+    return str(value).lower() if isinstance(value, bool) else str(value)
+
+
+def _format_datetime(value: datetime) -> str:
+    return value.strftime(DATETIME_FORMAT)
+
+
+def evaluate_javascript_value(value: str, now: datetime) -> str:
+    """
+    Evaluate the GlideSystem date functions that can be used as query values (e.g., "javascript:gs.minutesAgo(5)")
+
+    Parameters:
+    -----------
+    value: str
+        The value of a query condition. Values that do not start with "javascript:" are returned as is.
+    now: datetime
+        The current time (UTC)
+
+    Returns:
+    --------
+    str
+        The value, or the date and time (UTC) returned by the function
+
+    """
+    if not value.startswith("javascript:"):
+        return value
+    match = _JAVASCRIPT_VALUE.match(value)
+    if match is None:
+        raise EmulatorError(400, f"Unsupported javascript value: {value}")
+    function, args = match.groups()
+    args = [a.strip().strip("'\"") for a in args.split(",") if a.strip()]
+
+    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    offsets = {
+        "minutes": timedelta(minutes=1),
+        "hours": timedelta(hours=1),
+        "days": timedelta(days=1),
+    }
+    for unit, offset in offsets.items():
+        if function in (f"{unit}Ago", f"{unit}AgoStart", f"{unit}AgoEnd"):
+            moment = now - int(args[0]) * offset
+            if function.endswith("Start") or function.endswith("End"):
+                # Truncate to the start of the unit (e.g., the start of the day for daysAgoStart)
+                truncate = {"minutes": dict(second=0), "hours": dict(minute=0, second=0)}
+                moment = moment.replace(
+                    microsecond=0, **truncate.get(unit, dict(hour=0, minute=0, second=0))
+                )
+                if function.endswith("End"):
+                    moment += offset - timedelta(seconds=1)
+            return _format_datetime(moment)
+    if function in ("beginningOfToday", "beginningOfTodayLocal"):
+        return _format_datetime(start_of_day)
+    if function in ("endOfToday", "endOfTodayLocal"):
+        return _format_datetime(start_of_day + timedelta(days=1, seconds=-1))
+    if function in ("now", "nowDateTime", "nowNoTZ"):
+        return _format_datetime(now)
+    if function == "dateGenerate":
+        date, moment = args[0], args[1] if len(args) > 1 else "start"
+        moment = {"start": "00:00:00", "end": "23:59:59"}.get(moment, moment)
+        return f"{date} {moment}"
+    raise EmulatorError(400, f"Unsupported javascript value: {value}")
+
+
+class SNowEmulator:
+    """
+    Emulator of the ServiceNow REST APIs, backed by SQLite
+
+    Parameters:
+    -----------
+    tables: dict
+        Records to load, indexed by table (e.g., {"sys_user": [{"user_name": "beth.anglin"}]})
+    ui_meta: dict
+        Column information returned by /api/now/ui/meta/<table>, indexed by table. Columns of type "reference" must
+        include the referenced table (key "reference") and columns with choices their "choices" (list of dicts with
+        keys "value" and "label"), which are used to compute display values.
+    database: str
+        Path to the SQLite database (default: in memory). Existing databases are reused.
+    credentials: (str, str)
+        The username and password of the admin user. Users created in sys_user (with a user_password) can also
+        authenticate.
+    clock: callable
+        Returns the current time (seconds since the epoch), used for timestamps and date queries
+
+    """
+
+    def __init__(
+        self,
+        tables: dict = {},
+        ui_meta: dict = {},
+        database: str = ":memory:",
+        credentials: tuple[str, str] = ("admin", "admin"),
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.credentials = credentials
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(database, check_same_thread=False, isolation_level=None)
+        self.db.executescript(_SCHEMA)
+        # Number of REST calls served (Batch API calls count once per call they contain)
+        self.call_count = 0
+        # Columns with a reference or choices, indexed by table (cleared when ui_meta or sys_dictionary change)
+        self._schema = {}
+        for table, columns in ui_meta.items():
+            self.set_ui_meta(table, columns)
+        for table, records in tables.items():
+            self.insert_many(table, records)
+
+    # --- Storage -----------------------------------------------------------------------------------------------
+
+    def _now(self) -> datetime:
+        return datetime.fromtimestamp(self.clock(), tz=timezone.utc).replace(tzinfo=None)
+
+    def set_ui_meta(self, table: str, columns: dict) -> None:
+        """
+        Set the column information of a table (see the ui_meta parameter of the constructor)
+
+        """
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO ui_meta (tbl, columns) VALUES (?, ?)",
+                (table, json.dumps(columns)),
+            )
+            self._schema.clear()
+
+    def get_ui_meta(self, table: str) -> dict:
+        """
+        Get the column information of a table
+
+        If none was set, basic information is derived from the fields of the records of the table.
+
+        """
+        with self.lock:
+            row = self.db.execute("SELECT columns FROM ui_meta WHERE tbl = ?", (table,)).fetchone()
+            if row is not None:
+                return json.loads(row[0])
+            fields = {}
+            for (data,) in self.db.execute("SELECT data FROM records WHERE tbl = ?", (table,)):
+                fields.update(dict.fromkeys(json.loads(data)))
+        return {
+            f: {"name": f, "label": f.replace("_", " ").capitalize(), "type": "string"}
+            for f in fields
+        }
+
+    def _column(self, table: str, field: str) -> dict:
+        """
+        Get the reference and choices of a column, from the UI metadata or the system dictionary
+
+        """
+        if table not in self._schema:
+            row = self.db.execute("SELECT columns FROM ui_meta WHERE tbl = ?", (table,)).fetchone()
+            columns = json.loads(row[0]) if row is not None else {}
+            schema = {
+                f: {k: c[k] for k in ("reference", "choices") if c.get(k)}
+                for f, c in columns.items()
+            }
+            for element, reference in self.db.execute(
+                "SELECT json_extract(data, '$.element'), json_extract(data, '$.reference') FROM records "
+                "WHERE tbl = 'sys_dictionary' AND json_extract(data, '$.name') = ?",
+                (table,),
+            ):
+                if reference:
+                    schema.setdefault(element, {}).setdefault("reference", reference)
+            self._schema[table] = schema
+        return self._schema[table].get(field, {})
+
+    def _changed(self, table: str) -> None:
+        if table == "sys_dictionary":
+            self._schema.clear()
+
+    def _next_number(self, table: str) -> str:
+        prefix = NUMBER_PREFIXES[table]
+        self.db.execute(
+            "INSERT INTO numbers (prefix, value) VALUES (?, ?) "
+            "ON CONFLICT (prefix) DO UPDATE SET value = value + 1",
+            (prefix, FIRST_NUMBER),
+        )
+        (value,) = self.db.execute(
+            "SELECT value FROM numbers WHERE prefix = ?", (prefix,)
+        ).fetchone()
+        return f"{prefix}{value:07d}"
+
+    def insert(self, table: str, record: dict, user: str = "admin") -> dict:
+        """
+        Create a record, filling in the system fields (sys_id, creation date, number, etc.)
+
+        Returns:
+        --------
+        dict
+            The created record
+
+        """
+        with self.lock:
+            now = _format_datetime(self._now())
+            record = {k: _to_str(v) for k, v in record.items()}
+            defaults = {
+                "sys_id": uuid4().hex,
+                "sys_created_on": now,
+                "sys_created_by": user,
+                "sys_updated_on": now,
+                "sys_updated_by": user,
+                "sys_mod_count": "0",
+                "sys_class_name": table,
+            }
+            if table in NUMBER_PREFIXES and not record.get("number"):
+                defaults["number"] = self._next_number(table)
+            if table == "sys_user" and not record.get("name"):
+                name = " ".join(filter(None, [record.get("first_name"), record.get("last_name")]))
+                defaults["name"] = name
+            record = {**defaults, **record}
+            try:
+                self.db.execute(
+                    "INSERT INTO records (tbl, sys_id, data) VALUES (?, ?, ?)",
+                    (table, record["sys_id"], json.dumps(record)),
+                )
+            except sqlite3.IntegrityError:
+                raise EmulatorError(403, f"A record with sys_id {record['sys_id']} already exists")
+            self._changed(table)
+            return record
+
+    def insert_many(self, table: str, records: list[dict]) -> list[dict]:
+        """
+        Create many records in a single transaction
+
+        """
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                created = [self.insert(table, record) for record in records]
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+            return created
+
+    def get(self, table: str, sys_id: str) -> Optional[dict]:
+        """
+        Get a record by sys_id (None if it does not exist)
+
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT data FROM records WHERE tbl = ? AND sys_id = ?", (table, sys_id)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def _get_any(self, sys_id: str) -> Optional[dict]:
+        row = self.db.execute("SELECT data FROM records WHERE sys_id = ?", (sys_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def update(self, table: str, sys_id: str, values: dict, user: str = "admin") -> Optional[dict]:
+        """
+        Update the fields of a record (None if it does not exist)
+
+        """
+        with self.lock:
+            record = self.get(table, sys_id)
+            if record is None:
+                return None
+            record.update({k: _to_str(v) for k, v in values.items() if k != "sys_id"})
+            record["sys_updated_on"] = _format_datetime(self._now())
+            record["sys_updated_by"] = user
+            record["sys_mod_count"] = str(int(record.get("sys_mod_count") or 0) + 1)
+            self.db.execute(
+                "UPDATE records SET data = ? WHERE sys_id = ?", (json.dumps(record), sys_id)
+            )
+            self._changed(table)
+            return record
+
+    def delete(self, table: str, sys_id: str) -> bool:
+        """
+        Delete a record. Returns False if it does not exist.
+
+        """
+        with self.lock:
+            cursor = self.db.execute(
+                "DELETE FROM records WHERE tbl = ? AND sys_id = ?", (table, sys_id)
+            )
+            self._changed(table)
+        return cursor.rowcount > 0
+
+    def query(
+        self, table: str, query: str = "", limit: Optional[int] = None, offset: int = 0
+    ) -> list[dict]:
+        """
+        Get the records of a table that match an encoded query
+
+        Parameters:
+        -----------
+        table: str
+            The name of the table
+        query: str
+            The encoded query (e.g., "active=true^ORDERBYnumber")
+        limit: int
+            The maximum number of records to return (default: all)
+        offset: int
+            The number of matching records to skip
+
+        Returns:
+        --------
+        list[dict]
+            The matching records, sorted by the ORDERBY terms of the query, then by creation order
+
+        """
+        where, where_params, order = self._compile(parse_encoded_query(query))
+        sql = f"SELECT data FROM records AS r0 WHERE tbl = ? AND ({where}) ORDER BY {order} LIMIT ? OFFSET ?"
+        params = [table, *where_params, -1 if limit is None else limit, offset]
+        with self.lock:
+            return [json.loads(data) for (data,) in self.db.execute(sql, params)]
+
+    # --- Encoded queries ---------------------------------------------------------------------------------------
+
+    @staticmethod
+    def _field_expression(field: str) -> str:
+        """
+        SQL expression for the value of a field of record r0, following references for dot-walked fields
+
+        """
+        parts = field.split(".")
+        expression = f"json_extract(r0.data, '$.\"{parts[0]}\"')"
+        # Referenced records are found by sys_id, which is unique across tables
+        for depth, part in enumerate(parts[1:], start=1):
+            expression = (
+                f"(SELECT json_extract(r{depth}.data, '$.\"{part}\"') FROM records AS r{depth} "
+                f"WHERE r{depth}.sys_id = {expression})"
+            )
+        return f"coalesce({expression}, '')"
+
+    def _compile_condition(self, condition: Condition, now: datetime) -> tuple[str, list]:
+        column = self._field_expression(condition.field)
+        operator = condition.operator
+        value = condition.value
+
+        if operator in ("ISEMPTY", "EMPTYSTRING"):
+            return f"{column} = ''", []
+        if operator == "ISNOTEMPTY":
+            return f"{column} != ''", []
+        if operator == "ANYTHING":
+            return "1", []
+        if operator in ("IN", "NOT IN"):
+            values = [evaluate_javascript_value(v, now).lower() for v in value.split(",")]
+            negation = "NOT " if operator == "NOT IN" else ""
+            return f"lower({column}) {negation}IN ({', '.join('?' * len(values))})", values
+        if operator == "BETWEEN":
+            low, high = (evaluate_javascript_value(v, now) for v in value.split("@", 1))
+            return f"({column} >= ? AND {column} <= ?)", [low, high]
+
+        value = evaluate_javascript_value(value, now)
+        if operator == "=":
+            return f"lower({column}) = lower(?)", [value]
+        if operator == "!=":
+            return f"lower({column}) != lower(?)", [value]
+        if operator in ("LIKE", "NOT LIKE"):
+            comparison = "> 0" if operator == "LIKE" else "= 0"
+            return f"instr(lower({column}), lower(?)) {comparison}", [value]
+        if operator == "STARTSWITH":
+            return f"substr(lower({column}), 1, length(?)) = lower(?)", [value, value]
+        if operator == "ENDSWITH":
+            return f"(? = '' OR substr(lower({column}), -length(?)) = lower(?))", [
+                value,
+                value,
+                value,
+            ]
+        if operator in (">", ">=", "<", "<="):
+            try:
+                number = float(value)
+            except ValueError:
+                return f"{column} {operator} ?", [value]
+            return f"({column} != '' AND CAST({column} AS REAL) {operator} ?)", [number]
+        raise EmulatorError(400, f"Unsupported query operator: {operator}")
+
+    def _compile(self, query: EncodedQuery) -> tuple[str, list, str]:
+        """
+        Compile an encoded query to a SQL condition (with its parameters) and ordering clause
+
+        """
+        now = self._now()
+        params = []
+        groups = []
+        for group in query.groups:
+            clauses = []
+            for clause in group:
+                conditions = []
+                for condition in clause:
+                    sql, condition_params = self._compile_condition(condition, now)
+                    conditions.append(sql)
+                    params += condition_params
+                clauses.append("(" + " OR ".join(conditions) + ")")
+            groups.append("(" + " AND ".join(clauses) + ")")
+        where = " OR ".join(groups) if groups else "1"
+        order = [
+            f"{self._field_expression(field)} {'DESC' if descending else 'ASC'}"
+            for field, descending in query.order_by
+        ]
+        return where, params, ", ".join(order + ["r0.seq"])
+
+    # --- Display values ----------------------------------------------------------------------------------------
+
+    def _display_value_of_record(self, record: Optional[dict]) -> str:
+        if record is None:
+            return ""
+        for field in DISPLAY_FIELDS:
+            if record.get(field):
+                return record[field]
+        return record.get("sys_id", "")
+
+    def _walk(self, table: str, record: dict, field: str) -> tuple[str, str, Optional[dict]]:
+        """
+        Follow the references of a dot-walked field
+
+        Returns:
+        --------
+        (str, str, dict)
+            The table and field at the end of the walk, and the record that holds the field (None if a reference
+            is empty or broken)
+
+        """
+        parts = field.split(".")
+        for part in parts[:-1]:
+            if record is None:
+                break
+            sys_id = record.get(part, "")
+            reference = self._column(table, part).get("reference")
+            record = self._get_any(sys_id) if sys_id else None
+            table = reference or (record or {}).get("sys_class_name", table)
+        return table, parts[-1], record
+
+    def _present(self, table: str, record: dict, params: dict, base_url: str) -> dict:
+        """
+        Format a record like the Table API (selected fields, display values and reference links)
+
+        """
+        display_value = params.get("sysparm_display_value", "false").lower()
+        exclude_links = params.get("sysparm_exclude_reference_link", "false").lower() == "true"
+        fields = [f for f in params.get("sysparm_fields", "").split(",") if f] or list(record)
+
+        presented = {}
+        for field in fields:
+            field_table, field_name, holder = self._walk(table, record, field)
+            value = (holder or {}).get(field_name, "")
+            column = self._column(field_table, field_name)
+            reference = column.get("reference")
+            if reference and value:
+                display = self._display_value_of_record(self._get_any(value))
+            elif column.get("choices"):
+                labels = {c["value"]: c["label"] for c in column["choices"]}
+                display = labels.get(value, value)
+            else:
+                display = value
+
+            if display_value == "all":
+                presented[field] = {"display_value": display, "value": value}
+            elif display_value == "true":
+                presented[field] = display
+            else:
+                presented[field] = value
+
+            if reference and value and not exclude_links:
+                link = f"{base_url}/api/now/table/{reference}/{value}"
+                if display_value == "true":
+                    presented[field] = {"display_value": display, "link": link}
+                elif display_value == "all":
+                    presented[field]["link"] = link
+                else:
+                    presented[field] = {"link": link, "value": value}
+        return presented
+
+    def _parse_input(self, table: str, values: dict, params: dict) -> dict:
+        """
+        Convert the values sent to the API to stored values (display values are converted when
+        sysparm_input_display_value is true)
+
+        """
+        values = {
+            k: v.get("value", "") if isinstance(v, dict) else v for k, v in (values or {}).items()
+        }
+        if params.get("sysparm_input_display_value", "false").lower() != "true":
+            return values
+
+        parsed = {}
+        for field, value in values.items():
+            column = self._column(table, field)
+            value = _to_str(value)
+            if column.get("reference") and value:
+                matches = [
+                    r["sys_id"]
+                    for r in self.query(column["reference"])
+                    if value in (r["sys_id"], self._display_value_of_record(r))
+                ]
+                value = matches[0] if matches else value
+            elif column.get("choices"):
+                values_by_label = {c["label"]: c["value"] for c in column["choices"]}
+                value = values_by_label.get(value, value)
+            parsed[field] = value
+        return parsed
+
+    # --- REST API ----------------------------------------------------------------------------------------------
+
+    def authenticate(self, authorization: Optional[str]) -> Optional[str]:
+        """
+        Check the credentials of a request (HTTP basic authentication)
+
+        Returns:
+        --------
+        str
+            The name of the authenticated user, None if the credentials are missing or invalid
+
+        """
+        if not authorization or not authorization.startswith("Basic "):
+            return None
+        try:
+            username, password = (
+                base64.b64decode(authorization[len("Basic ") :]).decode().split(":", 1)
+            )
+        except Exception:
+            return None
+        if (username, password) == tuple(self.credentials):
+            return username
+        with self.lock:
+            row = self.db.execute(
+                "SELECT 1 FROM records WHERE tbl = 'sys_user' AND json_extract(data, '$.user_name') = ? "
+                "AND json_extract(data, '$.user_password') = ?",
+                (username, password),
+            ).fetchone()
+        return username if row is not None else None
+
+    def handle(
+        self,
+        method: str,
+        path: str,
+        params: dict,
+        body=None,
+        user: str = "admin",
+        base_url: str = SNOW_EMULATOR_URL,
+    ) -> tuple[int, Optional[dict]]:
+        """
+        Handle an authenticated REST call
+
+        Parameters:
+        -----------
+        method: str
+            The HTTP method
+        path: str
+            The path of the URL (e.g., /api/now/table/incident)
+        params: dict
+            The query parameters
+        body: dict
+            The decoded JSON body
+        user: str
+            The name of the authenticated user
+        base_url: str
+            The URL at which the emulator is reached (used in reference links)
+
+        Returns:
+        --------
+        (int, dict)
+            The HTTP status code and JSON response (None for an empty response)
+
+        """
+        try:
+            with self.lock:
+                self.call_count += 1
+                if path.rstrip("/") == "/api/now/v1/batch" and method == "POST":
+                    return 200, self._handle_batch(body, user, base_url)
+                if path.startswith("/api/now/ui/meta/"):
+                    table = path[len("/api/now/ui/meta/") :].strip("/")
+                    return 200, {"result": {"columns": self.get_ui_meta(table), "table": table}}
+                if path.startswith("/api/now/table/"):
+                    return self._handle_table(method, path, params, body, user, base_url)
+                raise EmulatorError(400, f"Requested URI does not represent any resource: {path}")
+        except EmulatorError as e:
+            return e.status, {"error": {"message": e.message, "detail": None}, "status": "failure"}
+
+    def _handle_table(
+        self, method, path, params, body, user, base_url
+    ) -> tuple[int, Optional[dict]]:
+        parts = path[len("/api/now/table/") :].strip("/").split("/")
+        table, sys_id = parts[0], parts[1] if len(parts) > 1 else None
+
+        if method == "POST" and sys_id is None:
+            record = self.insert(table, self._parse_input(table, body, params), user=user)
+            return 201, {"result": self._present(table, record, params, base_url)}
+        if method == "GET" and sys_id is None:
+            try:
+                limit = int(params["sysparm_limit"]) if params.get("sysparm_limit") else None
+                offset = int(params.get("sysparm_offset") or 0)
+            except ValueError:
+                raise EmulatorError(
+                    400,
+                    f"Invalid sysparm_limit or sysparm_offset: {params.get('sysparm_limit')!r}, "
+                    f"{params.get('sysparm_offset')!r}",
+                )
+            try:
+                records = self.query(
+                    table, params.get("sysparm_query", ""), limit=limit, offset=offset
+                )
+            except ValueError as e:
+                raise EmulatorError(400, str(e))
+            return 200, {"result": [self._present(table, r, params, base_url) for r in records]}
+        if sys_id is None:
+            raise EmulatorError(405, f"Method {method} requires a sys_id")
+
+        if method == "GET":
+            record = self.get(table, sys_id)
+        elif method in ("PUT", "PATCH"):
+            record = self.update(table, sys_id, self._parse_input(table, body, params), user=user)
+        elif method == "DELETE":
+            record = {} if self.delete(table, sys_id) else None
+        else:
+            raise EmulatorError(405, f"Method {method} is not supported")
+        if record is None:
+            raise EmulatorError(404, "No Record found")
+        if method == "DELETE":
+            return 204, None
+        return 200, {"result": self._present(table, record, params, base_url)}
+
+    def _handle_batch(self, batch: dict, user: str, base_url: str) -> dict:
+        serviced = []
+        for rest_request in batch["rest_requests"]:
+            url = urlparse(rest_request["url"])
+            body = rest_request.get("body")
+            status, response = self.handle(
+                rest_request["method"],
+                url.path,
+                dict(parse_qsl(url.query, keep_blank_values=True)),
+                json.loads(base64.b64decode(body)) if body else None,
+                user=user,
+                base_url=base_url,
+            )
+            serviced.append(
+                {
+                    "id": rest_request["id"],
+                    "status_code": status,
+                    "headers": [{"name": "Content-Type", "value": "application/json"}],
+                    "body": (
+                        base64.b64encode(json.dumps(response).encode()).decode()
+                        if response is not None
+                        else ""
+                    ),
+                }
+            )
+        return {
+            "batch_request_id": batch.get("batch_request_id"),
+            "serviced_requests": serviced,
+            "unserviced_requests": [],
+        }
+
+    def dispatch(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        authorization: Optional[str],
+        base_url: str,
+    ) -> tuple[int, bytes, str]:
+        """
+        Serve an HTTP request
+
+        Returns:
+        --------
+        (int, bytes, str)
+            The status code, body and content type of the response
+
+        """
+        url = urlparse(url)
+        if url.path.rstrip("/") == "":
+            # Home page, used to check that the instance is reachable and awake
+            return 200, b"<html><body>ServiceNow emulator</body></html>", "text/html"
+
+        user = self.authenticate(authorization)
+        if user is None:
+            status, response = 401, {
+                "error": {
+                    "message": "User Not Authenticated",
+                    "detail": "Required to provide Auth information",
+                },
+                "status": "failure",
+            }
+        else:
+            try:
+                body = json.loads(body) if body else None
+            except ValueError:
+                status, response = 400, {
+                    "error": {"message": "Invalid JSON body"},
+                    "status": "failure",
+                }
+            else:
+                params = dict(parse_qsl(url.query, keep_blank_values=True))
+                status, response = self.handle(
+                    method, url.path, params, body, user=user, base_url=base_url
+                )
+        payload = json.dumps(response).encode() if response is not None else b""
+        return status, payload, "application/json"
+
+    @contextmanager
+    def serve(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        Serve the emulator on localhost (in a background thread)
+
+        Yields:
+        -------
+        str
+            The URL of the emulator
+
+        """
+        server = make_server(self, host, port)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            yield server.url
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @contextmanager
+    def mount(self, snow_url: str = SNOW_EMULATOR_URL):
+        """
+        Route the REST calls made to a URL to the emulator, without any network access
+
+        Yields:
+        -------
+        SNowInstance
+            An instance (with the admin credentials) whose REST calls are served by the emulator
+
+        Notes:
+        ------
+        The emulator is mounted on the pooled HTTP session of the URL (see instance.get_http_session), so it
+        is unmounted if the pooled sessions are closed.
+
+        """
+        snow_url = snow_url.rstrip("/")
+        session = get_http_session(snow_url)
+        session.mount(snow_url, EmulatorAdapter(self, snow_url))
+        try:
+            yield SNowInstance(snow_url=snow_url, snow_credentials=tuple(self.credentials))
+        finally:
+            session.adapters.pop(snow_url, None)
+
+
+class EmulatorAdapter(BaseAdapter):
+    """
+    Transport adapter for requests that serves calls with an emulator instead of sending them over the network
+
+    """
+
+    def __init__(self, emulator: SNowEmulator, base_url: str) -> None:
+        super().__init__()
+        self.emulator = emulator
+        self.base_url = base_url
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        body = request.body.encode() if isinstance(request.body, str) else request.body
+        status, payload, content_type = self.emulator.dispatch(
+            request.method,
+            request.url,
+            body,
+            request.headers.get("Authorization"),
+            base_url=self.base_url,
+        )
+        response = Response()
+        response.status_code = status
+        response.reason = "OK" if status < 400 else "Error"
+        response.headers = CaseInsensitiveDict(
+            {"Content-Type": content_type, "Content-Length": str(len(payload))}
+        )
+        response._content = payload
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+def make_server(
+    emulator: SNowEmulator, host: str = "127.0.0.1", port: int = 0
+) -> ThreadingHTTPServer:
+    """
+    Create an HTTP server for an emulator (call serve_forever to start it)
+
+    The URL of the emulator is available as the `url` attribute of the server.
+
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def _handle(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            status, payload, content_type = emulator.dispatch(
+                self.command,
+                self.path,
+                self.rfile.read(length) if length else None,
+                self.headers.get("Authorization"),
+                base_url=server.url,
+            )
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.url = f"http://{host}:{server.server_port}"
+    return server
+
+
+def main():
+    """
+    Entrypoint for the emulator CLI command
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve a local emulator of the ServiceNow REST APIs used by WorkArena."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Host to listen on.")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on.")
+    parser.add_argument(
+        "--db",
+        default=":memory:",
+        help="SQLite database in which records are stored (default: in memory). Existing databases are reused.",
+    )
+    parser.add_argument(
+        "--seed",
+        nargs="*",
+        default=[],
+        help='JSON files of the form {"tables": {<table>: [<record>, ...]}, "ui_meta": {<table>: <columns>}} '
+        "to load at startup.",
+    )
+    parser.add_argument(
+        "--admin-password", default="admin", help="Password of the admin user (default: admin)."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    emulator = SNowEmulator(database=args.db, credentials=("admin", args.admin_password))
+    for path in args.seed:
+        with open(path, "r") as f:
+            seed = json.load(f)
+        for table, columns in seed.get("ui_meta", {}).items():
+            emulator.set_ui_meta(table, columns)
+        for table, records in seed.get("tables", {}).items():
+            emulator.insert_many(table, records)
+        logging.info(f"Loaded {path}")
+
+    server = make_server(emulator, args.host, args.port)
+    logging.info(f"ServiceNow emulator listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,278 @@
+"""
+Parser for ServiceNow encoded queries (e.g., "active=true^priority=1^ORpriority=2^NQnameLIKEabc^ORDERBYnumber")
+
+An encoded query is parsed to an EncodedQuery, whose `groups` are alternatives separated by ^NQ. Each group is a
+conjunction (^) of clauses, and each clause is a disjunction (^OR) of conditions. For instance,
+"a=1^b=2^ORb=3^NQc=4" is parsed as ((a=1 AND (b=2 OR b=3)) OR c=4).
+
+Parsed queries are immutable and cached by query string. They can be compared structurally (see
+normalize_encoded_query) and evaluated against rows that were already fetched (see evaluate_encoded_query).
+
+"""
+
+import itertools
+import re
+
+from functools import lru_cache
+from typing import NamedTuple
+
+from .config import SNOW_ENCODED_QUERY_CACHE_SIZE
+
+
+# Operators whose name is made of letters, longest first so that prefixes (e.g., IN of ISEMPTY) do not shadow them
+WORD_OPERATORS = [
+    "ISNOTEMPTY",
+    "EMPTYSTRING",
+    "STARTSWITH",
+    "NOT LIKE",
+    "ENDSWITH",
+    "ANYTHING",
+    "ISEMPTY",
+    "BETWEEN",
+    "NSAMEAS",
+    "NOT IN",
+    "SAMEAS",
+    "NOTON",
+    "LIKE",
+    "IN",
+    "ON",
+]
+SYMBOL_OPERATORS = ["!=", ">=", "<=", "=", ">", "<"]
+# Operators that do not take a value
+UNARY_OPERATORS = ["ISEMPTY", "ISNOTEMPTY", "EMPTYSTRING", "ANYTHING"]
+
+_CONDITION = re.compile(
+    r"^([a-z0-9_.]+)("
+    + "|".join(re.escape(op) for op in SYMBOL_OPERATORS + WORD_OPERATORS)
+    + r")(.*)$",
+    re.DOTALL,
+)
+# Carets in values are escaped by doubling them
+_ESCAPED_CARET = "\x00"
+
+
+class Condition(NamedTuple):
+    """
+    A condition on a field (e.g., "priority=1" or "assigned_to.nameLIKEbeth")
+
+    """
+
+    field: str
+    operator: str
+    value: str = ""
+
+    def __str__(self) -> str:
+        return f"{self.field}{self.operator}{self.value.replace('^', '^^')}"
+
+
+class EncodedQuery(NamedTuple):
+    """
+    A parsed encoded query
+
+    Attributes:
+    -----------
+    groups: tuple[tuple[tuple[Condition]]]
+        The alternatives (separated by ^NQ) of the query. Each alternative is a tuple of clauses that must all be
+        satisfied, and each clause is a tuple of conditions of which at least one must be satisfied.
+    order_by: tuple[tuple[str, bool]]
+        The fields to sort the results by, with whether they are sorted in descending order
+
+    """
+
+    groups: tuple
+    order_by: tuple = ()
+
+    @property
+    def conditions(self) -> list[Condition]:
+        """
+        All the conditions of the query, in order
+
+        """
+        return [c for group in self.groups for clause in group for c in clause]
+
+    def __str__(self) -> str:
+        parts = [
+            "^NQ".join(
+                "^".join("^OR".join(map(str, clause)) for clause in group) for group in self.groups
+            )
+        ]
+        parts += [
+            f"ORDERBYDESC{field}" if desc else f"ORDERBY{field}" for field, desc in self.order_by
+        ]
+        return "^".join(p for p in parts if p)
+
+
+def parse_condition(condition: str) -> Condition:
+    """
+    Parse a single condition of an encoded query (e.g., "priority=1")
+
+    """
+    match = _CONDITION.match(condition)
+    if match is None:
+        raise ValueError(f"Invalid encoded query condition: {condition!r}.")
+    field, operator, value = match.groups()
+    if operator in UNARY_OPERATORS and value:
+        raise ValueError(f"Operator {operator} does not take a value: {condition!r}.")
+    return Condition(field, operator, value.replace(_ESCAPED_CARET, "^"))
+
+
+@lru_cache(maxsize=SNOW_ENCODED_QUERY_CACHE_SIZE)
+def parse_encoded_query(query: str) -> EncodedQuery:
+    """
+    Parse an encoded query (results are cached by query string)
+
+    Parameters:
+    -----------
+    query: str
+        The encoded query (e.g., the sysparm_query of a Table API call or of a list URL)
+
+    Returns:
+    --------
+    EncodedQuery
+        The parsed query. Ordering terms (ORDERBY, ORDERBYDESC) are extracted to `order_by`, while the end of
+        query marker (EQ) and grouping terms (GROUPBY) are ignored.
+
+    """
+    groups = []
+    order_by = []
+    for group_query in query.replace("^^", _ESCAPED_CARET).split("^NQ"):
+        group = []
+        for term in group_query.split("^"):
+            if term in ("", "EQ") or term.startswith("GROUPBY"):
+                continue
+            if term.startswith("ORDERBYDESC"):
+                order_by.append((term[len("ORDERBYDESC") :], True))
+            elif term.startswith("ORDERBY"):
+                order_by.append((term[len("ORDERBY") :], False))
+            elif term.startswith("OR"):
+                condition = parse_condition(term[len("OR") :])
+                if group:
+                    group[-1].append(condition)
+                else:
+                    group.append([condition])
+            else:
+                group.append([parse_condition(term)])
+        if group:
+            groups.append(tuple(tuple(clause) for clause in group))
+    return EncodedQuery(tuple(groups), tuple(order_by))
+
+
+def _normalize_condition(condition: Condition) -> Condition:
+    field, operator, value = condition.field, condition.operator, condition.value.strip()
+    if operator in ("EMPTYSTRING", "ISEMPTY") or (operator == "=" and value == ""):
+        return Condition(field, "ISEMPTY")
+    if operator in ("IN", "NOT IN"):
+        value = ",".join(sorted({v.strip() for v in value.split(",")}))
+    return Condition(field, operator, value)
+
+
+@lru_cache(maxsize=SNOW_ENCODED_QUERY_CACHE_SIZE)
+def normalize_encoded_query(query: str) -> EncodedQuery:
+    """
+    Normalize an encoded query, so that equivalent queries have the same normal form
+
+    The filter is rewritten in disjunctive normal form: each group of the normalized query is a conjunction of
+    single conditions (e.g., "a=1^b=2^ORb=3" becomes "a=1^b=2^NQa=1^b=3"). Conditions, groups and values of IN
+    conditions are sorted and deduplicated, values are stripped, and empty checks (ISEMPTY, EMPTYSTRING and "="
+    with an empty value, which lists display identically) are all normalized to ISEMPTY. The order of the ORDERBY
+    terms is kept.
+
+    """
+    parsed = parse_encoded_query(query)
+    conjunctions = set()
+    for group in parsed.groups:
+        for conditions in itertools.product(*group):
+            conjunctions.add(tuple(sorted(set(map(_normalize_condition, conditions)))))
+    groups = tuple(tuple((c,) for c in conjunction) for conjunction in sorted(conjunctions))
+    return EncodedQuery(groups, parsed.order_by)
+
+
+def encoded_queries_equivalent(query: str, other_query: str) -> bool:
+    """
+    Check if two encoded queries have the same normal form (see normalize_encoded_query)
+
+    """
+    return normalize_encoded_query(query) == normalize_encoded_query(other_query)
+
+
+def _evaluate_condition(condition: Condition, row: dict) -> bool:
+    value = str(row.get(condition.field) or "")
+    operator = condition.operator
+    if operator in ("ISEMPTY", "EMPTYSTRING"):
+        return value == ""
+    if operator == "ISNOTEMPTY":
+        return value != ""
+    if operator == "ANYTHING":
+        return True
+    if condition.value.startswith("javascript:"):
+        raise ValueError(f"Condition {condition} cannot be evaluated locally.")
+
+    # String comparisons are case-insensitive, like in the databases of ServiceNow instances
+    value, expected = value.lower(), condition.value.lower()
+    if operator == "=":
+        return value == expected
+    if operator == "!=":
+        return value != expected
+    if operator == "LIKE":
+        return expected in value
+    if operator == "NOT LIKE":
+        return expected not in value
+    if operator == "STARTSWITH":
+        return value.startswith(expected)
+    if operator == "ENDSWITH":
+        return value.endswith(expected)
+    if operator == "IN":
+        return value in expected.split(",")
+    if operator == "NOT IN":
+        return value not in expected.split(",")
+    if operator in (">", ">=", "<", "<="):
+        try:
+            value, expected = float(value), float(expected)
+        except ValueError:
+            if value == "":
+                return False
+        return {
+            ">": value > expected,
+            ">=": value >= expected,
+            "<": value < expected,
+            "<=": value <= expected,
+        }[operator]
+    raise ValueError(f"Operator {operator} cannot be evaluated locally.")
+
+
+def evaluate_encoded_query(query: str, rows: list[dict]) -> list[dict]:
+    """
+    Evaluate an encoded query against rows that were already fetched (e.g., the data of a list)
+
+    Parameters:
+    -----------
+    query: str
+        The encoded query
+    rows: list[dict]
+        The rows, as mappings between fields (including dot-walked fields) and values. Missing fields are empty.
+
+    Returns:
+    --------
+    list[dict]
+        The rows that match the query, sorted by its ORDERBY terms (the sort is stable)
+
+    Notes:
+    ------
+    Values are compared as they appear in the rows: compare display values to display values (e.g., the data
+    returned by _extract_list_info) and raw values to raw values. Date functions (javascript:...) are not supported.
+
+    """
+    parsed = parse_encoded_query(query)
+    matches = [
+        row
+        for row in rows
+        if not parsed.groups
+        or any(
+            all(any(_evaluate_condition(c, row) for c in clause) for clause in group)
+            for group in parsed.groups
+        )
+    ]
+    # Sort by the last term first, so that the first term has precedence
+    for field, descending in reversed(parsed.order_by):
+        matches.sort(key=lambda row: str(row.get(field) or "").lower(), reverse=descending)
+    return matches
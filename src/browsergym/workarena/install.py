@@ -1,15 +1,17 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import html
 import json
 import logging
 import re
 import tenacity
+import time
+import weakref
 
 from datetime import datetime
 from playwright.sync_api import (
-    sync_playwright,
     TimeoutError as PlaywrightTimeoutError,
     Error as PlaywrightError,
 )
@@ -17,16 +19,22 @@ from tenacity import retry, stop_after_attempt, retry_if_exception_type
 from requests import HTTPError
 from time import sleep
 
+from .api import async_utils
+from .api.batch import batch_create_records, batch_delete_records
 from .api.system_properties import get_sys_property, set_sys_property
 from .api.ui_themes import get_workarena_theme_variants
 from .api.user import create_user
-from .api.utils import table_api_call, table_column_info
+from .api.utils import SNOW_API_HEADERS, table_api_call, table_column_info
+from .browser_pool import get_browser_pool
+from .config_store import ConfigView
 from .config import (
     # for knowledge base setup
     KB_FILEPATH,
+    KB_INTEGRITY_PROPERTY,
     KB_NAME,
     PROTOCOL_KB_FILEPATH,
     PROTOCOL_KB_NAME,
+    SNOW_KB_INTEGRITY_TTL,
     # For list setup
     EXPECTED_ASSET_LIST_COLUMNS_PATH,
     EXPECTED_CHANGE_REQUEST_COLUMNS_PATH,
@@ -56,7 +64,6 @@ from .config import (
 )
 from .api.user import set_user_preference
 from .instance import SNowInstance as _BaseSNowInstance
-from .utils import url_login
 
 
 # Common retry decorator for setup steps - retries on transient errors
@@ -174,11 +181,8 @@ def _install_update_set(path: str, name: str):
     Notes: requires interacting with the UI, so we use playwright instead of the API
 
     """
-    with sync_playwright() as playwright:
-        instance = SNowInstance()
-        browser = playwright.chromium.launch(headless=True, slow_mo=1000)
-        page = browser.new_page()
-        url_login(instance, page)
+    instance = SNowInstance()
+    with get_browser_pool().page(instance) as page:
 
         # Navigate to the update set upload page and upload all update sets
         logging.info("Uploading update set...")
@@ -214,8 +218,6 @@ def _install_update_set(path: str, name: str):
         page.locator("button:has-text('Commit Update Set')").first.click()
         page.wait_for_selector("text=Succeeded")
 
-        browser.close()
-
 
 def check_knowledge_base(
     instance: SNowInstance, kb_name: str, kb_data: dict, disable_commenting: bool = True
@@ -308,6 +310,154 @@ def check_knowledge_base(
     )
 
 
+# Settings of a knowledge base that are checked by check_knowledge_base
+_KB_SETTINGS = [
+    "disable_commenting",
+    "disable_mark_as_helpful",
+    "disable_rating",
+    "disable_suggesting",
+    "disable_category_editing",
+]
+
+# Knowledge bases found to be intact, indexed by (instance URL, KB name, content hash, disable_commenting)
+_KB_VERDICTS = {}
+
+
+# Content hashes of the knowledge base data loaded from config files (a view is loaded once per process and file)
+_KB_CONTENT_HASHES = weakref.WeakKeyDictionary()
+
+
+def _get_knowledge_base_content_hash(kb_data: list) -> str:
+    if isinstance(kb_data, ConfigView) and kb_data in _KB_CONTENT_HASHES:
+        return _KB_CONTENT_HASHES[kb_data]
+    content_hash = hashlib.sha256(json.dumps(list(kb_data), sort_keys=True).encode()).hexdigest()
+    if isinstance(kb_data, ConfigView):
+        _KB_CONTENT_HASHES[kb_data] = content_hash
+    return content_hash
+
+
+def _get_knowledge_base_fingerprint(instance: SNowInstance, kb_name: str) -> dict | None:
+    """
+    Get a summary of the state of a knowledge base that changes whenever it is modified, without downloading
+    its articles (settings, number of articles and last update time)
+
+    """
+    kb = table_api_call(
+        instance=instance,
+        table="kb_knowledge_base",
+        params={
+            "sysparm_query": f"title={kb_name}",
+            "sysparm_fields": ",".join(["sys_id"] + _KB_SETTINGS),
+        },
+    )["result"]
+    if len(kb) != 1:
+        return None
+
+    # Count the articles and get their last update time with the Aggregate API, so that the cost of the
+    # fingerprint does not grow with the size of the knowledge base
+    response = instance.session.get(
+        url=instance.snow_url + "/api/now/stats/kb_knowledge",
+        auth=instance.snow_credentials,
+        headers=SNOW_API_HEADERS,
+        params={
+            "sysparm_query": f"kb_knowledge_base={kb[0]['sys_id']}",
+            "sysparm_count": "true",
+            "sysparm_max_fields": "sys_updated_on",
+        },
+    )
+    response.raise_for_status()
+    stats = response.json()["result"]["stats"]
+    return {
+        "kb_sys_id": kb[0]["sys_id"],
+        "settings": {setting: kb[0][setting] for setting in _KB_SETTINGS},
+        "article_count": int(stats["count"]),
+        "last_updated_on": stats.get("max", {}).get("sys_updated_on") or "",
+    }
+
+
+def _get_recorded_knowledge_base_verdicts(instance: SNowInstance) -> dict:
+    try:
+        return json.loads(get_sys_property(instance=instance, property_name=KB_INTEGRITY_PROPERTY))
+    except (IndexError, ValueError, HTTPError):
+        # The property does not exist or cannot be read by this user
+        return {}
+
+
+def record_knowledge_base_integrity(
+    instance: SNowInstance, kb_name: str, kb_data: list, disable_commenting: bool = True
+):
+    """
+    Record in the instance that a knowledge base was verified to be intact, so that tasks can trust this verdict
+    as long as the knowledge base is not modified (see check_knowledge_base_cached).
+
+    Parameters:
+    -----------
+    instance: SNowInstance
+        The ServiceNow instance that contains the knowledge base
+    kb_name: str
+        The name of the knowledge base
+    kb_data: list
+        The knowledge base data that was checked
+    disable_commenting: bool
+        Whether the knowledge base was checked for disabled commenting
+
+    """
+    verdicts = _get_recorded_knowledge_base_verdicts(instance)
+    verdicts[kb_name] = {
+        "content_hash": _get_knowledge_base_content_hash(kb_data),
+        "disable_commenting": disable_commenting,
+        "fingerprint": _get_knowledge_base_fingerprint(instance, kb_name),
+    }
+    set_sys_property(
+        instance=instance, property_name=KB_INTEGRITY_PROPERTY, value=json.dumps(verdicts)
+    )
+
+
+def check_knowledge_base_cached(
+    instance: SNowInstance, kb_name: str, kb_data: list, disable_commenting: bool = True
+):
+    """
+    Same as check_knowledge_base, but reuses previous verdicts that the knowledge base is intact.
+
+    A verdict is trusted without contacting the instance for SNOW_KB_INTEGRITY_TTL seconds. After that, or for
+    verdicts recorded at install time, it is revalidated by checking that the settings, number of articles and
+    last update time of the knowledge base are unchanged. The full check is only done if they changed.
+
+    """
+    key = (
+        instance.snow_url.rstrip("/"),
+        kb_name,
+        _get_knowledge_base_content_hash(kb_data),
+        disable_commenting,
+    )
+    verdict = _KB_VERDICTS.get(key)
+    if verdict is not None and time.time() - verdict["checked_at"] < SNOW_KB_INTEGRITY_TTL:
+        return verdict["fingerprint"]["kb_sys_id"], False, False
+
+    fingerprint = _get_knowledge_base_fingerprint(instance, kb_name)
+    if fingerprint is not None:
+        if verdict is None:
+            recorded = _get_recorded_knowledge_base_verdicts(instance).get(kb_name, {})
+            if (
+                recorded.get("content_hash") == key[2]
+                and recorded.get("disable_commenting") == disable_commenting
+            ):
+                verdict = recorded
+        if verdict is not None and verdict["fingerprint"] == fingerprint:
+            _KB_VERDICTS[key] = {"fingerprint": fingerprint, "checked_at": time.time()}
+            return fingerprint["kb_sys_id"], False, False
+
+    kb_id, requires_install, requires_delete = check_knowledge_base(
+        instance=instance, kb_name=kb_name, kb_data=kb_data, disable_commenting=disable_commenting
+    )
+    # Verdicts are only cached with a fingerprint, which they are revalidated against
+    if requires_install or requires_delete or fingerprint is None:
+        _KB_VERDICTS.pop(key, None)
+    else:
+        _KB_VERDICTS[key] = {"fingerprint": fingerprint, "checked_at": time.time()}
+    return kb_id, requires_install, requires_delete
+
+
 def delete_knowledge_base(instance: SNowInstance, kb_id: str, kb_name: str):
     """
     Delete a knowledge base from the instance.
@@ -323,8 +473,9 @@ def delete_knowledge_base(instance: SNowInstance, kb_id: str, kb_name: str):
 
     # Delete the knowledge base
     logging.info(f"Knowledge base {kb_name}: deleting knowledge base content")
-    for a_ in articles:
-        table_api_call(instance=instance, table=f"kb_knowledge/{a_['sys_id']}", method="DELETE")
+    batch_delete_records(
+        instance=instance, table="kb_knowledge", sys_ids=[a_["sys_id"] for a_ in articles]
+    )
 
     # Rename the KB and set active=False (ServiceNow prevents deletion)
     logging.info(f"Knowledge base {kb_name}: archiving knowledge base")
@@ -460,6 +611,14 @@ def setup_knowledge_bases():
         if not requires_delete and not requires_install:
             logging.info(f"Knowledge base {kb_name} is already installed.")
 
+            # Record the verdict so that tasks do not need to download the knowledge base to check it
+            record_knowledge_base_integrity(
+                instance=instance,
+                kb_name=kb_name,
+                kb_data=kb_data,
+                disable_commenting=disable_commenting,
+            )
+
 
 @retry_on_transient_error
 def setup_workflows():
@@ -566,21 +725,24 @@ def display_all_expected_columns(
 
     # Delete all columns in the default view
     logging.info(f"...... Deleting existing columns for default view of list {list_name}...")
-    for column in columns:
-        table_api_call(
-            instance=instance, table=f"sys_ui_list_element/{column['sys_id']}", method="DELETE"
-        )
+    batch_delete_records(
+        instance=instance,
+        table="sys_ui_list_element",
+        sys_ids=[column["sys_id"] for column in columns],
+    )
 
     # Add all expected columns to the default view
     logging.info(f"...... Adding expected columns to default view of list {list_name}...")
-    for i, column in enumerate(expected_columns):
+    for column in expected_columns:
         logging.info(f"......... {column}")
-        table_api_call(
-            instance=instance,
-            table="sys_ui_list_element",
-            method="POST",
-            data=json.dumps({"list_id": default_view["sys_id"], "element": column, "position": i}),
-        )
+    batch_create_records(
+        instance=instance,
+        table="sys_ui_list_element",
+        records=[
+            {"list_id": default_view["sys_id"], "element": column, "position": i}
+            for i, column in enumerate(expected_columns)
+        ],
+    )
     logging.info(f"...... Done.")
 
 
@@ -605,10 +767,7 @@ def check_all_columns_displayed(
     bool: True if all expected columns are displayed, False otherwise.
 
     """
-    with sync_playwright() as playwright:
-        browser = playwright.chromium.launch(headless=True, slow_mo=1000)
-        page = browser.new_page()
-        url_login(instance, page)
+    with get_browser_pool().page(instance) as page:
         page.goto(instance.snow_url + url)
         iframe = page.wait_for_selector("iframe#gsft_main").content_frame()
         # Wait for gsft_main.GlideList2 to be available
@@ -723,10 +882,7 @@ def setup_list_columns():
 )
 def process_form_fields(instance: SNowInstance, url: str, expected_fields: list[str], action: str):
     """Process form fields based on the given action."""
-    with sync_playwright() as playwright:
-        browser = playwright.chromium.launch(headless=True, slow_mo=1000)
-        page = browser.new_page()
-        url_login(instance, page)
+    with get_browser_pool().page(instance) as page:
         page.goto(instance.snow_url + url)
         frame = page.wait_for_selector("iframe#gsft_main").content_frame()
         page.wait_for_function("typeof gsft_main.GlideList2 !== 'undefined'")
@@ -1239,7 +1395,7 @@ def patch_report_filters(fresh: bool = False):
         },
     )["result"]
 
-    for i, report in enumerate(reports):
+    def _process_report(instance, i, report):
         logging.info(f"Processing report {i + 1}/{len(reports)}: {report['title']}")
         try:
             _patch_single_report(instance, report, report_date_filter, report_time_filter)
@@ -1258,6 +1414,14 @@ def patch_report_filters(fresh: bool = False):
             except:
                 logging.error(f"...... could not delete.")
 
+    # Reports are independent, so we patch them concurrently
+    async_utils.gather_sync(
+        *[
+            async_utils.call_async(_process_report, instance, i, report)
+            for i, report in enumerate(reports)
+        ]
+    )
+
 
 def run_step(step_name: str, step_func, resume: bool = True, **kwargs):
     """
@@ -4,12 +4,17 @@ import logging
 import os
 import random
 import requests
+import threading
+import time
+import weakref
+from http.cookiejar import DefaultCookiePolicy
 from itertools import cycle
 
 from huggingface_hub import hf_hub_download
 from huggingface_hub.utils import disable_progress_bars
-from playwright.sync_api import sync_playwright
+from requests.adapters import HTTPAdapter
 from typing import Optional
+from urllib3.util.retry import Retry
 
 from .config import (
     INSTANCE_REPO_FILENAME,
@@ -17,7 +22,11 @@ from .config import (
     INSTANCE_REPO_TYPE,
     INSTANCE_XOR_SEED,
     REPORT_FILTER_PROPERTY,
+    SNOW_API_MAX_RETRIES,
+    SNOW_API_POOL_SIZE,
+    SNOW_API_RETRY_BACKOFF,
     SNOW_BROWSER_TIMEOUT,
+    SNOW_INSTANCE_SCHEDULER_ENABLED,
 )
 
 
@@ -95,6 +104,97 @@ def fetch_instances(filename: str = None):
     return entries
 
 
+# Pooled HTTP sessions, shared by all SNowInstance objects that point to the same URL in a process
+_HTTP_SESSIONS = {}
+_HTTP_SESSIONS_LOCK = threading.Lock()
+
+
+def _create_http_session(pool_size: int, max_retries: int) -> requests.Session:
+    """
+    Create a keep-alive HTTP session with a bounded connection pool and retries on connection errors
+
+    """
+    session = requests.Session()
+
+    # Never persist cookies: the session is shared by users with different credentials, so each
+    # request must authenticate on its own (as it did with module-level requests calls).
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+    # Retry on connection errors (e.g., a pooled connection reset by the instance). Read errors are
+    # only retried for idempotent methods to avoid creating duplicate records.
+    retries = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=0,
+        backoff_factor=SNOW_API_RETRY_BACKOFF,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session(
+    snow_url: str,
+    pool_size: int = SNOW_API_POOL_SIZE,
+    max_retries: int = SNOW_API_MAX_RETRIES,
+) -> requests.Session:
+    """
+    Get the pooled HTTP session used to talk to a ServiceNow instance
+
+    Parameters:
+    -----------
+    snow_url: str
+        The URL of the ServiceNow instance
+    pool_size: int
+        The maximum number of keep-alive connections to keep open (only used when the session is created)
+    max_retries: int
+        The number of retries on connection errors (only used when the session is created)
+
+    Returns:
+    --------
+    requests.Session
+        A session shared by all callers in the current process. Thread-safe since it keeps no cookies.
+
+    Notes:
+    ------
+    Sessions are re-created after a fork, since pooled connections cannot be shared across processes.
+
+    """
+    key = (os.getpid(), snow_url.rstrip("/"))
+    with _HTTP_SESSIONS_LOCK:
+        session = _HTTP_SESSIONS.get(key)
+        if session is None:
+            session = _create_http_session(pool_size=pool_size, max_retries=max_retries)
+            _HTTP_SESSIONS[key] = session
+    return session
+
+
+def close_http_sessions() -> None:
+    """
+    Close all pooled HTTP sessions (and their keep-alive connections) opened by this process
+
+    """
+    with _HTTP_SESSIONS_LOCK:
+        for session in _HTTP_SESSIONS.values():
+            session.close()
+        _HTTP_SESSIONS.clear()
+
+
+# Finalizers that release the leases of the instances of the pool, by lease id (see SNowInstance.release)
+_LEASE_FINALIZERS = {}
+
+
+def _release_lease(lease_id: str) -> None:
+    # XXX: Need to include the import here to avoid circular imports
+    from .instance_scheduler import get_instance_scheduler
+
+    _LEASE_FINALIZERS.pop(lease_id, None)
+    get_instance_scheduler().release(lease_id)
+
+
 class SNowInstance:
     """
     Utility class to access a ServiceNow instance.
@@ -113,7 +213,8 @@ class SNowInstance:
         -----------
         snow_url: str
             The URL of a SNow instance. When omitted, the constructor first looks for SNOW_INSTANCE_URL and falls back
-            to a random instance from the benchmark's instance pool if the environment variable is not set.
+            to a random instance from the benchmark's instance pool if the environment variable is not set (the
+            least-loaded one, leased through the instance scheduler, if WORKARENA_INSTANCE_SCHEDULER=1).
         snow_credentials: (str, str)
             The username and password used to access the SNow instance. When omitted, environment variables
             SNOW_INSTANCE_UNAME/SNOW_INSTANCE_PWD are used if set; otherwise, a random instance from the benchmark's
@@ -142,6 +243,10 @@ class SNowInstance:
                     raise ValueError(
                         f"No instances found in the dataset {INSTANCE_REPO_ID}. Please provide instance details via parameters or environment variables."
                     )
+                # Lease the least-loaded instance if scheduling is enabled (WORKARENA_INSTANCE_SCHEDULER=1)
+                if SNOW_INSTANCE_SCHEDULER_ENABLED:
+                    self._lease_from_pool(instances)
+                    return
                 instance = random.choice(instances)
                 snow_url = instance["url"]
                 snow_credentials = ("admin", instance["password"])
@@ -149,8 +254,67 @@ class SNowInstance:
         # remove trailing slashes in the URL, if any
         self.snow_url = snow_url.rstrip("/")
         self.snow_credentials = snow_credentials
+        self.lease_id = None
         self.check_status()
 
+    def _lease_from_pool(self, instances: list[dict]) -> None:
+        """
+        Lease an instance of the pool through the instance scheduler (see instance_scheduler.py)
+
+        Parameters:
+        -----------
+        instances: list[dict]
+            The instances of the pool (see fetch_instances)
+
+        """
+        # XXX: Need to include the import here to avoid circular imports
+        from .instance_scheduler import get_instance_scheduler
+
+        scheduler = get_instance_scheduler()
+        for _ in range(len(instances)):
+            lease_id, instance = scheduler.lease(instances)
+            self.lease_id = lease_id
+            # Release the lease if the instance is garbage collected (or on exit) without being released
+            _LEASE_FINALIZERS[lease_id] = weakref.finalize(self, _release_lease, lease_id)
+            self.snow_url = instance["url"].rstrip("/")
+            self.snow_credentials = ("admin", instance["password"])
+            start = time.time()
+            try:
+                self.check_status()
+            except Exception as e:
+                self.release()
+                if not isinstance(e, RuntimeError):
+                    raise
+                # Avoid the unreachable or hibernating instance for a while and try the next least-loaded one
+                scheduler.report(self.snow_url, healthy=False)
+                logging.warning(f"{e} Leasing another instance of the pool.")
+                error = e
+                continue
+            scheduler.report(self.snow_url, latency=time.time() - start)
+            return
+        raise error
+
+    def release(self) -> None:
+        """
+        Release the lease of an instance of the pool, if any, so that other episodes can run on it
+
+        """
+        if self.lease_id is None:
+            return
+        lease_id, self.lease_id = self.lease_id, None
+        # Copies of the instance share the lease: only release it if it was not released yet
+        finalizer = _LEASE_FINALIZERS.pop(lease_id, None)
+        if finalizer is not None and finalizer.detach() is not None:
+            _release_lease(lease_id)
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        The pooled HTTP session used for all REST calls to this instance
+
+        """
+        return get_http_session(self.snow_url)
+
     def check_status(self):
         """
         Check the status of the ServiceNow instance. Raises an error if the instance is not ready to be used.
@@ -164,7 +328,7 @@ class SNowInstance:
         Test that the ServiceNow instance is not hibernating
 
         """
-        response = requests.get(self.snow_url, timeout=SNOW_BROWSER_TIMEOUT)
+        response = self.session.get(self.snow_url, timeout=SNOW_BROWSER_TIMEOUT)
 
         # Check if the response contains any indication of the instance being in hibernation
         if "hibernating" in response.text.lower():
@@ -178,7 +342,7 @@ class SNowInstance:
 
         """
         try:
-            requests.get(self.snow_url, timeout=SNOW_BROWSER_TIMEOUT)
+            self.session.get(self.snow_url, timeout=SNOW_BROWSER_TIMEOUT)
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             raise RuntimeError(
                 f"ServiceNow instance at {self.snow_url} is not reachable. Please check the URL."
@@ -196,16 +360,15 @@ class SNowInstance:
 
         """
         # XXX: Need to include the import here to avoid circular imports
+        from .browser_pool import get_browser_pool
         from .utils import ui_login
 
         keys = ["build name", "build date", "build tag", "connected to cluster node"]
 
         # We need to use playwright since the page is loaded dynamically
         # and its source doesn't contain the information we need
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.launch(headless=True)
-            page = browser.new_page()
-            ui_login(self, page)
+        # Without slow_mo, which would slow down the login and the page load for no benefit
+        with get_browser_pool(slow_mo=0).page(self, login=ui_login) as page:
             page.goto(self.snow_url + "/stats.do")
 
             # The page contains a big list of information separated by <br> tags. Extract it.
@@ -216,7 +379,6 @@ class SNowInstance:
                 for key, value in [x.split(":", 1)]
                 if key in keys
             }
-            browser.close()
 
         return release_info
 
@@ -0,0 +1,263 @@
+"""
+Load-aware scheduler of the instances of the benchmark's instance pool
+
+Instead of picking an instance of the pool at random, each episode leases the least-loaded healthy instance: the
+one with the fewest episodes in flight, then the lowest recent latency. An instance never runs more than
+SNOW_INSTANCE_MAX_CONCURRENCY episodes at once (new episodes wait for a lease to free up), and instances that are
+unreachable or hibernating are avoided for a while. The leases and latencies are recorded in a JSON state file
+protected by a file lock (as for the user pool), so that all the worker processes of a machine share them.
+
+Usage:
+------
+scheduler = get_instance_scheduler()
+lease_id, entry = scheduler.lease(fetch_instances())
+...
+scheduler.release(lease_id)
+
+Notes:
+------
+The scheduler is opt-in: set WORKARENA_INSTANCE_SCHEDULER=1 to enable it (otherwise, an instance of the pool is
+picked at random). SNowInstance() then leases its instance through the scheduler when it comes from the pool, and
+blocks while all the instances run SNOW_INSTANCE_MAX_CONCURRENCY episodes. The lease is released by
+SNowInstance.release (called on task teardown) or once the instance is garbage collected, and leases held by dead
+processes (or older than a TTL, for processes of other hosts) are reclaimed.
+
+"""
+
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+
+from contextlib import contextmanager
+from uuid import uuid4
+
+from .config import (
+    SNOW_INSTANCE_LATENCY_SMOOTHING,
+    SNOW_INSTANCE_LEASE_POLL,
+    SNOW_INSTANCE_LEASE_TTL,
+    SNOW_INSTANCE_LEASE_WAIT,
+    SNOW_INSTANCE_MAX_CONCURRENCY,
+    SNOW_INSTANCE_SCHEDULER_DIR,
+    SNOW_INSTANCE_UNHEALTHY_COOLDOWN,
+)
+from .locking import file_lock, lease_is_leaked
+
+
+class InstanceScheduler:
+    """
+    Leases of the instances of the pool, shared by all the processes of the machine
+
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = SNOW_INSTANCE_MAX_CONCURRENCY,
+        lease_ttl: float = SNOW_INSTANCE_LEASE_TTL,
+        unhealthy_cooldown: float = SNOW_INSTANCE_UNHEALTHY_COOLDOWN,
+        latency_smoothing: float = SNOW_INSTANCE_LATENCY_SMOOTHING,
+        state_dir: str = SNOW_INSTANCE_SCHEDULER_DIR,
+    ) -> None:
+        """
+        Parameters:
+        -----------
+        max_concurrency: int
+            The maximum number of episodes that run on an instance at once
+        lease_ttl: float
+            The number of seconds after which an unreleased lease of another host is considered leaked
+        unhealthy_cooldown: float
+            The number of seconds during which an unhealthy instance is avoided
+        latency_smoothing: float
+            The weight of the last latency in the moving average of the latency of an instance
+        state_dir: str
+            The directory where the state of the scheduler is recorded
+
+        """
+        self.max_concurrency = max_concurrency
+        self.lease_ttl = lease_ttl
+        self.unhealthy_cooldown = unhealthy_cooldown
+        self.latency_smoothing = latency_smoothing
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_path = os.path.join(state_dir, "instances.json")
+        self.lock_path = self.state_path + ".lock"
+
+    @contextmanager
+    def _state(self):
+        """
+        Lock the state of the scheduler and yield it. Changes to the state are saved on exit.
+
+        """
+        with file_lock(self.lock_path):
+            if os.path.exists(self.state_path):
+                with open(self.state_path, "r") as f:
+                    state = json.load(f)
+            else:
+                state = {"instances": {}}
+            self._reclaim(state)
+            yield state
+            tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def _instance_state(state: dict, url: str) -> dict:
+        return state["instances"].setdefault(
+            url.rstrip("/"), {"leases": {}, "latency": None, "unhealthy_until": 0}
+        )
+
+    def _is_leaked(self, lease: dict) -> bool:
+        return lease_is_leaked(lease, self.lease_ttl)
+
+    def _reclaim(self, state: dict) -> None:
+        for url, instance_state in state["instances"].items():
+            leaked = [
+                lease_id
+                for lease_id, lease in instance_state["leases"].items()
+                if self._is_leaked(lease)
+            ]
+            if leaked:
+                logging.info(f"Reclaiming {len(leaked)} leaked leases of {url}.")
+            for lease_id in leaked:
+                del instance_state["leases"][lease_id]
+
+    def _pick(self, state: dict, instances: list[dict]) -> dict:
+        """
+        Pick the least-loaded instance that is below its concurrency cap (None if all are at their cap)
+
+        """
+        now = time.time()
+        candidates = []
+        for entry in instances:
+            instance_state = self._instance_state(state, entry["url"])
+            in_flight = len(instance_state["leases"])
+            if in_flight >= self.max_concurrency:
+                continue
+            # Unhealthy instances are only used when no healthy instance is available
+            unhealthy = instance_state["unhealthy_until"] > now
+            latency = instance_state["latency"] if instance_state["latency"] is not None else 0
+            candidates.append(((unhealthy, in_flight, latency, random.random()), entry))
+        if not candidates:
+            return None
+        return min(candidates, key=lambda candidate: candidate[0])[1]
+
+    def lease(
+        self, instances: list[dict], timeout: float = SNOW_INSTANCE_LEASE_WAIT
+    ) -> tuple[str, dict]:
+        """
+        Lease the least-loaded healthy instance, waiting for one to be below its concurrency cap
+
+        Parameters:
+        -----------
+        instances: list[dict]
+            The instances of the pool (see fetch_instances)
+        timeout: float
+            The maximum number of seconds to wait for an instance
+
+        Returns:
+        --------
+        lease_id, entry
+            The id of the lease and the entry of the leased instance
+
+        """
+        if not instances:
+            raise ValueError("No instances to lease.")
+        deadline = time.time() + timeout
+        while True:
+            with self._state() as state:
+                entry = self._pick(state, instances)
+                if entry is not None:
+                    lease_id = str(uuid4())
+                    self._instance_state(state, entry["url"])["leases"][lease_id] = {
+                        "pid": os.getpid(),
+                        "host": socket.gethostname(),
+                        "leased_at": time.time(),
+                    }
+                    return lease_id, entry
+            if time.time() >= deadline:
+                raise RuntimeError(
+                    f"All the instances of the pool run {self.max_concurrency} episodes, no instance "
+                    f"was freed in {timeout} seconds (see SNOW_INSTANCE_MAX_CONCURRENCY)."
+                )
+            time.sleep(SNOW_INSTANCE_LEASE_POLL)
+
+    def release(self, lease_id: str) -> None:
+        """
+        Release a lease (releasing it again has no effect)
+
+        Parameters:
+        -----------
+        lease_id: str
+            The id of the lease
+
+        """
+        with self._state() as state:
+            for instance_state in state["instances"].values():
+                instance_state["leases"].pop(lease_id, None)
+
+    def report(self, url: str, latency: float = None, healthy: bool = True) -> None:
+        """
+        Report the latency or the health of an instance, as observed by an episode
+
+        Parameters:
+        -----------
+        url: str
+            The URL of the instance
+        latency: float
+            The duration of a request to the instance, in seconds
+        healthy: bool
+            False if the instance could not be used (e.g., unreachable or hibernating)
+
+        """
+        with self._state() as state:
+            instance_state = self._instance_state(state, url)
+            if latency is not None:
+                if instance_state["latency"] is None:
+                    instance_state["latency"] = latency
+                else:
+                    instance_state["latency"] += self.latency_smoothing * (
+                        latency - instance_state["latency"]
+                    )
+            if healthy:
+                instance_state["unhealthy_until"] = 0
+            else:
+                instance_state["unhealthy_until"] = time.time() + self.unhealthy_cooldown
+
+    def load(self) -> dict:
+        """
+        Get the load of the instances
+
+        Returns:
+        --------
+        dict
+            The number of episodes in flight, the recent latency (seconds) and the health of each instance, by URL
+
+        """
+        with self._state() as state:
+            return {
+                url: {
+                    "in_flight": len(instance_state["leases"]),
+                    "latency": instance_state["latency"],
+                    "healthy": instance_state["unhealthy_until"] <= time.time(),
+                }
+                for url, instance_state in state["instances"].items()
+            }
+
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_instance_scheduler() -> InstanceScheduler:
+    """
+    Get the instance scheduler of the process
+
+    """
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = InstanceScheduler()
+        return _SCHEDULER
@@ -0,0 +1,75 @@
+"""
+Locks and leases shared by all the processes of a machine (e.g., by the user pool and the instance scheduler)
+
+"""
+
+import os
+import socket
+import time
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive lock on a file (shared by all the processes of the machine)
+
+    """
+    with open(path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def process_is_alive(pid: int) -> bool:
+    """
+    Check if a process of the machine is alive
+
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def lease_is_leaked(lease: dict, ttl: float) -> bool:
+    """
+    Check if a lease was leaked, i.e., its process is dead or, for leases of other hosts (whose process can't be
+    checked), it is older than a TTL
+
+    Parameters:
+    -----------
+    lease: dict
+        The lease, with the process ("pid") and host ("host") that hold it and when it was taken ("leased_at")
+    ttl: float
+        The number of seconds after which a lease of another host is considered leaked
+
+    """
+    if lease["host"] == socket.gethostname():
+        return not process_is_alive(lease["pid"])
+    return time.time() - lease["leased_at"] > ttl
@@ -0,0 +1,213 @@
+"""
+Cache of authenticated ServiceNow sessions, to skip the login of new browser contexts
+
+Logging in (url_login or ui_login) takes one or two full page loads. Once a user has logged in, the cookies of the
+session and its CSRF token (g_ck) are kept in memory, by instance and user name. A new context of the same user
+receives the cookies instead of logging in again, after a cheap check of the session (a single REST call, made with
+the cookies and the CSRF token, that returns the current user of the session). Sessions that expired, were logged
+out or impersonate another user fail the check, and the user logs in again.
+
+Usage:
+------
+login_with_cache(instance, page)  # Instead of url_login(instance, page)
+
+Notes:
+------
+The sessions are kept in memory only (they are credentials) and are shared by all the contexts of a process.
+
+"""
+
+import logging
+import playwright.sync_api
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .config import SNOW_SESSION_CACHE_ENABLED, SNOW_SESSION_CACHE_SIZE, SNOW_SESSION_CACHE_TTL
+from .instance import SNowInstance
+from .utils import url_login
+
+
+def session_is_valid(page: playwright.sync_api.Page, instance: SNowInstance, token: str) -> bool:
+    """
+    Check that the session of a page's context is authenticated as the user of an instance
+
+    Parameters:
+    -----------
+    page: playwright.sync_api.Page
+        The page whose context holds the cookies of the session (its URL doesn't matter)
+    instance: SNowInstance
+        The instance and the user that the session should be authenticated as
+    token: str
+        The CSRF token of the session (g_ck), required by REST calls authenticated with cookies
+
+    """
+    try:
+        response = page.request.get(
+            f"{instance.snow_url}/api/now/table/sys_user",
+            params={
+                "sysparm_query": "sys_id=javascript:gs.getUserID()",
+                "sysparm_fields": "user_name",
+                "sysparm_limit": "1",
+            },
+            headers={"Accept": "application/json", "X-UserToken": token},
+            max_redirects=0,
+        )
+        if not response.ok:
+            return False
+        users = response.json().get("result", [])
+    except (playwright.sync_api.Error, ValueError):
+        return False
+    return [user.get("user_name") for user in users] == [instance.snow_credentials[0]]
+
+
+class SessionCache:
+    """
+    Authenticated sessions (cookies and CSRF token), by instance URL and user name
+
+    Parameters:
+    -----------
+    size: int
+        Maximum number of sessions kept (least recently used are dropped first)
+    ttl: float
+        Seconds after the login during which a session can be reused
+
+    """
+
+    def __init__(
+        self, size: int = SNOW_SESSION_CACHE_SIZE, ttl: float = SNOW_SESSION_CACHE_TTL
+    ) -> None:
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._sessions = OrderedDict()
+        # Number of sessions restored, rejected by the check and stored (i.e., real logins)
+        self.stats = {"hits": 0, "invalid": 0, "stores": 0}
+
+    @staticmethod
+    def _key(instance: SNowInstance) -> tuple:
+        return instance.snow_url.rstrip("/"), instance.snow_credentials[0]
+
+    def restore(self, instance: SNowInstance, page: playwright.sync_api.Page) -> bool:
+        """
+        Add the cookies of the cached session of a user to a page's context, if it is still valid
+
+        Returns:
+        --------
+        bool
+            True if the context is now authenticated, False if the user needs to log in
+
+        """
+        key = self._key(instance)
+        with self.lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+        if session is None:
+            return False
+        if time.time() - session["logged_in_at"] >= self.ttl:
+            self.forget(instance)
+            return False
+
+        page.context.add_cookies(session["cookies"])
+        if not session_is_valid(page, instance, session["token"]):
+            logging.debug(f"The cached session of {key[1]} is no longer valid")
+            page.context.clear_cookies()
+            self.forget(instance)
+            with self.lock:
+                self.stats["invalid"] += 1
+            return False
+        with self.lock:
+            self.stats["hits"] += 1
+        return True
+
+    def store(self, instance: SNowInstance, page: playwright.sync_api.Page) -> None:
+        """
+        Cache the session of a page that just logged into an instance
+
+        """
+        # The CSRF token is set by the pages of the instance
+        token = page.evaluate("() => window.g_ck ?? null")
+        if not token:
+            logging.debug("No CSRF token found on the page, the session is not cached")
+            return
+        session = {
+            "logged_in_at": time.time(),
+            "cookies": page.context.cookies(instance.snow_url),
+            "token": token,
+        }
+        key = self._key(instance)
+        with self.lock:
+            self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.size:
+                self._sessions.popitem(last=False)
+            self.stats["stores"] += 1
+
+    def forget(self, instance: SNowInstance) -> None:
+        """
+        Drop the cached session of a user (e.g., once the user is deleted)
+
+        """
+        with self.lock:
+            self._sessions.pop(self._key(instance), None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self._sessions.clear()
+
+
+_SESSION_CACHE = SessionCache()
+
+
+def get_session_cache() -> SessionCache:
+    """
+    Get the session cache of the process
+
+    """
+    return _SESSION_CACHE
+
+
+def login_with_cache(
+    instance: SNowInstance,
+    page: playwright.sync_api.Page,
+    login: Callable[[SNowInstance, playwright.sync_api.Page], None] = url_login,
+    cache: Optional[SessionCache] = None,
+) -> bool:
+    """
+    Log a page's context into an instance, reusing the cached session of the user if it is still valid
+
+    Parameters:
+    -----------
+    instance: SNowInstance
+        The instance to log into (with the credentials of the user)
+    page: playwright.sync_api.Page
+        The page to use for the login
+    login: callable
+        The function used to log in when no valid session is cached (url_login or ui_login)
+    cache: SessionCache
+        The cache to use (default: the session cache of the process, unless disabled by WORKARENA_SESSION_CACHE=0)
+
+    Returns:
+    --------
+    bool
+        True if a cached session was reused, False if the user logged in
+
+    Notes:
+    ------
+    Unlike after a login, the page is not navigated when a cached session is reused.
+
+    """
+    if cache is None:
+        if not SNOW_SESSION_CACHE_ENABLED:
+            login(instance, page)
+            return False
+        cache = get_session_cache()
+
+    if cache.restore(instance, page):
+        return True
+    login(instance, page)
+    cache.store(instance, page)
+    return False
@@ -0,0 +1,218 @@
+"""
+Stress test of the execution profiles (see SNOW_EXECUTION_PROFILES in config.py)
+
+Runs the cheat of tasks followed by their validation many times with each profile (e.g., "default", with slow_mo,
+and "fast", without it) and compares the success rates of the profiles. A profile regresses on a task if it succeeds
+significantly less often than the reference profile (one-sided Fisher exact test).
+Episodes are run with the same seeds for all profiles, alternating between profiles, so that a drift in the state of
+the instance affects all profiles alike.
+
+Usage:
+------
+workarena-stress --tasks "workarena.servicenow.*" --episodes 20 --output stress.json
+WORKARENA_EXECUTION_PROFILE=fast python my_agent_evaluation.py  # Once the fast profile is validated
+
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from collections import defaultdict
+from datetime import datetime
+from math import comb
+from playwright.sync_api import sync_playwright
+
+from .bench import run_episode, select_tasks
+from .config import SNOW_EXECUTION_PROFILES
+from .instance import SNowInstance
+
+
+def fisher_exact_less(successes: int, n: int, reference_successes: int, reference_n: int) -> float:
+    """
+    One-sided p-value of the hypothesis that a profile succeeds less often than the reference profile
+
+    Parameters:
+    -----------
+    successes: int
+        The number of successful episodes of the profile
+    n: int
+        The number of episodes of the profile
+    reference_successes: int
+        The number of successful episodes of the reference profile
+    reference_n: int
+        The number of episodes of the reference profile
+
+    Returns:
+    --------
+    float
+        The probability of observing this few successes (or fewer) if both profiles had the same success rate
+
+    """
+    total = n + reference_n
+    total_successes = successes + reference_successes
+    # Under the null hypothesis, the successes of the profile follow a hypergeometric distribution
+    return sum(
+        comb(total_successes, k) * comb(total - total_successes, n - k)
+        for k in range(max(0, total_successes - reference_n), successes + 1)
+    ) / comb(total, n)
+
+
+def compare_profiles(episodes: list[dict], reference: str = "default", alpha: float = 0.05) -> list:
+    """
+    Compare the success rates of the profiles, per task
+
+    Parameters:
+    -----------
+    episodes: list[dict]
+        The episodes (see bench.run_episode), with the name of their profile ("profile")
+    reference: str
+        The profile to compare the others to
+    alpha: float
+        The significance level under which a profile is considered to regress
+
+    Returns:
+    --------
+    list[dict]
+        One row per task, with the number of episodes, successes and success rate of each profile
+        ("profiles"), the p-value of each profile against the reference ("p_values") and the profiles that
+        regress ("regressions")
+
+    """
+    counts = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for episode in episodes:
+        count = counts[episode["task"]][episode["profile"]]
+        count[0] += episode["error"] is None
+        count[1] += 1
+
+    rows = []
+    for task, profiles in counts.items():
+        row = {
+            "task": task,
+            "profiles": {
+                profile: {"n": n, "successes": successes, "success_rate": successes / n}
+                for profile, (successes, n) in profiles.items()
+            },
+            "p_values": {},
+            "regressions": [],
+        }
+        if reference in profiles:
+            for profile, (successes, n) in profiles.items():
+                if profile == reference:
+                    continue
+                p_value = fisher_exact_less(successes, n, *profiles[reference])
+                row["p_values"][profile] = p_value
+                if p_value < alpha:
+                    row["regressions"].append(profile)
+        rows.append(row)
+    return rows
+
+
+def main():
+    """
+    Entrypoint for the stress test CLI command
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare the success rates of the cheats of WorkArena tasks across execution profiles."
+    )
+    parser.add_argument(
+        "--tasks",
+        nargs="+",
+        default=["*"],
+        help="Ids of the tasks to run, with shell-style wildcards (default: all tasks).",
+    )
+    parser.add_argument(
+        "--episodes", type=int, default=20, help="Episodes (seeds) per task and profile."
+    )
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        choices=list(SNOW_EXECUTION_PROFILES),
+        default=list(SNOW_EXECUTION_PROFILES),
+        help="Execution profiles to compare (default: all profiles).",
+    )
+    parser.add_argument(
+        "--reference",
+        choices=list(SNOW_EXECUTION_PROFILES),
+        default="default",
+        help="Profile to which the others are compared (default: default).",
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="Significance level under which a profile regresses (default: 0.05).",
+    )
+    parser.add_argument(
+        "--instance-url",
+        help="URL of the ServiceNow instance (default: SNOW_INSTANCE_URL or the instance pool).",
+    )
+    parser.add_argument(
+        "--instance-password",
+        help="Password of the admin user on the ServiceNow instance (required with --instance-url).",
+    )
+    parser.add_argument("--headed", action="store_true", help="Show the browser.")
+    parser.add_argument(
+        "--output",
+        help="JSON file to write the comparison and all episodes to (default: print it).",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.instance_url:
+        instance = SNowInstance(
+            snow_url=args.instance_url, snow_credentials=("admin", args.instance_password)
+        )
+    else:
+        instance = SNowInstance()
+
+    tasks = select_tasks(args.tasks)
+    episodes = []
+    with sync_playwright() as p:
+        browsers = {
+            profile: p.chromium.launch(
+                headless=not args.headed, slow_mo=SNOW_EXECUTION_PROFILES[profile]
+            )
+            for profile in args.profiles
+        }
+        for task_cls in tasks:
+            for seed in range(args.episodes):
+                for profile in args.profiles:
+                    logging.info(f"Running {task_cls.get_task_id()} (seed {seed}, {profile})")
+                    # The slow_mo of the task is ignored in favor of the one of the profile
+                    episode = run_episode(
+                        task_cls, seed, instance, lambda _, profile=profile: browsers[profile]
+                    )
+                    if episode["error"] is not None:
+                        logging.warning(f"Episode failed ({profile}): {episode['error']}")
+                    episodes.append({**episode, "profile": profile})
+        for browser in browsers.values():
+            browser.close()
+
+    comparison = compare_profiles(episodes, reference=args.reference, alpha=args.alpha)
+    results = {
+        "metadata": {
+            "date": datetime.now().isoformat(),
+            "instance": instance.snow_url,
+            "episodes_per_task": args.episodes,
+            "profiles": {profile: SNOW_EXECUTION_PROFILES[profile] for profile in args.profiles},
+            "reference": args.reference,
+            "alpha": args.alpha,
+        },
+        "comparison": comparison,
+        "episodes": episodes,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logging.info(f"Results written to {args.output}")
+    else:
+        print(json.dumps(comparison, indent=2))
+
+    regressions = [(row["task"], profile) for row in comparison for profile in row["regressions"]]
+    for task, profile in regressions:
+        logging.error(f"The {profile} profile succeeds less often than {args.reference} on {task}.")
+    sys.exit(1 if regressions else 0)
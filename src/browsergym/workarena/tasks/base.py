@@ -16,9 +16,15 @@ from urllib import parse
 
 from browsergym.core.task import AbstractBrowserTask
 from ..api.user import create_user
+from ..api.user_pool import get_user_pool
 from ..api.utils import table_api_call
-from ..config import SNOW_BROWSER_TIMEOUT, SNOW_JS_UTILS_FILEPATH
-from ..utils import url_login
+from ..config import (
+    SNOW_BROWSER_TIMEOUT,
+    SNOW_JS_UTILS_FILEPATH,
+    SNOW_SLOW_MO,
+    SNOW_USER_POOL_ENABLED,
+)
+from ..session_cache import get_session_cache, login_with_cache
 from ..instance import SNowInstance
 
 
@@ -28,6 +34,11 @@ class AbstractServiceNowTask(AbstractBrowserTask, ABC):
 
     """
 
+    # Whether the task can run as a user leased from the user pool. Pooled users keep the records they
+    # created in earlier episodes, so tasks that validate records by their creator (e.g., sys_created_by)
+    # must run as a new user.
+    user_pool_compatible = True
+
     def __init__(
         self,
         seed: int,
@@ -60,10 +71,12 @@ class AbstractServiceNowTask(AbstractBrowserTask, ABC):
 
         # task properties, will be used to set up the browsergym environment
         self.viewport = {"width": 1280, "height": 720}
-        self.slow_mo = 1000  # ms
+        self.slow_mo = SNOW_SLOW_MO  # ms (see SNOW_EXECUTION_PROFILES)
         self.timeout = 10000  # ms
 
         self.instance = instance if instance is not None else SNowInstance()
+        # Instances leased from the pool by the task are released on teardown
+        self._base_leased_instance = self.instance if instance is None else None
         self.start_url = self.instance.snow_url + start_rel_url
 
         if final_rel_url is not None:
@@ -77,6 +90,7 @@ class AbstractServiceNowTask(AbstractBrowserTask, ABC):
         # Flag to ensure the task is setup only once
         self.task_is_setup = False
         self.delete_user_on_teardown = False
+        self.use_user_pool = SNOW_USER_POOL_ENABLED and self.user_pool_compatible
         self.user_roles = user_roles
         self.has_description = (
             has_description  # Whether the task has a description in L3 compositional tasks
@@ -129,9 +143,17 @@ class AbstractServiceNowTask(AbstractBrowserTask, ABC):
         # Create a new user to run the task if this is the starting task
         if do_start:
             self._base_initial_instance = self.instance
-            self._base_user_name, self._base_user_password, self._base_user_sysid = create_user(
-                instance=self.instance, user_roles=self.user_roles, random=self.random
-            )
+            # Lease a pre-provisioned user if the user pool is enabled
+            if self.use_user_pool:
+                user = get_user_pool(self.instance).lease(
+                    user_roles=self.user_roles, random=self.random
+                )
+            else:
+                user = create_user(
+                    instance=self.instance, user_roles=self.user_roles, random=self.random
+                )
+            self._base_user_name, self._base_user_password, self._base_user_sysid = user
+            self._base_user_leased = self.use_user_pool
             self.instance = deepcopy(self.instance)
             self.instance.snow_credentials = (self._base_user_name, self._base_user_password)
             self.delete_user_on_teardown = True
@@ -173,8 +195,8 @@ class AbstractServiceNowTask(AbstractBrowserTask, ABC):
     def start(self, page: playwright.sync_api.Page) -> None:
         logging.debug("Navigating to task start page")
 
-        # Authenticate
-        url_login(
+        # Authenticate (reusing the session of the user if it was cached by a previous episode)
+        login_with_cache(
             instance=self.instance,
             page=page,
         )
@@ -193,10 +215,17 @@ class AbstractServiceNowTask(AbstractBrowserTask, ABC):
         """
         logging.debug("Tearing down the task")
 
-        if self.delete_user_on_teardown:
-            # Delete the user
+        if self.delete_user_on_teardown and self._base_user_leased:
+            # Return the user to the pool
+            get_user_pool(self._base_initial_instance).release(self._base_user_sysid)
+        elif self.delete_user_on_teardown:
+            # Delete the user (and forget its session)
+            get_session_cache().forget(self.instance)
             table_api_call(
                 instance=self._base_initial_instance,
                 table=f"sys_user/{self._base_user_sysid}",
                 method="DELETE",
             )
+
+        if self._base_leased_instance is not None:
+            self._base_leased_instance.release()
@@ -2,7 +2,6 @@
 Dashboard retrieval and do action comp tasks
 """
 
-import json
 from functools import partial
 import random
 import numpy as np
@@ -23,6 +22,7 @@ from ...api.incident import create_incident
 from ...api.report import create_report
 from ...api.user import create_user
 from ...api.utils import table_api_call, db_delete_from_table
+from ...config_store import choose_config, get_configs
 from ...instance import SNowInstance
 
 from browsergym.workarena.tasks.navigation import AllMenuTask
@@ -1124,8 +1124,7 @@ class DashboardRetrieveCatalogAndDoInfeasibleTask(DashboardRetrieveAndDoInfeasib
 
     @classmethod
     def all_configs(cls) -> List[dict]:
-        with open(cls.config_path, "r") as f:
-            return json.load(f)
+        return get_configs(cls.config_path)
 
     def get_catalog_item_sysid(self, catalog_item: str) -> str:
         catalog_item_response = table_api_call(
@@ -1282,7 +1281,7 @@ class DashboardRetrieveCatalogAndDoInfeasibleTask(DashboardRetrieveAndDoInfeasib
 
     def set_compositional_task(self) -> None:
 
-        config = self.random.choice(self.all_configs)
+        config = choose_config(self.random, self.all_configs)
         self.configuration = config["configuration"]
         order_config = {
             "configuration": self.configuration,
@@ -7,6 +7,7 @@ from .dash_do_base import DashboardRetrieveIncidentAndDoTask, DashDoFinalTask
 from ..base import AbstractServiceNowTask
 from ..dashboard import SingleChartMinMaxRetrievalTask, SingleChartMeanMedianModeRetrievalTask
 
+from ...api.references import ReferenceResolver
 from ...api.utils import table_api_call, db_delete_from_table
 from ...instance import SNowInstance
 
@@ -158,16 +159,32 @@ class DashboardRetrieveIncidentAndRequestItemTask(DashboardRetrieveIncidentAndDo
         return goal, info
 
     def validate(self, page: Page, chat_messages: list[str]) -> Tuple[float, bool, str, dict]:
+        # Fetch all the expected request items and the names of their catalog items at once
+        request_items = {number: [] for number in self.requested_item_numbers}
+        for request_item in table_api_call(
+            instance=self.instance,
+            table="sc_req_item",
+            params={
+                "sysparm_query": f"numberIN{','.join(self.requested_item_numbers)}",
+                "sysparm_fields": "number,requested_for,cat_item,quantity",
+            },
+            method="GET",
+        )["result"]:
+            request_items[request_item["number"]].append(request_item)
+        cat_item_names = ReferenceResolver(self.instance).resolve(
+            table="sc_cat_item",
+            field="sys_name",
+            sys_ids=[
+                request_item["cat_item"]["value"]
+                for items in request_items.values()
+                for request_item in items
+                if request_item["cat_item"]
+            ],
+            display_value=False,
+        )
+
         for requested_item_number in self.requested_item_numbers:
-            created_request_item_response = table_api_call(
-                instance=self.instance,
-                table="sc_req_item",
-                params={
-                    "sysparm_query": f"number={requested_item_number}",
-                    "sysparm_fields": "requested_for,cat_item,quantity",
-                },
-                method="GET",
-            )["result"]
+            created_request_item_response = request_items[requested_item_number]
             if len(created_request_item_response) == 0:
                 return (
                     0,
@@ -214,16 +231,8 @@ class DashboardRetrieveIncidentAndRequestItemTask(DashboardRetrieveIncidentAndDo
                     "",
                     {"message": f"Request item {requested_item_number} did not request an item."},
                 )
-            cat_item_response = table_api_call(
-                instance=self.instance,
-                table="sc_cat_item",
-                params={
-                    "sysparm_query": f"sys_id={cat_item['value']}",
-                    "sysparm_fields": "sys_name",
-                },
-                method="GET",
-            )["result"]
-            if len(cat_item_response) == 0:
+            cat_item_name = cat_item_names[cat_item["value"]]
+            if cat_item_name is None:
                 return (
                     0,
                     False,
@@ -231,7 +240,7 @@ class DashboardRetrieveIncidentAndRequestItemTask(DashboardRetrieveIncidentAndDo
                     {"message": f"Request item {requested_item_number} did not request an item."},
                 )
 
-            if cat_item_response[0]["sys_name"] != self.item:
+            if cat_item_name != self.item:
                 return (
                     0,
                     False,
@@ -8,9 +8,15 @@ from typing import List, Tuple
 
 from .base import AbstractServiceNowTask
 
-from ..utils.utils import check_url_suffix_match
+from ..utils.utils import (
+    await_ready,
+    bounded_wait,
+    check_url_suffix_match,
+    wait_for_requests_settled,
+)
 
 from ...api.utils import db_delete_from_table, table_api_call
+from ...config_store import choose_config
 
 
 class DeleteRecordTask(AbstractServiceNowTask):
@@ -66,7 +72,7 @@ class DeleteRecordTask(AbstractServiceNowTask):
 
     def setup_goal(self, page: Page) -> tuple[str, dict]:
         self.config = (
-            self.fixed_config if self.fixed_config else self.random.choice(self.all_configs)
+            self.fixed_config if self.fixed_config else choose_config(self.random, self.all_configs)
         )
         self.field_name = self.config.get("field_name")
         self.pretty_printed_field_name = self.config.get("pretty_printed_field_name")
@@ -122,7 +128,8 @@ class DeleteRecordTask(AbstractServiceNowTask):
         # If the record number is provided, click on the record with that number...
         if self.record_number is not None:
             frame.locator(f"[aria-label='Preview record: {self.record_number}']").click()
-            page.wait_for_timeout(500)
+            with bounded_wait("the record preview") as timeout:
+                frame.get_by_text("Open Record").wait_for(timeout=timeout)
             frame.get_by_text("Open Record").click()
         # ....Otherwise, otherwise filter the list and click on the record
         else:
@@ -134,16 +141,12 @@ class DeleteRecordTask(AbstractServiceNowTask):
             search_input.click()
             search_input.fill(self.field_value)
             search_input.press("Enter")
-            page.wait_for_function(
-                "typeof window.gsft_main !== 'undefined' && window.gsft_main.WORKARENA_LOAD_COMPLETE"
-            )
+            await_ready(page)
             # Click on the record to open it
             # The first 2 displays of the record are in the search bar; the 3rd and last will be the link to open it
             frame.get_by_label(self.field_value).last.click()
 
-        page.wait_for_function(
-            "typeof window.gsft_main !== 'undefined' && window.gsft_main.WORKARENA_LOAD_COMPLETE"
-        )
+        await_ready(page)
         frame = page.wait_for_selector('iframe[name="gsft_main"]').content_frame()
         # Click on delete, then confirm delete in the popup
         frame.get_by_text("delete").first.click()
@@ -161,7 +164,10 @@ class DeleteRecordTask(AbstractServiceNowTask):
                 },
             )["result"]
             record_deleted = len(record) == 0
-        page.wait_for_timeout(3000)
+        # The list is shown again once the record is deleted
+        with bounded_wait("the page to load after the deletion") as timeout:
+            frame.wait_for_load_state(timeout=timeout)
+        wait_for_requests_settled(page, "the page to settle after the deletion")
 
     def validate(self, page: Page, chat_messages: list[str]) -> Tuple[float, bool, str, dict]:
         """
@@ -13,12 +13,16 @@ from ...api.utils import table_api_call
 from ..base import AbstractServiceNowTask
 from .base import CompositionalTask
 from ...config import KB_FILEPATH, PROTOCOL_KB_NAME
+from ...config_store import choose_config, get_configs
 from ...instance import SNowInstance
 from ..knowledge import KnowledgeBaseSearchTask, AddCommentToKnowledgeArticleTask
 from ..navigation import AllMenuTask
 
 
 class EditKnowledgeBaseTask(CompositionalTask):
+    # The comments are validated by their creator, which must not have commented in earlier episodes
+    user_pool_compatible = False
+
     def __init__(
         self,
         seed: int = None,
@@ -59,8 +63,7 @@ class EditKnowledgeBaseTask(CompositionalTask):
             protocol_name=self.protocol_name,
             user_roles=["itil"],  # Required permission to access service desk for l3
         )
-        with open(KB_FILEPATH, "r") as f:
-            self.kb_entries = json.load(f)
+        self.kb_entries = get_configs(KB_FILEPATH)
         if not hasattr(self, "_base_initial_instance"):
             self._base_initial_instance = self.instance
         self.adhoc_kb_name = None
@@ -130,7 +133,7 @@ class EditKnowledgeBaseTask(CompositionalTask):
         # Create the KB
         self.adhoc_kb_sys_id = self.create_adhoc_kb()
         # Sample a configuration
-        self.base_config = self.random.choice(self.kb_entries)
+        self.base_config = choose_config(self.random, self.kb_entries)
         self.incorrect_kb_article_name = self.get_random_article_name()
         self.correct_kb_article_name = self.get_random_article_name()
         self.item = self.base_config["item"]
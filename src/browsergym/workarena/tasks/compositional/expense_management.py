@@ -15,7 +15,8 @@ from .filter_and_do import FilterAndDoTask
 from ..base import AbstractServiceNowTask
 
 from ...api.change_request import create_change_request
-from ...api.expense_line import create_expense_line
+from ...api.batch import batch_delete_records
+from ...api.expense_line import create_expense_lines
 from ...api.utils import table_api_call, db_delete_from_table
 from ...config import (
     # Expected columns for the different lists
@@ -110,6 +111,8 @@ class ExpenseManagementTask(FilterAndDoTask):
         only_expense_with_change_request = None
         # id of expenses will be this id + their order in the creation
         unique_id = str(int(self.unique_id.replace("-", ""), 16))[:10]
+        expense_lines = []
+        expense_is_duplicate = []
         for i in range(self.total_expenses):
             expense_number = f"EXP-{i}{unique_id }"
             is_duplicate = i < self.num_duplicates
@@ -151,17 +154,26 @@ class ExpenseManagementTask(FilterAndDoTask):
             # Set the short description for the duplicate expenses; otherwise pass None, which will generate a random one
             short_description = duplicate_short_description if i < self.num_duplicates else None
 
-            expense_sys_id, _ = create_expense_line(
-                instance=self.instance,
-                amount=amount,
-                number=expense_number,
-                date=str(date),
-                short_description=short_description,
-                expense_hashtag=self.expense_hashtag,
-                user_sys_id=self._base_user_sysid,
-                task_sys_id=task_sys_id,
+            expense_lines.append(
+                {
+                    "amount": amount,
+                    "number": expense_number,
+                    "date": str(date),
+                    "short_description": short_description,
+                    "expense_hashtag": self.expense_hashtag,
+                    "user_sys_id": self._base_user_sysid,
+                    "task_sys_id": task_sys_id,
+                }
             )
-            self.expense_lines[expense_number] = (is_duplicate, expense_sys_id)
+            expense_is_duplicate.append(is_duplicate)
+
+        # Create all the expense lines at once
+        for expense_line, is_duplicate, (expense_sys_id, _) in zip(
+            expense_lines,
+            expense_is_duplicate,
+            create_expense_lines(instance=self.instance, expense_lines=expense_lines),
+        ):
+            self.expense_lines[expense_line["number"]] = (is_duplicate, expense_sys_id)
 
         # keep the number of the expense that will be linked to the change request
         if self.goal_type == "base":
@@ -252,18 +264,21 @@ class ExpenseManagementTask(FilterAndDoTask):
         return reward, done, message, info
 
     def teardown(self) -> None:
-        for _, expense_sys_id in self.expense_lines.values():
-            record_exists = table_api_call(
+        # Only delete the expense lines that were not deleted during the task
+        expense_sys_ids = [expense_sys_id for _, expense_sys_id in self.expense_lines.values()]
+        if expense_sys_ids:
+            existing_expenses = table_api_call(
                 instance=self.instance,
                 table="fm_expense_line",
-                params={"sysparm_query": f"sys_id={expense_sys_id}"},
+                params={
+                    "sysparm_query": f"sys_idIN{','.join(expense_sys_ids)}",
+                    "sysparm_fields": "sys_id",
+                },
             )["result"]
-            if not record_exists:
-                continue
-            db_delete_from_table(
+            batch_delete_records(
                 instance=self.instance,
                 table="fm_expense_line",
-                sys_id=expense_sys_id,
+                sys_ids=[expense["sys_id"] for expense in existing_expenses],
             )
         for change_request_sys_id in self.change_request_sysids:
             record_exists = table_api_call(
@@ -28,6 +28,7 @@ from ...config import (
     # Expected columns for the different lists
     EXPECTED_REQUESTED_ITEMS_COLUMNS_PATH,
 )
+from ...config_store import choose_config
 from ...instance import SNowInstance
 
 
@@ -127,7 +128,7 @@ class FilterRequestedItemsAndOrderCatalogItemTask(FilterAndDoTask, HumanEvalTask
                 used_in_level_2=True,
             )
         )
-        order_task_config = self.random.choice(self.order_task_class.all_configs())
+        order_task_config = choose_config(self.random, self.order_task_class.all_configs())
         # task to order the item
         item_order_task = self.order_task_class(
             seed=self.seed,
@@ -21,6 +21,7 @@ from ...api.utils import table_api_call, db_delete_from_table
 from ...config import (
     # Expected columns for the different lists
     EXPECTED_EXPENSE_LINE_COLUMNS_PATH,
+    KNAPSACK_BATCH_SIZE,
 )
 from ...instance import SNowInstance
 
@@ -121,6 +122,7 @@ class FilterExpensesAndAllocateInvestmentsTask(FilterAndDoTask):
             max_capacity=self.budget,
             mode=self.mode,
             num_items_in_solution=self.num_items_uniform,
+            batch_size=KNAPSACK_BATCH_SIZE,
         )
         # investments is a list of tuples, where each tuple is (cost, return)
         self.potential_investments, self.max_return, self.selected_investment_indices = (
@@ -49,6 +49,7 @@ from .utils.infeasible_configs import (
 
 from ..base import AbstractServiceNowTask
 
+from ...config_store import choose_config
 from ...instance import SNowInstance
 
 
@@ -118,7 +119,7 @@ class InfeasibleNavigateAndDoTask(InfeasibleCompositionalTask, HumanEvalTask):
         return goal, info
 
     def _get_config(self) -> list[AbstractServiceNowTask]:
-        valid_task_config = self.random.choice(self.task_class.all_configs())
+        valid_task_config = choose_config(self.random, self.task_class.all_configs())
         infeasible_task_config, self.infeasible_reasons = self.function(
             config=valid_task_config, random=self.random
         )
@@ -1,5 +1,3 @@
-import json
-
 from playwright.sync_api._generated import Page
 
 from .base import CompositionalTask, HumanEvalTask
@@ -10,6 +8,7 @@ from ..knowledge import KnowledgeBaseSearchTask
 from ..navigation import AllMenuTask
 from ..service_catalog import OrderAppleMacBookPro15Task
 
+from ...config_store import choose_config
 from ...instance import SNowInstance
 from ...config import CREATE_USER_CONFIG_PATH, CREATE_HARDWARE_CONFIG_PATH
 
@@ -76,8 +75,8 @@ class OnBoardUserTask(CompositionalTask, HumanEvalTask):
 
     def _get_config(self) -> list[AbstractServiceNowTask]:
         # Sample base configurations; the hardware config will be modified to include the assigned_to field
-        user_config = self.random.choice(self.all_user_configs)
-        hardware_config = self.random.choice(self.all_hardware_asset_configs)
+        user_config = choose_config(self.random, self.all_user_configs)
+        hardware_config = choose_config(self.random, self.all_hardware_asset_configs)
 
         # Get the common fields between the user and hardware configurations to adjust the hardware config
         common_fields = [
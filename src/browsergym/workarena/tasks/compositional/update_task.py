@@ -1,9 +1,17 @@
+import time
+
 from playwright.sync_api import Page
 from typing import List, Tuple
 
 from ..base import AbstractServiceNowTask
 from ..comp_building_block import CompositionalBuildingBlockTask
-from ..utils.utils import check_url_suffix_match
+from ..utils.utils import (
+    await_ready,
+    bounded_wait,
+    check_url_suffix_match,
+    remaining_timeout,
+    wait_for_requests_settled,
+)
 from ..utils.private_tasks import create_private_task_and_get_sys_id
 
 from ...api.utils import db_delete_from_table, table_api_call
@@ -71,6 +79,9 @@ class UpdatePrivateTask(AbstractServiceNowTask, CompositionalBuildingBlockTask):
 
         return goal, {}
 
+    def get_init_scripts(self) -> List[str]:
+        return super().get_init_scripts() + ["registerGsftMainLoaded();"]
+
     def get_pretty_printed_description(self) -> str:
         """
         Get the task info for this task when used in a private task; Used in L3 compositional tasks.
@@ -89,13 +100,15 @@ class UpdatePrivateTask(AbstractServiceNowTask, CompositionalBuildingBlockTask):
         search_input.click()
         search_input.fill(self.private_task_id)
         search_input.press("Enter")
-        page.wait_for_timeout(1500)
         # Click on the private task to open it
-        frame.get_by_label(f"Open record: {self.private_task_id}").click()
-        page.wait_for_timeout(2000)
-        page.wait_for_load_state("networkidle")
-        frame = page.wait_for_selector('iframe[name="gsft_main"]').content_frame()
-        page.wait_for_timeout(1500)
+        record_link = frame.get_by_label(f"Open record: {self.private_task_id}")
+        with bounded_wait("the search results") as timeout:
+            record_link.wait_for(timeout=timeout)
+        record_link.click()
+        with bounded_wait("the private task form") as timeout:
+            start = time.perf_counter()
+            frame.wait_for_url("**/vtb_task.do*", timeout=timeout)
+            await_ready(page, apis=["g_form"], timeout=remaining_timeout(timeout, start))
         # Click on the task state, select "Closed-Complete" if complete, else "Closed Skipped" and update the task
         option = "3" if self.set_as_completed else "7"
         frame.get_by_label("state").first.select_option(option)
@@ -109,7 +122,7 @@ class UpdatePrivateTask(AbstractServiceNowTask, CompositionalBuildingBlockTask):
                 params={"sysparm_query": f"task_effective_number={self.private_task_id}"},
             )["result"]
             record_updated = record[0]["state"] == option
-        page.wait_for_timeout(1000)
+        wait_for_requests_settled(page, "the page to settle after the update")
 
     def validate(self, page: Page, chat_messages: list[str]) -> Tuple[float, bool, str, dict]:
         """
@@ -18,6 +18,8 @@ class KnapsackInstanceGenarator:
         - single_item_uniform: Generate an instance with all items having uniform weight and value; optimal solution has only one item and it can be any
     - num_items_in_solution: Number of items in the optimal solution. Required for "n_items" mode.
     - default_return: Default return value for investments having uniform weight and value. Required for "n_items" and "single_item_uniform" modes.
+    - batch_size: Number of candidate instances drawn at once in "random" mode. If None, candidates are drawn
+        one at a time, which reproduces the random number stream (and thus the instances) of previous versions.
     """
 
     def __init__(
@@ -28,6 +30,7 @@ class KnapsackInstanceGenarator:
         mode: str = "random",
         num_items_in_solution: int = None,
         default_return: int = 100000,
+        batch_size: int = None,
     ):
         self.random = random
         self.num_items = num_items
@@ -35,6 +38,7 @@ class KnapsackInstanceGenarator:
         self.mode = mode
         self.num_items_in_solution = num_items_in_solution
         self.default_return = default_return
+        self.batch_size = batch_size
 
     def get_instance(self):
         if self.mode in ["random", "trivial"]:
@@ -61,6 +65,9 @@ class KnapsackInstanceGenarator:
             "trivial",
         ], f"Mode {self.mode} is invalid for instance generation with generate_and_solve_knapsack_instance"
 
+        if self.mode == "random" and self.batch_size is not None:
+            return self.generate_and_solve_knapsack_instance_batched()
+
         multiple_solutions = True
         while multiple_solutions:
             # Generate knapsack instance...
@@ -98,6 +105,37 @@ class KnapsackInstanceGenarator:
 
         return investments, max_return, selected_indices
 
+    def generate_and_solve_knapsack_instance_batched(self):
+        """
+        Same as generate_and_solve_knapsack_instance in "random" mode, but draws batch_size candidate instances at
+        once and discards the trivial ones with array operations. The remaining candidates are solved in order until
+        one has a unique optimal solution.
+        Returns:
+        - investments: List of tuples (cost, investment_return) for each investment
+        - max_return: Maximum return achievable with optimal solution
+        - selected_indices: Indices of the investments selected in the optimal solution
+        """
+        min_cost = self.max_capacity // (self.num_items * 2)
+        max_cost = self.max_capacity // 2
+        shape = (self.batch_size, self.num_items)
+        while True:
+            costs = self.random.randint(min_cost, max_cost, size=shape)
+            returns = self.random.randint(
+                self.max_capacity // 2, self.max_capacity // 2 + 40000, size=shape
+            )
+            # Skip trivial instances where all items fit in the knapsack
+            nontrivial = costs.sum(axis=1) > self.max_capacity
+            for candidate_costs, candidate_returns in zip(costs[nontrivial], returns[nontrivial]):
+                investments = [
+                    (int(cost), int(return_))
+                    for cost, return_ in zip(candidate_costs, candidate_returns)
+                ]
+                max_return, num_optimal_solutions, selected_indices = self.solve_knapsack(
+                    investments, self.max_capacity
+                )
+                if num_optimal_solutions == 1:
+                    return investments, max_return, selected_indices
+
     def generate_single_item_knapsack_instance(self):
         """Generate knapsack instance where the optimal solution contains only one item
         Returns:
@@ -156,7 +194,70 @@ class KnapsackInstanceGenarator:
         return investments, self.default_return * items_in_solution, None
 
     def solve_knapsack(self, investments, max_capacity):
-        """Solves the knapsack problem using dynamic programming"""
+        """
+        Solves the knapsack problem using dynamic programming (vectorized with NumPy)
+
+        Same results as solve_knapsack_python, which is used when the number of ways could overflow int64.
+        Returns:
+        - max_return: Maximum return achievable with optimal solution
+        - num_ways: Number of ways to achieve the maximum return (as counted by solve_knapsack_python)
+        - selected_indices: Indices of the investments selected in the optimal solution
+        """
+        num_investments = len(investments)
+        # The number of ways is bounded by the number of subsets of the investments
+        if num_investments > 62:
+            return self.solve_knapsack_python(investments, max_capacity)
+
+        costs = [cost for cost, _ in investments]
+        # Reachable capacities are multiples of the GCD of the costs, so the table can be shrunk by that factor
+        gcd = np.gcd.reduce(costs) if any(costs) else 1
+        if gcd > 1:
+            costs = [cost // gcd for cost in costs]
+            max_capacity //= gcd
+
+        # Rolling row of the DP table: maximum return and number of ways for each capacity
+        values = np.zeros(max_capacity + 1, dtype=np.int64)
+        ways = np.zeros(max_capacity + 1, dtype=np.int64)
+        # Bitset of the cells that differ from the previous row (used for backtracking)
+        changed_rows = []
+
+        for cost, (_, return_) in zip(costs, investments):
+            changed = np.zeros(max_capacity + 1, dtype=bool)
+            if cost <= max_capacity:
+                # Returns and ways when adding the current investment to the capacities w - cost
+                candidate = values[: max_capacity + 1 - cost] + return_
+                candidate_ways = ways[: max_capacity + 1 - cost]
+                current, current_ways = values[cost:], ways[cost:]
+
+                # If adding the current investment yields a higher return, there is one way to do it
+                better = candidate > current
+                # If it yields the same return, add the number of ways from the cell without the investment
+                same = candidate == current
+                new_ways = np.where(
+                    better, 1, np.where(same, current_ways + candidate_ways, current_ways)
+                )
+                changed[cost:] = better | (same & (candidate_ways != 0))
+
+                # Update the row in place (the cells of the previous row that are needed were read above)
+                values[cost:] = np.maximum(candidate, current)
+                ways[cost:] = new_ways
+            changed_rows.append(np.packbits(changed))
+
+        # Retrieve the maximum return and the number of ways to achieve it
+        max_return, num_ways = int(values[max_capacity]), int(ways[max_capacity])
+
+        # Retrieve the indices of the selected investments
+        selected_indices = []
+        w = max_capacity
+        for i in range(num_investments, 0, -1):
+            if changed_rows[i - 1][w >> 3] & (0x80 >> (w & 7)):
+                selected_indices.append(i - 1)
+                w -= costs[i - 1]
+
+        return max_return, num_ways, selected_indices
+
+    def solve_knapsack_python(self, investments, max_capacity):
+        """Solves the knapsack problem using dynamic programming (reference implementation)"""
         num_investments = len(investments)
 
         # Initialize DP table for maximum return and number of ways
@@ -8,9 +8,11 @@ from playwright.sync_api._generated import Page
 
 from .base import CompositionalTask, HumanEvalTask
 
-from ...api.incident import create_incident
-from ...api.user import create_user
-from ...api.utils import table_api_call, db_delete_from_table
+from ...api import async_utils
+from ...api.batch import batch_delete_records
+from ...api.incident import create_incidents
+from ...api.user import create_users
+from ...api.utils import table_api_call
 from ..base import AbstractServiceNowTask
 from ..list import FilterIncidentListTask
 from ..form import EditIncidentTask
@@ -110,33 +112,43 @@ class WorkAssignmentTask(CompositionalTask):
         self.active_categories = self.random.choice(
             ["hardware", "software", "network", "database"], self.num_categories, replace=False
         )
+        incidents = []
         for incident_number in new_incident_numbers:
             ### We can reduce the categories here if the setup takes too long
             category = self.random.choice(self.active_categories)
-            incident_response = create_incident(
-                instance=self.instance,
-                incident_number=incident_number,
-                caller_sys_id=self._base_user_sysid,
-                category=category,
-                priority=4,
-                impact=2,  # priority is calculated as some combination of impact and urgency
-                urgency=3,
+            incidents.append(
+                {
+                    "incident_number": incident_number,
+                    "caller_sys_id": self._base_user_sysid,
+                    "category": category,
+                    "priority": 4,
+                    "impact": 2,  # priority is calculated as some combination of impact and urgency
+                    "urgency": 3,
+                }
             )
-            self.incident_configs.append(incident_response)
+        self.incident_configs = create_incidents(instance=self.instance, incidents=incidents)
 
         self.experts = dict({category: [] for category in self.active_categories})
-        for _ in range(self.max_experts_per_category):
-            for category in self.active_categories:
-                self.experts[category].append(
-                    create_user(
-                        instance=self.instance,
-                        first_name=f"{fake.first_name()}-{fake.first_name()}",
-                        last_name=f"{fake.last_name()}-{fake.last_name()}",
-                        return_full_response=True,
-                        user_roles=["itil"],
-                        random=self.random,
-                    )
-                )
+        expert_categories = [
+            category
+            for _ in range(self.max_experts_per_category)
+            for category in self.active_categories
+        ]
+        experts = create_users(
+            instance=self.instance,
+            users=[
+                {
+                    "first_name": f"{fake.first_name()}-{fake.first_name()}",
+                    "last_name": f"{fake.last_name()}-{fake.last_name()}",
+                }
+                for _ in expert_categories
+            ],
+            return_full_response=True,
+            user_roles=["itil"],
+            random=self.random,
+        )
+        for category, expert in zip(expert_categories, experts):
+            self.experts[category].append(expert)
         expert_string = ""
         for category in self.active_categories:
             category_experts = ", ".join(
@@ -252,16 +264,23 @@ class WorkAssignmentTask(CompositionalTask):
             category: [expert["sys_id"] for expert in self.experts[category]]
             for category in self.experts
         }
-        for incident_config in self.incident_configs:
-            incident_response = table_api_call(
-                instance=self.instance,
-                table="incident",
-                params={
-                    "sysparm_query": f"sys_id={incident_config['sys_id']}",
-                    "sysparm_fields": "category,assigned_to",
-                },
-                method="GET",
-            )["result"][0]
+        # Fetch all incidents concurrently
+        incident_responses = async_utils.gather_sync(
+            *[
+                async_utils.table_api_call(
+                    instance=self.instance,
+                    table="incident",
+                    params={
+                        "sysparm_query": f"sys_id={incident_config['sys_id']}",
+                        "sysparm_fields": "category,assigned_to",
+                    },
+                    method="GET",
+                )
+                for incident_config in self.incident_configs
+            ]
+        )
+        for incident_config, incident_response in zip(self.incident_configs, incident_responses):
+            incident_response = incident_response["result"][0]
             if incident_response["category"] != incident_config["category"]:
                 raise Exception("Corrupted incident data")
             if not incident_response["assigned_to"]:
@@ -290,16 +309,16 @@ class WorkAssignmentTask(CompositionalTask):
         return reward, done, message, info
 
     def teardown(self) -> None:
-        for incident in self.incident_configs:
-            db_delete_from_table(
-                instance=self.instance, table="incident", sys_id=incident["sys_id"]
-            )
-
-        for experts in self.experts.values():
-            for expert in experts:
-                db_delete_from_table(
-                    instance=self.instance, table="sys_user", sys_id=expert["sys_id"]
-                )
+        batch_delete_records(
+            instance=self.instance,
+            table="incident",
+            sys_ids=[incident["sys_id"] for incident in self.incident_configs],
+        )
+        batch_delete_records(
+            instance=self.instance,
+            table="sys_user",
+            sys_ids=[expert["sys_id"] for experts in self.experts.values() for expert in experts],
+        )
 
         return super().teardown()
 
@@ -496,70 +515,51 @@ class PriorityAssignmentTask(CompositionalTask):
         self.active_categories = self.random.choice(
             ["hardware", "software", "network", "database"], self.num_categories, replace=False
         )
+        incidents = []
         incident_number_idx = 0
         for priority, attributes in self.priorities.items():
             for _ in range(attributes["num_incidents"]):
                 category = self.random.choice(self.active_categories)
-                incident_response = create_incident(
-                    instance=self.instance,
-                    incident_number=new_incident_numbers[incident_number_idx],
-                    caller_sys_id=self._base_user_sysid,
-                    category=category,
-                    priority=priority,
-                    impact=attributes[
-                        "impact"
-                    ],  # priority is calculated as some combination of impact and urgency
-                    urgency=attributes["urgency"],
+                incidents.append(
+                    {
+                        "incident_number": new_incident_numbers[incident_number_idx],
+                        "caller_sys_id": self._base_user_sysid,
+                        "category": category,
+                        "priority": priority,
+                        "impact": attributes[
+                            "impact"
+                        ],  # priority is calculated as some combination of impact and urgency
+                        "urgency": attributes["urgency"],
+                    }
                 )
-                self.incident_configs.append(incident_response)
                 incident_category.append(
                     [new_incident_numbers[incident_number_idx], category, priority]
                 )
                 incident_number_idx += 1
+        self.incident_configs = create_incidents(instance=self.instance, incidents=incidents)
 
         self.agents_per_category = dict({category: {} for category in self.active_categories})
-        for category in self.agents_per_category:
-            self.agents_per_category[category]["expert"] = create_user(
-                instance=self.instance,
-                first_name=f"{fake.first_name()}-{fake.first_name()}",
-                last_name=f"{fake.last_name()}-{fake.last_name()}",
-                return_full_response=True,
-                user_roles=["itil"],
-                random=self.random,
-            )
-            self.agents_per_category[category]["expert"]["full_name"] = (
-                self.agents_per_category[category]["expert"]["first_name"]
-                + " "
-                + self.agents_per_category[category]["expert"]["last_name"]
-            )
-
-            self.agents_per_category[category]["supporter"] = create_user(
-                instance=self.instance,
-                first_name=f"{fake.first_name()}-{fake.first_name()}",
-                last_name=f"{fake.last_name()}-{fake.last_name()}",
-                return_full_response=True,
-                user_roles=["itil"],
-                random=self.random,
-            )
-            self.agents_per_category[category]["supporter"]["full_name"] = (
-                self.agents_per_category[category]["supporter"]["first_name"]
-                + " "
-                + self.agents_per_category[category]["supporter"]["last_name"]
-            )
-
-            self.agents_per_category[category]["planner"] = create_user(
-                instance=self.instance,
-                first_name=f"{fake.first_name()}-{fake.first_name()}",
-                last_name=f"{fake.last_name()}-{fake.last_name()}",
-                return_full_response=True,
-                user_roles=["itil"],
-                random=self.random,
-            )
-            self.agents_per_category[category]["planner"]["full_name"] = (
-                self.agents_per_category[category]["planner"]["first_name"]
-                + " "
-                + self.agents_per_category[category]["planner"]["last_name"]
-            )
+        agent_slots = [
+            (category, agent_type)
+            for category in self.agents_per_category
+            for agent_type in ["expert", "supporter", "planner"]
+        ]
+        agents = create_users(
+            instance=self.instance,
+            users=[
+                {
+                    "first_name": f"{fake.first_name()}-{fake.first_name()}",
+                    "last_name": f"{fake.last_name()}-{fake.last_name()}",
+                }
+                for _ in agent_slots
+            ],
+            return_full_response=True,
+            user_roles=["itil"],
+            random=self.random,
+        )
+        for (category, agent_type), agent in zip(agent_slots, agents):
+            agent["full_name"] = agent["first_name"] + " " + agent["last_name"]
+            self.agents_per_category[category][agent_type] = agent
 
         incident_numbers = ", ".join(new_incident_numbers)
 
@@ -677,16 +677,23 @@ class PriorityAssignmentTask(CompositionalTask):
             }
             for category in self.agents_per_category
         }
-        for incident_config in self.incident_configs:
-            incident_response = table_api_call(
-                instance=self.instance,
-                table="incident",
-                params={
-                    "sysparm_query": f"sys_id={incident_config['sys_id']}",
-                    "sysparm_fields": "category,assigned_to,priority",
-                },
-                method="GET",
-            )["result"][0]
+        # Fetch all incidents concurrently
+        incident_responses = async_utils.gather_sync(
+            *[
+                async_utils.table_api_call(
+                    instance=self.instance,
+                    table="incident",
+                    params={
+                        "sysparm_query": f"sys_id={incident_config['sys_id']}",
+                        "sysparm_fields": "category,assigned_to,priority",
+                    },
+                    method="GET",
+                )
+                for incident_config in self.incident_configs
+            ]
+        )
+        for incident_config, incident_response in zip(self.incident_configs, incident_responses):
+            incident_response = incident_response["result"][0]
             if incident_response["category"] != incident_config["category"]:
                 raise Exception("Corrupted incident data")
             if not incident_response["assigned_to"]:
@@ -717,16 +724,20 @@ class PriorityAssignmentTask(CompositionalTask):
         return reward, done, message, info
 
     def teardown(self) -> None:
-        for incident in self.incident_configs:
-            db_delete_from_table(
-                instance=self.instance, table="incident", sys_id=incident["sys_id"]
-            )
-
-        for category in self.agents_per_category.values():
-            for agent in category.values():
-                db_delete_from_table(
-                    instance=self.instance, table="sys_user", sys_id=agent["sys_id"]
-                )
+        batch_delete_records(
+            instance=self.instance,
+            table="incident",
+            sys_ids=[incident["sys_id"] for incident in self.incident_configs],
+        )
+        batch_delete_records(
+            instance=self.instance,
+            table="sys_user",
+            sys_ids=[
+                agent["sys_id"]
+                for category in self.agents_per_category.values()
+                for agent in category.values()
+            ],
+        )
 
         return super().teardown()
 
@@ -1,10 +1,12 @@
-import json
 import logging
 import numpy as np
 import playwright.sync_api
 import re
+import threading
 
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from copy import deepcopy
 from tenacity import retry, stop_after_attempt, wait_fixed
 from typing import List, Tuple
 from urllib import parse
@@ -20,15 +22,31 @@ from ..config import (
     REPORT_RETRIEVAL_MINMAX_CONFIG_PATH,
     REPORT_RETRIEVAL_VALUE_CONFIG_PATH,
     REPORT_PATCH_FLAG,
+    SNOW_CHART_CACHE_SIZE,
 )
+from ..config_store import choose_config, get_configs
 from ..instance import SNowInstance
 from .utils.string import share_tri_gram
-from .utils.utils import check_url_suffix_match
+from .utils.utils import await_ready, bounded_wait, check_url_suffix_match
 
 # XXX: Some notes on plot types
 #      - We currently don't support maps because they are clickable and would require a more evolved cheat function
 SUPPORTED_PLOT_TYPES = ["area", "bar", "column", "line", "pie", "spline"]
 
+# Charts extracted from pages, by instance, page URL and report filter config (LRU)
+# XXX: Reports are frozen by the date filter set by the installer, so the charts of a page don't change
+_CHART_CACHE = OrderedDict()
+_CHART_CACHE_LOCK = threading.Lock()
+
+
+def clear_chart_cache() -> None:
+    """
+    Clear the charts extracted from pages
+
+    """
+    with _CHART_CACHE_LOCK:
+        _CHART_CACHE.clear()
+
 
 class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
     """
@@ -42,6 +60,7 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
         super().__init__(seed=seed, instance=instance, start_rel_url="")
         self.iframe_id = "gsft_main"
         self.fixed_config = fixed_config
+        self.report_filter = None  # Set by _get_filter_config
         self.__dict__.update(kwargs)
 
     @abstractmethod
@@ -52,6 +71,52 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
     def all_configs(self) -> List[dict]:
         pass
 
+    def _chart_cache_key(self, page: playwright.sync_api.Page) -> tuple:
+        iframe = page.frame(name=self.iframe_id)
+        return (
+            self.instance.snow_url,
+            page.url,
+            iframe.url if iframe else None,
+            self.report_filter,
+        )
+
+    def _extract_charts(self, page: playwright.sync_api.Page) -> List[dict]:
+        """
+        Extract all the charts of the page (with their data) in a single call to the page
+
+        Parameters:
+        -----------
+        page: playwright.sync_api.Page
+            The playright page on which the charts are to be extracted
+
+        Returns:
+        --------
+        charts: list
+            The charts, as returned by getHighchartsCharts (see js_utils.js)
+
+        Notes:
+        ------
+        The charts are cached by instance, page URL and report filter config. Callers must not modify them.
+
+        """
+        key = self._chart_cache_key(page)
+        with _CHART_CACHE_LOCK:
+            if key in _CHART_CACHE:
+                _CHART_CACHE.move_to_end(key)
+                return _CHART_CACHE[key]
+
+        self._wait_for_ready(page)
+        charts = page.evaluate(f"getHighchartsCharts(window.{self.iframe_id})")
+
+        # Don't remember pages on which no chart was found (they may not be fully loaded)
+        if charts:
+            with _CHART_CACHE_LOCK:
+                _CHART_CACHE[key] = charts
+                while len(_CHART_CACHE) > SNOW_CHART_CACHE_SIZE:
+                    _CHART_CACHE.popitem(last=False)
+
+        return charts
+
     def _get_charts(self, page: playwright.sync_api.Page) -> None:
         """
         Extract all charts on the page
@@ -68,17 +133,18 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
             element that contains the chart.
 
         """
-        iframe = page.frame(name=self.iframe_id)
-
-        charts = page.evaluate(
-            f"{self.iframe_id}.Highcharts.charts.map((x) => {{if(x){{return [x.renderTo.ariaLabel, x.renderTo.id];}}}})"
-        )
         charts = [
-            (title.replace("Highcharts interactive chart.", "").replace(".", "").strip(), id)
-            for title, id in charts
-            if title
-            and iframe.locator(f"#{id}").count()
-            > 0  # Check if the element is actually on page (sometime rendering breaks)
+            (
+                chart["title"]
+                .replace("Highcharts interactive chart.", "")
+                .replace(".", "")
+                .strip(),
+                chart["id"],
+            )
+            for chart in self._extract_charts(page)
+            if chart[
+                "rendered"
+            ]  # Check if the element is actually on page (sometime rendering breaks)
         ]
 
         return charts
@@ -102,35 +168,18 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
             The data of the chart
 
         """
-        self._wait_for_ready(page)
+        chart = next(chart for chart in self._extract_charts(page) if chart["id"] == element_id)
 
         # Validate plot type
-        types = page.evaluate(
-            f"{self.iframe_id}.Highcharts.charts.find(chart => chart && chart.renderTo.id === '{element_id}').types"
-        )
+        types = chart["types"]
         if len(set(types)) > 1:
             raise NotImplementedError("Multiple chart types in the same chart not supported")
         type = types[0]
         if type not in SUPPORTED_PLOT_TYPES:
             raise NotImplementedError(f"Chart type {type} not supported")
 
-        # Get data
-        data = page.evaluate(
-            f"""
-            {self.iframe_id}.Highcharts.charts.find(chart => chart && chart.renderTo.id === "{element_id}")
-            .series.map(series => ({{
-                name: series.name,
-                data: series.data.map(
-                              point => ({{
-                                 label_cat: point.category,
-                                 label_name: point.name,
-                                 label_origx: point.origXValue,
-                                 count: point.y,
-                                 percent: point.percent
-                              }}))
-                }}));
-            """
-        )
+        # Get data (the extracted charts are shared, so we work on a copy)
+        data = deepcopy(chart["series"])
 
         # Post-process each series
         for i in range(len(data)):
@@ -206,11 +255,17 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
         # Get chart titles and element IDs
         charts = self._get_charts(page)
 
-        if not title:
-            title = charts[0][0]
+        try:
+            if not title:
+                title = charts[0][0]
 
-        # Find chart index by title
-        chart_idx = [title.lower() for title, _ in charts].index(title.lower())
+            # Find chart index by title
+            chart_idx = [title.lower() for title, _ in charts].index(title.lower())
+        except (IndexError, ValueError):
+            # The page may not have been fully loaded when the charts were extracted, forget them before retrying
+            with _CHART_CACHE_LOCK:
+                _CHART_CACHE.pop(self._chart_cache_key(page), None)
+            raise
 
         # Load chart data
         return *self._read_chart(page, element_id=charts[chart_idx][1]), charts[chart_idx][1]
@@ -225,19 +280,12 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
             The page to wait on
 
         """
-        logging.debug(f"Waiting for {self.iframe_id} to be fully loaded")
-        page.wait_for_function(
-            f"typeof window.{self.iframe_id} !== 'undefined' && window.{self.iframe_id}.WORKARENA_LOAD_COMPLETE",
+        await_ready(
+            page,
+            milestones=["load_complete", "highcharts_loaded"],
+            apis=["Highcharts"],
+            frame=self.iframe_id,
         )
-        logging.debug(f"Detected {self.iframe_id} ready")
-
-        logging.debug("Waiting for Highcharts API to be available")
-        page.wait_for_function(f"window.{self.iframe_id}.Highcharts")
-        logging.debug("Detected Highcharts API ready")
-
-        logging.debug("Waiting for all plots to be loaded available")
-        page.wait_for_function(f"window.{self.iframe_id}.WORKARENA_HIGHCHARTS_ALL_LOADED")
-        logging.debug("All plots loaded")
 
     def get_init_scripts(self) -> List[str]:
         return super().get_init_scripts() + [
@@ -246,7 +294,7 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
             async function renderAllCharts() {{
                 waLog('Forcing load of all charts', 'loadAllCharts');
 
-                await waitForCondition(() => window.WORKARENA_LOAD_COMPLETE, 100);
+                await getMilestone(window, 'load_complete').promise;
 
                 const canvas = window.SNC.canvas;
                 if (canvas) {{
@@ -265,7 +313,7 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
                 // Wait for Highcharts to say that the charts are rendered
                 waitForCondition(() => Highcharts.charts.all((c) => c.hasLoaded), 100)
                 .then(() => {{
-                            window.WORKARENA_HIGHCHARTS_ALL_LOADED = true;
+                            signalMilestone('highcharts_loaded');
                             waLog('All charts loaded', 'loadAllCharts');
                         }});
             }}
@@ -303,6 +351,7 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
             REPORT_DATE_FILTER = config["report_date_filter"]
             REPORT_TIME_FILTER = config["report_time_filter"]
         del config
+        self.report_filter = (REPORT_DATE_FILTER, REPORT_TIME_FILTER)
 
         # Check that the report filters are properly setup
         if REPORT_DATE_FILTER is None or REPORT_TIME_FILTER is None:
@@ -320,7 +369,9 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
         # Configure task
         # ... sample a configuration
         self.config = (
-            self.fixed_config if self.fixed_config else self.random.choice(self.all_configs())
+            self.fixed_config
+            if self.fixed_config
+            else choose_config(self.random, self.all_configs())
         )
         # ... set start URL based on config
         # ...... some of the reports have need a date filter to be applied so we do this by patching a placeholder in the URL
@@ -372,17 +423,14 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
             search_input.click()
             search_input.fill(chart_title)
             search_input.press("Enter")
-            page.wait_for_function(
-                "typeof window.gsft_main !== 'undefined' && window.gsft_main.WORKARENA_LOAD_COMPLETE"
-            )
+            await_ready(page)
             # Click on the chart preview to open it
             frame.wait_for_selector(f'a[aria-label="Preview record: {chart_title}"]').click()
-            page.wait_for_timeout(1000)
+            with bounded_wait("the report preview") as timeout:
+                frame.get_by_text("Open Record").wait_for(timeout=timeout)
             page.keyboard.press("Enter")
             # Now in the form view, wait for the page to load and click to view the report
-            page.wait_for_function(
-                "typeof window.gsft_main !== 'undefined' && window.gsft_main.WORKARENA_LOAD_COMPLETE"
-            )
+            await_ready(page)
             frame = page.wait_for_selector('iframe[name="gsft_main"]').content_frame()
             frame.get_by_text("View Report").first.click()
 
@@ -780,36 +828,36 @@ class DashboardRetrievalTask(AbstractServiceNowTask, ABC):
 
 class MultiChartValueRetrievalTask(DashboardRetrievalTask):
     def all_configs(self):
-        return json.load(open(DASHBOARD_RETRIEVAL_VALUE_CONFIG_PATH, "r"))
+        return get_configs(DASHBOARD_RETRIEVAL_VALUE_CONFIG_PATH)
 
 
 class MultiChartMinMaxRetrievalTask(DashboardRetrievalTask):
     def all_configs(self):
-        return json.load(open(DASHBOARD_RETRIEVAL_MINMAX_CONFIG_PATH, "r"))
+        return get_configs(DASHBOARD_RETRIEVAL_MINMAX_CONFIG_PATH)
 
 
 class SingleChartValueRetrievalTask(DashboardRetrievalTask):
     def all_configs(self):
-        return json.load(open(REPORT_RETRIEVAL_VALUE_CONFIG_PATH, "r"))
+        return get_configs(REPORT_RETRIEVAL_VALUE_CONFIG_PATH)
 
 
 class SingleChartMinMaxRetrievalTask(DashboardRetrievalTask):
     def all_configs(self):
-        return json.load(open(REPORT_RETRIEVAL_MINMAX_CONFIG_PATH, "r"))
+        return get_configs(REPORT_RETRIEVAL_MINMAX_CONFIG_PATH)
 
 
 class SingleChartMeanMedianModeRetrievalTask(
     DashboardRetrievalTask, CompositionalBuildingBlockTask
 ):
     def all_configs(self):
-        return json.load(open(REPORT_RETRIEVAL_MINMAX_CONFIG_PATH, "r"))
+        return get_configs(REPORT_RETRIEVAL_MINMAX_CONFIG_PATH)
 
 
 class WorkLoadBalancingMinMaxRetrievalTask(
     SingleChartMinMaxRetrievalTask, CompositionalBuildingBlockTask
 ):
     def all_configs(self):
-        return json.load(open(REPORT_RETRIEVAL_MINMAX_CONFIG_PATH, "r"))
+        return get_configs(REPORT_RETRIEVAL_MINMAX_CONFIG_PATH)
 
     def setup_goal(self, page: playwright.sync_api.Page) -> Tuple[str | dict]:
         super().setup_goal(page=page)
@@ -817,7 +865,9 @@ class WorkLoadBalancingMinMaxRetrievalTask(
         # Configure task
         # ... sample a configuration
         self.config = (
-            self.fixed_config if self.fixed_config else self.random.choice(self.all_configs())
+            self.fixed_config
+            if self.fixed_config
+            else choose_config(self.random, self.all_configs())
         )
         # ... set start URL based on config
         self.start_url = self.instance.snow_url + self.config["url"]
@@ -11,7 +11,7 @@ from faker import Faker
 fake = Faker()
 from playwright.sync_api._generated import Page
 from tenacity import retry, stop_after_delay, retry_if_exception_type
-from time import sleep
+from time import sleep, time
 from typing import List, Tuple
 from urllib import parse
 
@@ -25,7 +25,10 @@ from ..api.utils import (
     HTTPError,
 )
 from ..config import (
+    SNOW_API_CONFIRM_INITIAL_DELAY,
+    SNOW_API_CONFIRM_MAX_DELAY,
     SNOW_BROWSER_TIMEOUT,
+    SNOW_CHEAT_RECORD_TIMEOUT,
     # Paths to the configuration files
     CREATE_CHANGE_REQUEST_CONFIG_PATH,
     CREATE_HARDWARE_CONFIG_PATH,
@@ -40,9 +43,16 @@ from ..config import (
     EXPECTED_USER_FORM_FIELDS_PATH,
     EXPECTED_REQUEST_ITEM_FORM_FIELDS_PATH,
 )
+from ..config_store import choose_config, get_configs, get_json
 from ..instance import SNowInstance
 from .utils.form import fill_text
-from .utils.utils import check_url_suffix_match, prettyprint_enum
+from .utils.utils import (
+    await_ready,
+    bounded_wait,
+    check_url_suffix_match,
+    prettyprint_enum,
+    wait_for_requests_settled,
+)
 
 
 ENGLISH_WORDS = list(get_english_words_set(["web2"]))
@@ -149,14 +159,12 @@ class ServiceNowFormTask(AbstractServiceNowTask):
         if self.config_path:
             self.all_configs = self.all_configs()
         if self.expected_fields_path:
-            with open(self.expected_fields_path, "r") as f:
-                self.expected_fields = json.load(f)
+            self.expected_fields = get_json(self.expected_fields_path)
         self.check_record_created = check_record_created
 
     @classmethod
     def all_configs(cls) -> List[dict]:
-        with open(cls.config_path, "r") as f:
-            return json.load(f)
+        return get_configs(cls.config_path)
 
     def _get_form(self, page):
         """
@@ -170,13 +178,13 @@ class ServiceNowFormTask(AbstractServiceNowTask):
         self.table_metadata = table_column_info(instance=self.instance, table=self.table_name)
         # ... augment with rendered metadata
         # XXX: Additional useful info is present in the rendered HTML. We extract it from there.
+        form_state = self._get_form_state(page, field_names=list(self.table_metadata))
         for f in self.table_metadata:
-            loc = page.frame(name=self.js_prefix).locator(f"#sys_display.{self.table_name}.{f}")
-            if loc.count() > 0:
+            if form_state["fields"][f]["has_display"]:
                 # Check if the field is dependent on another field
-                self.table_metadata[f]["dependent_on_field"] = loc.first.get_attribute(
-                    "data-dependent"
-                )
+                self.table_metadata[f]["dependent_on_field"] = form_state["fields"][f][
+                    "dependent_on_field"
+                ]
 
         # Get the table's pretty-printed label
         logging.debug("Extracting table pretty-printed title")
@@ -188,27 +196,45 @@ class ServiceNowFormTask(AbstractServiceNowTask):
             },
         )["result"][0]["label"].lower()
 
+    def _get_form_state(self, page: Page, field_names: List[str] = []) -> dict:
+        """
+        Get the elements of the form and information about its fields in a single call to the page
+
+        Parameters:
+        -----------
+        page: playwright.sync_api.Page
+            The page on which the form is displayed
+        field_names: list[str]
+            Fields to describe in addition to the elements of the form
+
+        Returns:
+        --------
+        dict
+            The elements ("elements") and editable fields ("editable_fields") of the form, along with the label,
+            visibility, mandatory flag, field it depends on and section of each field ("fields"). See getFormState in
+            js_utils.js.
+
+        """
+        return page.evaluate(
+            f"([table, fieldNames]) => getFormState(window.{self.js_prefix}, table, fieldNames)",
+            [self.table_name, field_names],
+        )
+
     def _get_fields(self, page: Page) -> None:
         """
         Get the form fields; split them into mandatory and optional
         """
-        page.wait_for_function(
-            f"typeof window.{self.js_prefix} !== 'undefined' && window.{self.js_prefix}.WORKARENA_LOAD_COMPLETE",
-        )
+        await_ready(page, frame=self.js_prefix)
+
+        # Get the form fields (and their labels, visibility, etc.) in a single call
+        logging.debug("Extracting valid form fields")
+        form_state = self._get_form_state(page, field_names=list(self.expected_fields))
+        editable_fields = form_state["editable_fields"]
+        field_elements = form_state["elements"]
 
-        # Get the form fields
         def is_field_visible(field):
-            return page.evaluate(
-                f"""
-                {self.form_js_selector}.isVisible(
-                    {self.form_js_selector}.getGlideUIElement('{field}'),
-                    {self.form_js_selector}.getControl('{field}')
-                );"""
-            )
+            return form_state["fields"][field]["visible"]
 
-        logging.debug("Extracting valid form fields")
-        editable_fields = page.evaluate(f"{self.form_js_selector}.getEditableFields()")
-        field_elements = page.evaluate(f"{self.form_js_selector}.elements")
         all_fields = [f["fieldName"] for f in field_elements]
         self.fields = {
             f["fieldName"]: f
@@ -223,7 +249,7 @@ class ServiceNowFormTask(AbstractServiceNowTask):
         }
         # ... and their labels
         for f in self.fields:
-            self.fields[f]["label"] = page.evaluate(f"{self.form_js_selector}.getLabelOf('{f}')")
+            self.fields[f]["label"] = form_state["fields"][f]["label"]
 
         # Split them into mandatory and optional
         self.mandatory_fields = [f for f in self.fields.keys() if self.fields[f]["mandatory"]]
@@ -293,26 +319,20 @@ class ServiceNowFormTask(AbstractServiceNowTask):
             If True, only wait for the iframe to be loaded. If False, also wait for the APIs to be available.
 
         """
-        logging.debug(f"Waiting for {self.js_prefix} to be fully loaded")
         try:
-            page.wait_for_function(
-                f"typeof window.{self.js_prefix} !== 'undefined' && window.{self.js_prefix}.WORKARENA_LOAD_COMPLETE",
-            )
+            await_ready(page, frame=self.js_prefix)
         except:
             page.wait_for_load_state("networkidle")
             return
-        logging.debug(f"Detected {self.js_prefix} ready")
 
         if not iframe_only:
-            logging.debug("Waiting for Glide form API to be available")
-            page.wait_for_function(f"window.{self.form_js_selector}")
-            logging.debug("Detected Glide form API ready")
-
-            logging.debug("Waiting for Glide tabs API to be available")
-            page.wait_for_function(
-                f"typeof window.{self.js_prefix}.g_tabs2Sections !== 'undefined'"
+            # Glide form and tabs APIs
+            await_ready(
+                page,
+                milestones=[],
+                apis=[self.js_api_forms, "g_tabs2Sections"],
+                frame=self.js_prefix,
             )
-            logging.debug("Detected Glide tabs API ready")
 
     def get_init_scripts(self) -> List[str]:
         # Extract expected URL suffix
@@ -466,7 +486,11 @@ class ServiceNowFormTask(AbstractServiceNowTask):
         for field in task_fields:
             # Get the field's input control
             control = iframe.get_by_label(
-                page.evaluate(f"{self.form_js_selector}.getLabelOf('{field}')"),
+                (
+                    self.fields[field]["label"]
+                    if field in self.fields
+                    else page.evaluate(f"{self.form_js_selector}.getLabelOf('{field}')")
+                ),
                 exact=True,
             )
             if control.count() > 1:
@@ -492,17 +516,26 @@ class ServiceNowFormTask(AbstractServiceNowTask):
                     value=self.template_record[field],
                 )
 
-        # Click on the submit button
-        page.wait_for_timeout(1000)
-        if update:
-            iframe.locator("#sysverb_update").click()
-        else:
-            iframe.locator("#sysverb_insert").click()
+        # Wait for the scripts triggered by the new values (e.g., reference lookups), then click on the submit button
+        wait_for_requests_settled(
+            page, "the form to settle before submitting it", frame=self.js_prefix
+        )
+        submit_button = iframe.locator("#sysverb_update" if update else "#sysverb_insert")
 
         # Check if the record was created
         if self.check_record_created:
+            # The record is saved once the form is posted
+            with bounded_wait("the form to be submitted") as timeout:
+                with page.expect_response(
+                    lambda response: response.request.method == "POST"
+                    and response.request.is_navigation_request(),
+                    timeout=timeout,
+                ):
+                    submit_button.click()
             # This does not work if multiple forms are created at once. The localStorage returns null after the first form
-            for attempt in range(5):
+            deadline = time() + SNOW_CHEAT_RECORD_TIMEOUT
+            delay = SNOW_API_CONFIRM_INITIAL_DELAY
+            while True:
                 # in update tasks, the sys_id is already known as the asset is created from the start
                 if update:
                     sys_id = self.record_sys_id
@@ -520,9 +553,13 @@ class ServiceNowFormTask(AbstractServiceNowTask):
                 )["result"]
                 if len(record) > 0:
                     break
-                page.wait_for_timeout(1500)
-                if attempt == 4:
+                # The record may take a few seconds to be readable (read-after-write)
+                if time() >= deadline:
                     raise ValueError("The record was not created.")
+                sleep(delay)
+                delay = min(delay * 2, SNOW_API_CONFIRM_MAX_DELAY)
+        else:
+            submit_button.click()
 
     def _set_required_config_attributes(self, config: dict) -> None:
         """
@@ -626,7 +663,9 @@ class GenericNewRecordTask(ServiceNowFormTask):
 
         # Get the task configuration
         assert self.all_configs is not None, "No configuration available for the task."
-        config = self.fixed_config if self.fixed_config else self.random.choice(self.all_configs)
+        config = (
+            self.fixed_config if self.fixed_config else choose_config(self.random, self.all_configs)
+        )
         # If fixed_config is not None we already set the required attributes in the constructor
         if self.fixed_config is None:
             self._set_required_config_attributes(config)
@@ -1032,7 +1071,9 @@ class EditRecordTask(ServiceNowFormTask, CompositionalBuildingBlockTask):
         super().setup_goal(page=page)
 
         # Get the task configuration
-        config = self.fixed_config if self.fixed_config else self.random.choice(self.all_configs)
+        config = (
+            self.fixed_config if self.fixed_config else choose_config(self.random, self.all_configs)
+        )
 
         # If fixed_config is not None we already set the required attributes in the constructor
         # If record_sys_id is not None, the required attributes are not set in the constructor either
@@ -1126,13 +1167,12 @@ class EditRecordTask(ServiceNowFormTask, CompositionalBuildingBlockTask):
             # ....otherwise, click on the first record
             else:
                 iframe.locator("td").get_by_role("button").first.click()
-            page.wait_for_timeout(500)
+            with bounded_wait("the record preview") as timeout:
+                iframe.get_by_text("Open Record").wait_for(timeout=timeout)
 
             iframe.get_by_text("Open Record").click()
-            page.wait_for_function(
-                "typeof window.gsft_main !== 'undefined' && window.gsft_main.WORKARENA_LOAD_COMPLETE"
-            )
-        page.wait_for_timeout(1000)
+            await_ready(page)
+        wait_for_requests_settled(page, "the record to load", frame=self.js_prefix)
         self._fill_fields(page, iframe, self.new_values.keys(), update=True)
 
     def validate(
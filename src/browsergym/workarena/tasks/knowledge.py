@@ -3,7 +3,6 @@ Tasks related to knowledge bases.
 
 """
 
-import json
 import logging
 import re
 
@@ -17,7 +16,8 @@ from .utils.utils import check_url_suffix_match
 
 from ..api.utils import table_api_call
 from ..config import KB_FILEPATH, KB_CONFIG_PATH, KB_NAME, SNOW_BROWSER_TIMEOUT
-from ..install import check_knowledge_base
+from ..install import check_knowledge_base_cached
+from ..config_store import choose_config, get_configs
 from ..instance import SNowInstance
 
 
@@ -71,22 +71,20 @@ class KnowledgeBaseSearchTask(AbstractServiceNowTask):
         )
 
         # Load the knowledge base and check its integrity
-        with open(KB_FILEPATH, "r") as f:
-            self.kb_entries = json.load(f)
+        self.kb_entries = get_configs(KB_FILEPATH)
         if hasattr(self, "_base_initial_instance"):
-            _, requires_install, requires_delete = check_knowledge_base(
+            _, requires_install, requires_delete = check_knowledge_base_cached(
                 self._base_initial_instance,  # if user does not have permission to view the kb then this breaks
                 kb_name=KB_NAME,
                 kb_data=self.kb_entries,  # Need admin permissions to check
             )
         else:
-            _, requires_install, requires_delete = check_knowledge_base(
+            _, requires_install, requires_delete = check_knowledge_base_cached(
                 self.instance,  # Use the instance passed to the task
                 kb_name=KB_NAME,
                 kb_data=self.kb_entries,  # Need admin permissions to check
             )
-        with open(KB_CONFIG_PATH, "r") as f:
-            self.all_configs = json.load(f)
+        self.all_configs = get_configs(KB_CONFIG_PATH)
         if any([requires_install, requires_delete]):
             raise RuntimeError(
                 f"The knowledge base in instance {self.instance.snow_url} is missing or corrupted. "
@@ -135,7 +133,9 @@ class KnowledgeBaseSearchTask(AbstractServiceNowTask):
         super().setup_goal(page=page)
 
         # Get task configuration
-        config = self.fixed_config if self.fixed_config else self.random.choice(self.all_configs)
+        config = (
+            self.fixed_config if self.fixed_config else choose_config(self.random, self.all_configs)
+        )
         self.item = config["item"]
         self.answer = config["value"]
         self.alternative_answers = config["alternative_answers"]
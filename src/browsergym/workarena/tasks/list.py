@@ -17,9 +17,11 @@ from warnings import warn
 
 from .comp_building_block import CompositionalBuildingBlockTask
 
+from ..api.references import ReferenceResolver
 from ..api.utils import table_api_call, table_column_info
 from ..config import (
     SNOW_BROWSER_TIMEOUT,
+    SNOW_REQUESTS_QUIET_PERIOD,
     FILTER_ASSET_LIST_CONFIG_PATH,
     FILTER_CHANGE_REQUEST_LIST_CONFIG_PATH,
     FILTER_HARDWARE_LIST_CONFIG_PATH,
@@ -41,9 +43,21 @@ from ..config import (
     EXPECTED_SERVICE_CATALOG_COLUMNS_PATH,
     EXPECTED_USER_COLUMNS_PATH,
 )
+from ..config_store import choose_config, get_configs, get_json
+from ..encoded_query import (
+    Condition,
+    evaluate_encoded_query,
+    normalize_encoded_query,
+    parse_encoded_query,
+)
 from .base import AbstractServiceNowTask
 from .utils.form import fill_text
-from .utils.utils import check_url_suffix_match
+from .utils.utils import (
+    await_ready,
+    check_url_suffix_match,
+    get_list_state,
+    wait_for_condition,
+)
 
 
 LISTS = {
@@ -107,10 +121,14 @@ class ServiceNowListTask(AbstractServiceNowTask):
     OPERATOR_ISEMPTY = "ISEMPTY"
     OPERATOR_EMPTYSTRING = "EMPTYSTRING"
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Column information and data of the lists seen by the task (see _extract_list_info)
+        self._list_info_cache = {}
+
     @classmethod
     def all_configs(cls) -> List[dict]:
-        with open(cls.config_path, "r") as f:
-            return json.load(f)
+        return get_configs(cls.config_path)
 
     def get_init_scripts(self) -> List[str]:
         return super().get_init_scripts() + [
@@ -168,58 +186,92 @@ class ServiceNowListTask(AbstractServiceNowTask):
         """
         Extract useful information about the list visible on the page
 
+        Parameters:
+        -----------
+        page: Page
+            The page on which the list is visible
+        with_data: bool
+            Whether to load all the records of the list (display values) through the REST API
+
+        Notes:
+        ------
+        The state of the list is read in a single call to the page (see get_list_state). The column information is
+        memoized by list URL, table, query, fields and sorting, so that it is only loaded once as long as the list is
+        unchanged (e.g., in repeated calls to validate).
+
         """
         self._wait_for_ready(page)
 
-        # Grab the list component
-        _, _, js_selector = self._get_visible_list(page)
-
-        # Load some basic info
+        # Load the state of the list in a single call
+        state = get_list_state(page)
+        if state["list_count"] > 1:
+            warn(
+                "More than one list found on page. Using the first one.",
+                category=RuntimeWarning,
+            )
         list_info = {
-            "title": page.evaluate(f"{js_selector}.getTitle()").lower(),
-            "glide_table": page.evaluate(f"{js_selector}.getTableName()").lower(),
-            "query": page.evaluate(f"{js_selector}.getQuery()"),
-            "fields": page.evaluate(f"{js_selector}.fields"),
-            "js_selector": js_selector,
+            "title": state["title"].lower(),
+            "glide_table": state["table"].lower(),
+            "query": state["query"],
+            "fields": state["fields"],
+            "js_selector": f"{'gsft_main.' if state['in_gsft_main'] else ''}GlideList2.get('{state['list_id']}')",
+            "order_by": state["order_by"],
+            "sort_dir": state["sort_dir"],
+            "row_count": state["row_count"],
         }
 
-        # Get column info
-        list_info["columns"] = table_column_info(
-            instance=self.instance,
-            table=list_info["glide_table"],
+        cache_key = (
+            page.url,
+            list_info["glide_table"],
+            list_info["query"],
+            list_info["fields"],
+            list_info["order_by"],
+            list_info["sort_dir"],
         )
+        cache = self._list_info_cache.setdefault(cache_key, {})
 
-        # Get the list data
-        if with_data:
-            data = table_api_call(
+        # Get column info
+        if "columns" not in cache:
+            cache["columns"] = table_column_info(
                 instance=self.instance,
                 table=list_info["glide_table"],
-                params={
-                    "sysparm_query": list_info["query"],
-                    "sysparm_fields": list_info["fields"],
-                    "sysparm_display_value": "all",
-                },
-            )["result"]
-            # Extract all display values (not raw values)
-            data = [{k: v["display_value"] for k, v in x.items()} for x in data]
-            list_info["data"] = data
+            )
+        list_info["columns"] = cache["columns"]
+
+        # Get the list data
+        if with_data:
+            list_info["data"] = self._load_list_data(list_info)
 
         return list_info
 
-    def _wait_for_ready(self, page: Page) -> None:
+    def _load_list_data(self, list_info: dict) -> list[dict]:
         """
-        Waits for the main iframe to be fully loaded
+        Load all the records of a list (display values) through the REST API
+
+        Parameters:
+        -----------
+        list_info: dict
+            The information about the list (see _extract_list_info)
 
         """
-        logging.debug(f"Waiting for gsft_main to be fully loaded")
-        page.wait_for_function(
-            "typeof window.gsft_main !== 'undefined' && window.gsft_main.WORKARENA_LOAD_COMPLETE"
-        )
-        logging.debug("Detected gsft_main ready")
+        data = table_api_call(
+            instance=self.instance,
+            table=list_info["glide_table"],
+            params={
+                "sysparm_query": list_info["query"],
+                "sysparm_fields": list_info["fields"],
+                "sysparm_display_value": "all",
+            },
+        )["result"]
+        # Extract all display values (not raw values)
+        return [{k: v["display_value"] for k, v in x.items()} for x in data]
 
-        logging.debug("Waiting for Glide list API to be available")
-        page.wait_for_function("window.gsft_main.GlideList2 !== undefined")
-        logging.debug("Detected Glide list API ready")
+    def _wait_for_ready(self, page: Page) -> None:
+        """
+        Waits for the main iframe and the Glide list API to be fully loaded
+
+        """
+        await_ready(page, apis=["GlideList2"])
 
 
 class SortListTask(ServiceNowListTask):
@@ -265,8 +317,7 @@ class SortListTask(ServiceNowListTask):
         if hasattr(self, "config_path"):
             self.all_configs = self.all_configs()
 
-        with open(expected_fields_path, "r") as f:
-            self.expected_fields = set(json.load(f))
+        self.expected_fields = set(get_json(expected_fields_path))
         self.list_info = None
         self.__dict__.update(kwargs)
 
@@ -275,7 +326,7 @@ class SortListTask(ServiceNowListTask):
 
         # Get the task configuration
         self.config = (
-            self.fixed_config if self.fixed_config else self.random.choice(self.all_configs)
+            self.fixed_config if self.fixed_config else choose_config(self.random, self.all_configs)
         )
         self.sort_fields = self.config["sort_fields"]
         self.sort_dirs = self.config["sort_dirs"]
@@ -413,10 +464,19 @@ class SortListTask(ServiceNowListTask):
         # Add all sorting conditions
         for i, (field_txt, dir_txt) in enumerate(zip(sort_fields_txt, sort_dirs_txt)):
             logging.debug(f"Adding sort condition for column {repr(field_txt)} ({dir_txt}).")
+            n_rows = filter.locator(".filter_row").count()
             filter.get_by_role("button", name="Add Sort").click()
 
-            # TODO: Hack to solve bug where the sort condition has not yet appeared
-            page.wait_for_timeout(500)
+            # Wait for the sort condition to appear with its choices of fields
+            wait_for_condition(
+                iframe,
+                """n => {
+                    const rows = document.querySelectorAll('.list_filter .filter_row');
+                    return rows.length > n && rows[rows.length - 1].querySelector('select.filerTableSelect option') !== null;
+                }""",
+                "the new sort condition",
+                arg=n_rows,
+            )
 
             # newly added row should be the last one
             row_index = filter.locator(".filter_row").count() - 1
@@ -469,8 +529,8 @@ class SortListTask(ServiceNowListTask):
             # ... retrieve list
             list_info = self._extract_list_info(page)
             # ... get sorting info
-            sort_by = page.evaluate(f'{list_info["js_selector"]}.getOrderBy()')
-            sort_dir = page.evaluate(f'{list_info["js_selector"]}.sortDir')
+            sort_by = list_info["order_by"]
+            sort_dir = list_info["sort_dir"]
             # ... check if the list is sorted correctly
             if sort_by == self.sort_fields[0] and sort_dir.lower() == self.sort_dirs[0]:
                 return (
@@ -491,21 +551,16 @@ class SortListTask(ServiceNowListTask):
             if "sysparm_query" not in page_qs:
                 return 0, False, "", {"message": "No sysparm_query found in URL."}
 
-            # concatenate desired order_by conditions
-            order_dir = {"asc": "", "desc": "DESC"}
-            sysparam_query_regex = r"\^".join(
-                [
-                    f"ORDERBY{order_dir[dir]}{field}"
-                    for field, dir in zip(self.sort_fields, self.sort_dirs)
-                ]
+            # check "sysparm_query" for the correct sort conditions (and no other ones)
+            expected_order_by = tuple(
+                (field, dir == "desc") for field, dir in zip(self.sort_fields, self.sort_dirs)
             )
-            sysparam_query_regex = (
-                r"^((?!ORDERBY).)*" + sysparam_query_regex + r"((?!ORDERBY).)*$"
-            )  # forbid undesired order_by conditions
-
-            # check "sysparm_query" for the correct sort conditions
             page_sysparam_query = page_qs["sysparm_query"][0]
-            if page_sysparam_query and re.match(sysparam_query_regex, page_sysparam_query):
+            try:
+                order_by = parse_encoded_query(page_sysparam_query).order_by
+            except ValueError:
+                order_by = None
+            if order_by == expected_order_by:
                 return (
                     1,
                     True,
@@ -551,8 +606,7 @@ class FilterListTask(ServiceNowListTask):
         if hasattr(self, "config_path"):
             self.all_configs = self.all_configs()
 
-        with open(expected_fields_path, "r") as f:
-            self.expected_fields = set(json.load(f))
+        self.expected_fields = set(get_json(expected_fields_path))
         self.table_name = list_url.split("/")[-1].split("_list.do")[0]
         self.__dict__.update(kwargs)
 
@@ -560,7 +614,9 @@ class FilterListTask(ServiceNowListTask):
         super().setup_goal(page=page)
 
         # Get the task configuration
-        config = self.fixed_config if self.fixed_config else self.random.choice(self.all_configs)
+        config = (
+            self.fixed_config if self.fixed_config else choose_config(self.random, self.all_configs)
+        )
         self.filter_columns = config["filter_columns"]
         self.filter_values = config["filter_values"]
         # Base filter configs do not have filter_operands, so we default to "is"
@@ -571,6 +627,8 @@ class FilterListTask(ServiceNowListTask):
             list_info = {"columns": table_column_info(self.instance, self.table_name)}
         self.list_info = list_info
         self.filter_len = len(self.filter_columns)
+        # Display values of referenced records, memoized for the episode
+        self.reference_resolver = ReferenceResolver(self.instance)
 
         # Generate goal
         goal = self.get_pretty_printed_description(goal=True)
@@ -636,9 +694,7 @@ class FilterListTask(ServiceNowListTask):
         # Choose the values to filter on
         # We do this by loading a single record at random and using its values
         # This is significantly faster than loading all records and then filtering
-        offset = self.random.randint(
-            0, page.evaluate(f'{self.list_info["js_selector"]}.grandTotalRows')
-        )
+        offset = self.random.randint(0, self.list_info["row_count"])
         data = table_api_call(
             instance=self.instance,
             table=self.list_info["glide_table"],
@@ -707,8 +763,14 @@ class FilterListTask(ServiceNowListTask):
             logging.debug("Clearing existing filter condition")
             iframe.locator(".filerTableAction.deleteButton:visible").nth(0).click()
 
-        # TODO: Hack to solve issue where the filters were not all removed
-        page.wait_for_timeout(3000)
+        # Wait for the filter to be updated once all the conditions are removed
+        wait_for_condition(
+            iframe,
+            f"""() => requestsSettled(window, {SNOW_REQUESTS_QUIET_PERIOD}) && Array.from(
+                document.querySelectorAll('.filerTableAction.deleteButton')
+            ).every(button => button.offsetParent === null)""",
+            "the existing filter conditions to be removed",
+        )
 
         # Add all filter conditions
         for i in range(len(self.filter_columns)):
@@ -725,8 +787,16 @@ class FilterListTask(ServiceNowListTask):
                 iframe.locator(
                     f'.filterToolbar .filerTableAction:text-is("{self.filter_kind}")'
                 ).click()
-                # TODO: Hack to solve bug where the filter condition has not yet appeared
-                page.wait_for_timeout(1000)
+                # Wait for the filter condition to appear with its choices of fields
+                wait_for_condition(
+                    iframe,
+                    """i => {
+                        const row = document.querySelectorAll('.filter_row')[i];
+                        return row !== undefined && row.querySelector('select.filerTableSelect option') !== null;
+                    }""",
+                    f"the new {self.filter_kind} filter condition",
+                    arg=i,
+                )
 
             # Refresh since new rows are added at each iteration
             filter_rows = iframe.locator(".filter_row")
@@ -778,6 +848,23 @@ class FilterListTask(ServiceNowListTask):
 
         iframe.locator(".filterToolbar").get_by_text("Run").click()
 
+    def _get_expected_query(self) -> str:
+        """
+        Get the expected filter as an encoded query on the display values of the records
+
+        """
+        conditions = []
+        for col, val in zip(self.filter_columns, self.filter_values):
+            col_info = self.list_info["columns"][col]
+            # Empty choices are displayed as their empty label in the goal, but have an empty display value
+            if val == "" or (
+                col_info["type"] == "choice" and val == col_info["choices"].get("", "-- None --")
+            ):
+                conditions.append(Condition(col, self.OPERATOR_ISEMPTY))
+            else:
+                conditions.append(Condition(col, self.OPERATOR_EQUALS, val))
+        return ("^" if self.filter_kind == "AND" else "^OR").join(map(str, conditions))
+
     def validate(
         self, page: playwright.sync_api.Page, chat_messages: list[str]
     ) -> Tuple[float, bool, str, dict]:
@@ -806,16 +893,27 @@ class FilterListTask(ServiceNowListTask):
         if not current_query:
             return 0, False, "", {"message": "There are no filters yet."}
 
-        # Replace "new query" statements with the standard OR separator
-        current_query = current_query.replace("^NQ", "^OR")
+        # Parse the query to its normal form, where "new query" (^NQ) and OR (^OR) statements are equivalent,
+        # and where empty checks (ISEMPTY, EMPTYSTRING, "=") are all ISEMPTY
+        try:
+            groups = normalize_encoded_query(current_query).groups
+        except ValueError:
+            return (
+                0,
+                False,
+                "",
+                {"message": f"Unexpected operator in filter condition: {current_query}."},
+            )
 
         # Validate query kind is ok
-        if "^OR" in current_query:
+        if len(groups) == 1:
+            current_kind = "AND"
+            conditions = [clause[0] for clause in groups[0]]
+        elif all(len(group) == 1 for group in groups):
             current_kind = "OR"
-            current_sep = "^OR"
+            conditions = [group[0][0] for group in groups]
         else:
-            current_kind = "AND"
-            current_sep = "^"
+            current_kind = None  # Mix of AND and OR statements
 
         if current_kind != self.filter_kind:
             return (
@@ -825,11 +923,8 @@ class FilterListTask(ServiceNowListTask):
                 {"message": f"The kind of filter used is incorrect: {current_query}."},
             )
 
-        # Extract the query pieces for validation
-        current_query = current_query.split(current_sep)
-
         # Validate query length is ok
-        if len(current_query) != self.filter_len:
+        if len(conditions) != self.filter_len:
             return (
                 0,
                 False,
@@ -837,41 +932,16 @@ class FilterListTask(ServiceNowListTask):
                 {"message": f"Incorrect number of filter conditions: {current_query}."},
             )
 
-        # Parse column names, operators, and values
-        current_columns, current_operators, current_values = [], [], []
-
-        # Note that this is not exhaustive. If/when other operators are added, this will have to be updated.
-        for predicate in current_query:
-            if self.OPERATOR_EMPTYSTRING in predicate:
-                current_columns.append(predicate.replace(self.OPERATOR_EMPTYSTRING, "").strip())
-                current_operators.append("=")
-                current_values.append("")
-            elif self.OPERATOR_ISEMPTY in predicate:
-                current_columns.append(predicate.replace(self.OPERATOR_ISEMPTY, "").strip())
-                current_operators.append("=")
-                current_values.append("")
-            elif any(
-                unsupported_operator in predicate
-                for unsupported_operator in [self.OPERATOR_NOT_EQUALS, self.OPERATOR_STARTSWITH]
-            ):
-                return (
-                    0,
-                    False,
-                    "",
-                    {"message": f"Unexpected operator in filter condition: {current_query}."},
-                )
-            elif self.OPERATOR_EQUALS in predicate:
-                col, val = predicate.split(self.OPERATOR_EQUALS, 1)
-                current_columns.append(col.strip())
-                current_operators.append("=")
-                current_values.append(val.strip())
-            else:
-                return (
-                    0,
-                    False,
-                    "",
-                    {"message": f"Unexpected operator in filter condition: {current_query}."},
-                )
+        # Validate the operators (only equality is supported)
+        if any(c.operator not in (self.OPERATOR_EQUALS, self.OPERATOR_ISEMPTY) for c in conditions):
+            return (
+                0,
+                False,
+                "",
+                {"message": f"Unexpected operator in filter condition: {current_query}."},
+            )
+        current_columns = [c.field for c in conditions]
+        current_values = [c.value for c in conditions]
 
         if set(current_columns) != set(self.filter_columns):
             return (
@@ -896,34 +966,48 @@ class FilterListTask(ServiceNowListTask):
         else:
             # Current setting where we use multiple columns to filter
             is_homogenous_filter = False
+        # Resolve the display values of all referenced records at once (one query per referenced table)
+        references = {}
+        for col, val in zip(current_columns, current_values):
+            col_info = self.list_info["columns"][col]
+            if col_info["type"] == "reference" and val != "":
+                ref_key = (col_info["reference"], col_info["reference_attributes"]["display_field"])
+                references.setdefault(ref_key, []).append(val)
+
+        # For AND filters, the records of the list must all match the expected filter. When references would need to
+        # be resolved, load the records once and evaluate the expected filter locally on their display values instead
+        # (the references of an empty list are still resolved, since it has no records to check)
+        if references and self.filter_kind == "AND":
+            data = self._load_list_data(list_info)
+            if data:
+                if len(evaluate_encoded_query(self._get_expected_query(), data)) != len(data):
+                    return (
+                        0,
+                        False,
+                        "",
+                        {
+                            "message": f"Incorrect filter values in {current_query}. Expected: {set(self.filter_values)}."
+                        },
+                    )
+                return (
+                    1,
+                    True,
+                    "Nice work, thank you!",
+                    {"message": f"Correct filter: {list_info['query']}."},
+                )
+
+        display_values = self.reference_resolver.resolve_many(references)
+
         for index, (col, val) in enumerate(zip(current_columns, current_values)):
             col_info = self.list_info["columns"][col]
             # Get the column type
             if col_info["type"] == "reference" and val != "":
-                # Get the reference table
-                ref_table = col_info["reference"]
-                ref_field = col_info["reference_attributes"]["display_field"]
+                # Get the reference display value
+                ref_key = (col_info["reference"], col_info["reference_attributes"]["display_field"])
                 if is_homogenous_filter:
-                    current_values[index] = table_api_call(
-                        instance=self.instance,
-                        table=ref_table,
-                        params={
-                            "sysparm_query": f"sys_id={val}",
-                            "sysparm_fields": ref_field,
-                            "sysparm_display_value": "all",
-                        },
-                    )["result"][0][ref_field]["display_value"]
+                    current_values[index] = display_values[ref_key][val]
                 else:
-                    # Get the reference display value
-                    current_values[current_columns.index(col)] = table_api_call(
-                        instance=self.instance,
-                        table=ref_table,
-                        params={
-                            "sysparm_query": f"sys_id={val}",
-                            "sysparm_fields": ref_field,
-                            "sysparm_display_value": "all",
-                        },
-                    )["result"][0][ref_field]["display_value"]
+                    current_values[current_columns.index(col)] = display_values[ref_key][val]
 
             elif col_info["type"] == "choice":
                 # Get the choice display value
@@ -1002,7 +1086,9 @@ class ExtractListInfoTask(ServiceNowListTask):
         super().setup_goal(page=page)
 
         # Get the task configuration
-        config = self.fixed_config if self.fixed_config else self.random.choice(self.all_configs)
+        config = (
+            self.fixed_config if self.fixed_config else choose_config(self.random, self.all_configs)
+        )
         self.fields = config["fields"]  # mapping between fields and their display names
         self.printed_field_names = {
             v: k for k, v in self.fields.items()
@@ -1068,24 +1154,21 @@ class ExtractListInfoTask(ServiceNowListTask):
         gsft_main_present = False
         logging.debug(f"Waiting up to 3 seconds for gsft_main to be ready")
         try:
-            page.wait_for_function(
-                "typeof window.gsft_main !== 'undefined' && window.gsft_main.WORKARENA_LOAD_COMPLETE",
-                timeout=3000,
-            )
+            await_ready(page, timeout=3000)
             logging.debug("Detected gsft_main ready")
             gsft_main_present = True
-        except TimeoutError:
+        except playwright.sync_api.TimeoutError:
             logging.debug(
                 "Timed out waiting for gsft_main to be ready; searching for GlideList API directly"
             )
-            pass
 
         logging.debug("Waiting for Glide list API to be available")
-        if gsft_main_present:
-            page.wait_for_function("window.gsft_main.GlideList2 !== undefined")
-        else:
-            page.wait_for_function("window.GlideList2 !== undefined")
-
+        await_ready(
+            page,
+            milestones=[],
+            apis=["GlideList2"],
+            frame="gsft_main" if gsft_main_present else None,
+        )
         logging.debug("Detected Glide list API ready")
 
         return gsft_main_present
@@ -1104,28 +1187,20 @@ class ExtractListInfoTask(ServiceNowListTask):
         main_element.wait_for_selector(
             f"#hdr_{self.table_name}"
         )  # Selector for the name of the columns
-        # system name mapped to their order in the table
-        all_column_elements = main_element.query_selector_all(f"#hdr_{self.table_name} th")
-        required_fields_order = {}
-        for i, element in enumerate(all_column_elements):
-            if element.get_attribute("name") in self.fields:
-                required_fields_order[element.get_attribute("name")] = i
-
-        # Lines of the table
-        table_lines = main_element.query_selector_all(
-            f".list2_body [record_class={self.table_name}]"
-        )
+
+        # Text of the visible lines of the table, by column system name
+        table_lines = get_list_state(page, with_rows=True)["rows"]
 
         # will hold the values to extract
         table_values = {}
 
         # Extract the values of the required fields
-        for line_element in table_lines:
-            line_fields = line_element.query_selector_all("td")
-            line_values = {}
-            for field, order in required_fields_order.items():
-                printed_field_name = self.fields[field]
-                line_values[printed_field_name] = line_fields[order].inner_text()
+        for line in table_lines:
+            line_values = {
+                printed_field_name: line[field]
+                for field, printed_field_name in self.fields.items()
+                if field in line
+            }
             printed_unique_value_name = self.fields[self.unique_field_name]
             unique_field_value = line_values[printed_unique_value_name]
             line_values.pop(printed_unique_value_name)
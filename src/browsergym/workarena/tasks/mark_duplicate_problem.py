@@ -1,10 +1,17 @@
 import json
+import time
 
 from playwright.sync_api import Page
-from typing import Tuple
+from typing import List, Tuple
 
 from .base import AbstractServiceNowTask
 from .comp_building_block import CompositionalBuildingBlockTask
+from .utils.utils import (
+    await_ready,
+    bounded_wait,
+    remaining_timeout,
+    wait_for_requests_settled,
+)
 
 from ..api.utils import table_api_call
 
@@ -63,6 +70,9 @@ class SetProblemAsDuplicateTask(AbstractServiceNowTask, CompositionalBuildingBlo
 
         return goal, {}
 
+    def get_init_scripts(self) -> List[str]:
+        return super().get_init_scripts() + ["registerGsftMainLoaded();"]
+
     def get_pretty_printed_description(self) -> str:
         """
         Get the task info for this task when used in a private task; Used in L2 compositional tasks.
@@ -87,23 +97,25 @@ class SetProblemAsDuplicateTask(AbstractServiceNowTask, CompositionalBuildingBlo
         frame = page.wait_for_selector('iframe[name="gsft_main"]').content_frame()
         # Search for the private task by search for the number
         frame.wait_for_selector(f"[aria-label='Preview record: {target_problem_number}']").click()
-        page.wait_for_timeout(1500)
         # Click on the private task to open it
+        with bounded_wait("the record preview") as timeout:
+            frame.get_by_text("Open Record").wait_for(timeout=timeout)
         frame.get_by_text("Open Record").click()
-        page.wait_for_timeout(2000)
-        page.wait_for_load_state("networkidle")
-        frame = page.wait_for_selector('iframe[name="gsft_main"]').content_frame()
-        page.wait_for_timeout(1500)
+        with bounded_wait("the problem form") as timeout:
+            start = time.perf_counter()
+            frame.wait_for_url("**/problem.do*", timeout=timeout)
+            await_ready(page, apis=["g_form"], timeout=remaining_timeout(timeout, start))
         # Open the duplicate mode
         frame.get_by_text("Mark Duplicate").first.click()
-        page.wait_for_timeout(1000)
+        with bounded_wait("the duplicate pop-up") as timeout:
+            frame.get_by_text("Close").last.wait_for(timeout=timeout)
         # Close the pop-up to edit the duplicate problem in the same window
         frame.get_by_text("Close").last.click()
         frame.locator('[aria-labelledby="label.problem.duplicate_of"]').fill(
             self.source_problem["number"]
         )
         page.keyboard.press("Enter")
-        page.wait_for_timeout(1000)
+        wait_for_requests_settled(page, "the duplicate problem to be looked up")
         if self.add_comment:
             frame.locator('[id="problem.description"]').fill("Duplicate")
 
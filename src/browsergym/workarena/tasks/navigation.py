@@ -3,7 +3,6 @@ Tasks related to basic menu navigation.
 
 """
 
-import json
 import playwright.sync_api
 import re
 
@@ -14,7 +13,9 @@ from typing import List, Tuple
 
 from ..api.utils import table_api_call
 from .base import AbstractServiceNowTask
+from .utils.utils import bounded_wait
 from ..config import ALL_MENU_PATH, IMPERSONATION_CONFIG_PATH
+from ..config_store import choose_config, get_configs
 from ..instance import SNowInstance
 from ..utils import impersonate_user
 
@@ -40,8 +41,7 @@ class AllMenuTask(AbstractServiceNowTask):
     ) -> None:
         super().__init__(seed=seed, instance=instance, start_rel_url="/now/nav/ui/home")
         self.fixed_config = fixed_config
-        with open(ALL_MENU_PATH, "r") as f:
-            self.all_configs = json.load(f)
+        self.all_configs = get_configs(ALL_MENU_PATH)
         self.__dict__.update(kwargs)
 
     def setup_goal(self, page: Page) -> tuple[str, dict]:
@@ -49,7 +49,7 @@ class AllMenuTask(AbstractServiceNowTask):
 
         # Get task configuration
         self.module = (
-            self.fixed_config if self.fixed_config else self.random.choice(self.all_configs)
+            self.fixed_config if self.fixed_config else choose_config(self.random, self.all_configs)
         )
 
         # When menu tasks do not need to be validated, the URL can be omitted from their config
@@ -84,16 +84,14 @@ class AllMenuTask(AbstractServiceNowTask):
         # Filter the menu using the application's name
         menu.get_by_placeholder("Filter").fill(self.module["application"])
 
-        # Avoids issues due to list not being fully filtered yet
-        # We could certainly do something more fancy, but it's not
-        # worth spending time on right now.
-        page.wait_for_timeout(1000)
-
         path = [m.strip() for m in self.module["module"].split(">")]
         # Navigate to the application's location in the menu and select its parent
         locator = menu.get_by_label(self.module["application"], exact=True).and_(
             menu.get_by_role("button")
         )
+        # Avoids issues due to list not being fully filtered yet
+        with bounded_wait("the menu to be filtered") as timeout:
+            locator.first.wait_for(timeout=timeout)
         locator = locator.locator("xpath=ancestor::div[contains(@class, 'snf-collapsible-list')]")
         for module in path[:-1]:
             # Expand menu if necessary (this is mostly for visual satisfaction, cheat func would still work without it)
@@ -119,7 +117,8 @@ class AllMenuTask(AbstractServiceNowTask):
             menu_item = menu_item.first
         with page.expect_navigation():
             menu_item.click()
-        page.wait_for_timeout(2000)
+        with bounded_wait("the module to load") as timeout:
+            page.wait_for_load_state(timeout=timeout)
 
     def validate(
         self, page: playwright.sync_api.Page, chat_messages: list[str]
@@ -167,8 +166,7 @@ class ImpersonationTask(AbstractServiceNowTask):
     ) -> None:
         super().__init__(seed=seed, instance=instance, start_rel_url="/now/nav/ui/home")
         self.fixed_config = fixed_config
-        with open(IMPERSONATION_CONFIG_PATH, "r") as f:
-            self.all_configs = json.load(f)
+        self.all_configs = get_configs(IMPERSONATION_CONFIG_PATH)
         self.__dict__.update(kwargs)
 
     def setup_goal(self, page: Page) -> tuple[str, dict]:
@@ -176,7 +174,7 @@ class ImpersonationTask(AbstractServiceNowTask):
 
         # Get task configuration
         self.user_full_name = (
-            self.fixed_config if self.fixed_config else self.random.choice(self.all_configs)
+            self.fixed_config if self.fixed_config else choose_config(self.random, self.all_configs)
         )
         assert self.user_full_name in self.all_configs
 
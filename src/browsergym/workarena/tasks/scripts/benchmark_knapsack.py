@@ -0,0 +1,57 @@
+"""
+Micro-benchmark of the knapsack solvers used to generate investment tasks (NumPy vs. pure Python)
+
+Usage: python benchmark_knapsack.py [--num-items 5 8 12] [--capacities 15000 150000] [--repeats 5]
+
+"""
+
+import argparse
+import numpy as np
+
+from timeit import repeat
+
+from browsergym.workarena.tasks.compositional.utils.knapsack import KnapsackInstanceGenarator
+
+
+def benchmark(num_items: int, max_capacity: int, repeats: int, seed: int = 0) -> dict:
+    """Time both solvers on the same random instance and check that they agree"""
+    knapsack = KnapsackInstanceGenarator(
+        random=np.random.RandomState(seed), num_items=num_items, max_capacity=max_capacity
+    )
+    investments = [
+        (
+            knapsack.random.randint(max_capacity // (num_items * 2), max_capacity // 2),
+            knapsack.random.randint(max_capacity // 2, max_capacity // 2 + 40000),
+        )
+        for _ in range(num_items)
+    ]
+    assert knapsack.solve_knapsack(investments, max_capacity) == knapsack.solve_knapsack_python(
+        investments, max_capacity
+    ), "The solvers disagree"
+
+    timings = {}
+    for name, solver in [
+        ("numpy", knapsack.solve_knapsack),
+        ("python", knapsack.solve_knapsack_python),
+    ]:
+        timings[name] = min(
+            repeat(lambda: solver(investments, max_capacity), number=1, repeat=repeats)
+        )
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-items", type=int, nargs="+", default=[3, 5, 8, 12])
+    parser.add_argument("--capacities", type=int, nargs="+", default=[15000, 150000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'items':>6} {'capacity':>9} {'numpy (s)':>10} {'python (s)':>11} {'speedup':>8}")
+    for max_capacity in args.capacities:
+        for num_items in args.num_items:
+            timings = benchmark(num_items, max_capacity, args.repeats)
+            print(
+                f"{num_items:>6} {max_capacity:>9} {timings['numpy']:>10.4f} {timings['python']:>11.4f} "
+                f"{timings['python'] / timings['numpy']:>7.1f}x"
+            )
@@ -2,6 +2,7 @@ import json
 import logging
 import multiprocessing
 
+from browsergym.workarena.browser_pool import get_browser_pool
 from browsergym.workarena.config import (
     # navigation tasks
     ALL_MENU_PATH,
@@ -73,7 +74,6 @@ from browsergym.workarena.tasks.service_catalog import (
     OrderLoanerLaptopTask,
 )
 
-from playwright.sync_api import sync_playwright
 from tenacity import retry, stop_after_attempt
 from tqdm import tqdm
 
@@ -117,12 +117,11 @@ def validate_task(task_config, task_class, page=None):
     tries = 0
     while tries < num_attempts:
         if page is None:
-            # To run validation
-            with sync_playwright() as p:
-                browser = p.chromium.launch(slow_mo=1000)
-                context = browser.new_context()
-                page = context.new_page()
-                cheat_passed, task_done, reward = validate_on_page(task_class, task_config, page)
+            # To run validation (in a fresh context of the warm browser of this worker)
+            with get_browser_pool().page() as pool_page:
+                cheat_passed, task_done, reward = validate_on_page(
+                    task_class, task_config, pool_page
+                )
         else:
             # For testing pusposes
             cheat_passed, task_done, reward = validate_on_page(task_class, task_config, page)
@@ -3,8 +3,6 @@ Tasks that require interacting with the service catalog
 
 """
 
-import json
-import logging
 from typing import List
 import numpy as np
 import playwright.sync_api
@@ -32,8 +30,9 @@ from ..config import (
     ORDER_DEVELOPMENT_LAPTOP_PC_TASK_CONFIG_PATH,
     ORDER_LOANER_LAPTOP_TASK_CONFIG_PATH,
 )
+from ..config_store import choose_config, get_configs
 from ..instance import SNowInstance
-from .utils.utils import check_url_suffix_match
+from .utils.utils import await_ready, check_url_suffix_match
 
 ADDITIONAL_SOFTWARE = [
     "Slack",
@@ -197,24 +196,16 @@ class OrderHardwareTask(AbstractServiceNowTask):
 
     @classmethod
     def all_configs(cls) -> List[dict]:
-        with open(cls.config_path, "r") as f:
-            return json.load(f)
+        return get_configs(cls.config_path)
 
     def _wait_for_ready(self, page: Page, wait_for_form_api: bool = False) -> None:
         """
         Waits for the the main iframe to be loaded
 
         """
-        logging.debug(f"Waiting for {self.js_prefix} to be fully loaded")
-        page.wait_for_function(
-            f"typeof window.{self.js_prefix} !== 'undefined' && window.{self.js_prefix}.WORKARENA_LOAD_COMPLETE"
+        await_ready(
+            page, apis=[self.js_api_forms] if wait_for_form_api else [], frame=self.js_prefix
         )
-        logging.debug(f"Detected {self.js_prefix} ready")
-
-        if wait_for_form_api:
-            logging.debug("Waiting for Glide form API to be available")
-            page.wait_for_function(f"window.{self.form_js_selector}")
-            logging.debug("Detected Glide form API ready")
 
     @property
     def form_js_selector(self):
@@ -339,7 +330,7 @@ class OrderHardwareTask(AbstractServiceNowTask):
         # Get the task configuration
         assert self.all_configs is not None, "No configuration available for the task."
         self.config = (
-            self.fixed_config if self.fixed_config else self.random.choice(self.all_configs)
+            self.fixed_config if self.fixed_config else choose_config(self.random, self.all_configs)
         )
         self.requested_item = self.config["item"]
         self.short_description = self.config["description"]
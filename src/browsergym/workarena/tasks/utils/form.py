@@ -1,5 +1,5 @@
-import time
-from ...config import SNOW_BROWSER_TIMEOUT
+from ...config import SNOW_BROWSER_TIMEOUT, SNOW_REQUESTS_QUIET_PERIOD
+from .utils import bounded_wait
 
 
 def fill_text(page, input_field, value, iframe=None):
@@ -29,19 +29,24 @@ def fill_text(page, input_field, value, iframe=None):
         # Fill in the value using a procedure that triggers the autocomplete
         input_field.fill(value[:-1])
         page.keyboard.press(value[-1])
-        time.sleep(0.5)
 
-        # Wait for the autocomplete menu to open and be ready
-        max_wait_time = SNOW_BROWSER_TIMEOUT  # maximum time to wait in seconds
-        start_time = time.time()
-        while True:
-            if input_field.get_attribute("aria-expanded") == "true" and not input_field.evaluate(
-                "e => e.ac.isResolving()"
-            ):
-                break
-            if time.time() - start_time > (max_wait_time / 1000):
-                raise TimeoutError("Timeout waiting for autocompletion menu to open")
-            time.sleep(0.5)  # wait for a short period before checking again
+        # Wait for the autocomplete menu to propose the value, or to have settled without proposing it
+        handle = input_field.element_handle()
+        with bounded_wait(f"the autocompletion menu of {value}", SNOW_BROWSER_TIMEOUT) as timeout:
+            handle.owner_frame().wait_for_function(
+                """([e, value, quietPeriod]) => {
+                    if (e.getAttribute('aria-expanded') !== 'true' || e.ac.isResolving()) {
+                        return false;
+                    }
+                    const options = Array.from(e.ownerDocument.querySelectorAll("[id^='ac_option_']"));
+                    return requestsSettled(window, quietPeriod) || options.some((opt) => {
+                        const cell = opt.querySelector('.ac_cell');
+                        return (cell ?? opt).textContent.toLowerCase() === value.toLowerCase();
+                    });
+                }""",
+                arg=[handle, value, SNOW_REQUESTS_QUIET_PERIOD],
+                timeout=timeout,
+            )
 
         # Select the desired value
         options = iframe.locator("[id^='ac_option_']")
@@ -4,15 +4,196 @@ Javascript utility functions for tasks
 */
 
 
+/*
+* Registry of the open shadow roots of the window, used to search them without walking the whole DOM
+*
+* Shadow roots are registered by a hook on attachShadow. A mutation observer (on the document and on each shadow
+* root) increments a version number whenever the DOM changes, which invalidates the index of the shadow roots and the
+* results of previous searches.
+*/
+var WORKARENA_SHADOW_DOM = window.WORKARENA_SHADOW_DOM || (function () {
+    const registry = {
+        document: document,
+        roots: new Set(),
+        version: 0,
+        seeded: false,
+        index: null,  // Shadow roots by the root node that contains their host (in document order)
+        indexVersion: -1,
+        results: new Map(),  // Results of searches, by root and selector
+        resultsVersion: -1,
+    };
+    const observer = new MutationObserver(() => { registry.version++; });
+    const observerOptions = {childList: true, subtree: true, attributes: true};
+
+    // Take the mutations that the observer was not notified of yet (e.g., made earlier in the current task)
+    registry.sync = function () {
+        if (observer.takeRecords().length > 0) {
+            registry.version++;
+        }
+    };
+
+    registry.register = function (shadowRoot) {
+        if (!registry.roots.has(shadowRoot)) {
+            registry.roots.add(shadowRoot);
+            observer.observe(shadowRoot, observerOptions);
+            registry.version++;
+        }
+    };
+
+    // Register the shadow roots that are attached from now on (closed ones can't be searched anyway)
+    const attachShadow = Element.prototype.attachShadow;
+    Element.prototype.attachShadow = function (...args) {
+        const shadowRoot = attachShadow.apply(this, args);
+        if (this.shadowRoot === shadowRoot) {
+            registry.register(shadowRoot);
+        }
+        return shadowRoot;
+    };
+    observer.observe(document, observerOptions);
+
+    return registry;
+})();
+
+
+/*
+* Function to register the shadow roots that already exist under a root (e.g., attached before the hook was installed)
+*
+* @param {object} registry - the shadow root registry of the window of the root
+* @param {Node} root - root element to start the search
+*/
+function registerShadowRoots(registry, root) {
+    for (const element of root.querySelectorAll('*')) {
+        if (element.shadowRoot) {
+            registry.register(element.shadowRoot);
+            registerShadowRoots(registry, element.shadowRoot);
+        }
+    }
+}
+
+
+/*
+* Function to get the registered shadow roots by the root node that contains their host (in document order)
+*
+* @param {object} registry - the shadow root registry of a window
+*/
+function getShadowRootIndex(registry) {
+    if (!registry.seeded) {
+        registry.seeded = true;
+        registerShadowRoots(registry, registry.document);
+    }
+    registry.sync();
+    if (registry.indexVersion !== registry.version) {
+        // Forget the shadow roots removed from the document (and register again those that were only moved)
+        let pruned = false;
+        for (const shadowRoot of registry.roots) {
+            if (!shadowRoot.host.isConnected) {
+                registry.roots.delete(shadowRoot);
+                pruned = true;
+            }
+        }
+        if (pruned) {
+            registerShadowRoots(registry, registry.document);
+        }
+
+        const index = new Map();
+        for (const shadowRoot of registry.roots) {
+            const parent = shadowRoot.host.getRootNode();
+            if (!index.has(parent)) {
+                index.set(parent, []);
+            }
+            index.get(parent).push(shadowRoot);
+        }
+        for (const shadowRoots of index.values()) {
+            shadowRoots.sort(
+                (a, b) => (a.host.compareDocumentPosition(b.host) & Node.DOCUMENT_POSITION_FOLLOWING) ? -1 : 1
+            );
+        }
+        registry.index = index;
+        registry.indexVersion = registry.version;
+    }
+    return registry.index;
+}
+
+
 /*
 * Function to find an element in multiple nested shadow DOMs
 *
+* The root is searched first, and then the shadow roots under it (depth first, in document order). The shadow roots
+* are found with the registry of the root's window and results are cached until the DOM changes, except for selectors
+* with pseudo-classes (e.g., :checked or :focus), whose results can change without any mutation of the DOM.
+*
 * @param {string} selector - query selector to find the element
 * @param {HTMLElement} root - root element to start the search
 *
 * @returns {HTMLElement} - element with the given id or null if not found
 */
 function findElementInShadowDOM(selector, root = document) {
+    // The root can be in another frame (e.g., gsft_main), which has its own registry
+    const view = (root.ownerDocument || root).defaultView;
+    const registry = view ? view.WORKARENA_SHADOW_DOM : undefined;
+    if (registry === undefined) {
+        return findElementInShadowDOMWithoutRegistry(selector, root);
+    }
+
+    const index = getShadowRootIndex(registry);
+    if (registry.resultsVersion !== registry.version) {
+        registry.results = new Map();
+        registry.resultsVersion = registry.version;
+    }
+    if (!registry.results.has(root)) {
+        registry.results.set(root, new Map());
+    }
+    const results = registry.results.get(root);
+    const cacheable = !selector.includes(':');
+    if (cacheable && results.has(selector)) {
+        return results.get(selector);
+    }
+
+    function shadowRootsUnder(node) {
+        // Shadow roots are indexed by the document or shadow root that contains their host
+        if (node.nodeType !== Node.ELEMENT_NODE) {
+            return index.get(node) || [];
+        }
+        return (index.get(node.getRootNode()) || []).filter(
+            (shadowRoot) => shadowRoot.host !== node && node.contains(shadowRoot.host)
+        );
+    }
+
+    function search(node) {
+        // Check if current root has the element
+        const element = node.querySelector(selector);
+        if (element) {
+            return element;
+        }
+        // If not found, search in the shadow roots whose host is under this root
+        for (const shadowRoot of shadowRootsUnder(node)) {
+            const foundElement = search(shadowRoot);
+            if (foundElement) {
+                return foundElement;
+            }
+        }
+        // Return null if the element is not found in any shadow root
+        return null;
+    }
+
+    const element = search(root);
+    if (cacheable) {
+        results.set(selector, element);
+    }
+    return element;
+}
+
+
+/*
+* Function to find an element in multiple nested shadow DOMs by walking the whole DOM (used when the window of the root
+* has no shadow root registry)
+*
+* @param {string} selector - query selector to find the element
+* @param {HTMLElement} root - root element to start the search
+*
+* @returns {HTMLElement} - element with the given id or null if not found
+*/
+function findElementInShadowDOMWithoutRegistry(selector, root = document) {
     // Check if current root has the element
     const element = root.querySelector(selector);
     if (element) {
@@ -25,7 +206,7 @@ function findElementInShadowDOM(selector, root = document) {
                               .filter(sr => sr !== null);
 
     for (const shadowRoot of shadowRoots) {
-        const foundElement = findElementInShadowDOM(selector, shadowRoot);
+        const foundElement = findElementInShadowDOMWithoutRegistry(selector, shadowRoot);
         if (foundElement) {
             return foundElement;
         }
@@ -37,17 +218,183 @@ function findElementInShadowDOM(selector, root = document) {
 
 
 /**
- * Function that registers to the gsft_main afterload event and sets a flag when it is loaded
+ * Flags set on a window when WorkArena milestones are reached
+ *
+ * Milestones are signalled by the page scripts (see signalMilestone) and can be awaited without polling (see
+ * getMilestone and awaitReady).
+ */
+var WORKARENA_MILESTONE_FLAGS = {
+    load_complete: 'WORKARENA_LOAD_COMPLETE',
+    highcharts_loaded: 'WORKARENA_HIGHCHARTS_ALL_LOADED',
+};
+
+
+/**
+ * Function to get the promise of a milestone of a window
+ *
+ * @param {Window} win - window in which the milestone is reached
+ * @param {string} name - name of the milestone (see WORKARENA_MILESTONE_FLAGS)
+ *
+ * @returns {object} - object with a promise that resolves when the milestone is reached and its resolve function
+ */
+function getMilestone(win, name) {
+    if (win.WORKARENA_MILESTONES === undefined) {
+        win.WORKARENA_MILESTONES = {};
+    }
+    if (win.WORKARENA_MILESTONES[name] === undefined) {
+        const milestone = {};
+        milestone.promise = new Promise((resolve) => { milestone.resolve = resolve; });
+        // The milestone may have been reached before anyone waited for it
+        if (win[WORKARENA_MILESTONE_FLAGS[name]] === true) {
+            milestone.resolve();
+        }
+        win.WORKARENA_MILESTONES[name] = milestone;
+    }
+    return win.WORKARENA_MILESTONES[name];
+}
+
+
+/**
+ * Function to signal that a milestone is reached in the current window
+ *
+ * @param {string} name - name of the milestone (see WORKARENA_MILESTONE_FLAGS)
+ */
+function signalMilestone(name) {
+    window[WORKARENA_MILESTONE_FLAGS[name]] = true;
+    getMilestone(window, name).resolve();
+}
+
+
+/**
+ * Function to wait until milestones are reached and APIs are available in a frame (or in the current window)
+ *
+ * The milestones are awaited without polling. Since the frame can navigate while waiting (which replaces its
+ * window), the state of the frame is checked again every pollInterval ms until it is ready.
+ *
+ * @param {string} frameName - name of the frame (e.g., gsft_main), or null for the current window
+ * @param {string[]} milestones - names of the milestones to wait for (see WORKARENA_MILESTONE_FLAGS)
+ * @param {string[]} apis - names of the global variables that must be defined in the frame (e.g., g_form)
+ * @param {number} timeout - time in ms after which waiting stops (null to wait forever). Playwright doesn't stop the
+ *                           functions it waits for when it times out, so this is what ends the wait on the page.
+ * @param {number} pollInterval - interval in ms at which the state of the frame is checked again
+ *
+ * @returns {Promise} - resolves to true when the frame is ready, or to false once the timeout has passed
+ */
+async function awaitReady(frameName = null, milestones = ['load_complete'], apis = [], timeout = null,
+                          pollInterval = 100) {
+    const deadline = timeout === null ? Infinity : Date.now() + timeout;
+    while (true) {
+        const win = frameName ? window[frameName] : window;
+        const pending = (win === undefined || win === null) ? null : milestones.filter(
+            (name) => win[WORKARENA_MILESTONE_FLAGS[name]] !== true
+        );
+        if (pending !== null && pending.length === 0) {
+            if (apis.every((api) => win[api] !== undefined && win[api] !== null)) {
+                return true;
+            }
+        }
+
+        if (Date.now() >= deadline) {
+            return false;
+        }
+
+        const poll = new Promise((resolve) => setTimeout(resolve, pollInterval));
+        if (pending !== null && pending.length > 0) {
+            // Wake up as soon as the milestones are signalled
+            await Promise.race([Promise.all(pending.map((name) => getMilestone(win, name).promise)), poll]);
+        } else {
+            await poll;
+        }
+    }
+}
+
+
+/**
+ * Requests (XHR and fetch) in flight in the current window, with the time of the last request that started or ended
+ *
+ * The tracker is installed before the page scripts run, so that waits can be based on the requests made by the page
+ * instead of fixed delays (see requestsSettled).
+ */
+var WORKARENA_PENDING_REQUESTS = window.WORKARENA_PENDING_REQUESTS || (function () {
+    const state = {count: 0, last_activity: Date.now()};
+    window.WORKARENA_PENDING_REQUESTS = state;
+    const started = () => { state.count += 1; state.last_activity = Date.now(); };
+    const ended = () => { state.count = Math.max(0, state.count - 1); state.last_activity = Date.now(); };
+
+    // Long-polling requests of the Asynchronous Message Bus (AMB) are always in flight, so they are not tracked
+    const untracked = (url) => /\/amb(\/|\?|$)/.test(String(url));
+    const open = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function (method, url, ...args) {
+        this.workarenaUntracked = untracked(url);
+        return open.call(this, method, url, ...args);
+    };
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function (...args) {
+        if (this.workarenaUntracked) {
+            return send.apply(this, args);
+        }
+        started();
+        this.addEventListener('loadend', ended, {once: true});
+        try {
+            return send.apply(this, args);
+        } catch (e) {
+            ended();
+            throw e;
+        }
+    };
+    if (typeof window.fetch === 'function') {
+        const fetch = window.fetch;
+        window.fetch = function (...args) {
+            if (untracked(args[0]?.url ?? args[0])) {
+                return fetch.apply(this, args);
+            }
+            started();
+            return fetch.apply(this, args).finally(ended);
+        };
+    }
+    return state;
+})();
+
+
+/**
+ * Function to check that the requests made by the scripts of a window have settled
+ *
+ * @param {Window} win - window to check (e.g., window.gsft_main)
+ * @param {number} quietPeriod - time in ms during which no request must have started or ended
+ *
+ * @returns {boolean} - true if no request is in flight and none started or ended during the quiet period
+ */
+function requestsSettled(win, quietPeriod = 250) {
+    const state = win?.WORKARENA_PENDING_REQUESTS;
+    if (state === undefined) {
+        // The window is not loaded yet (or is not instrumented)
+        return false;
+    }
+    return state.count === 0 && Date.now() - state.last_activity >= quietPeriod;
+}
+
+
+/**
+ * Function that registers to the gsft_main afterload event and signals the load_complete milestone
  */
 function registerGsftMainLoaded(){
     // Check that the script is running in the main iframe
     if (window.frameElement?.id === 'gsft_main'){
-        waitForCondition(() => typeof window.addAfterPageLoadedEvent !== 'undefined', 100)
+        // The afterload API is defined by the page's scripts, which have all run once the DOM is loaded
+        const domLoaded = new Promise((resolve) => {
+            if (document.readyState === 'loading') {
+                document.addEventListener('DOMContentLoaded', resolve, {once: true});
+            } else {
+                resolve();
+            }
+        });
+        domLoaded
+        .then(() => waitForCondition(() => typeof window.addAfterPageLoadedEvent !== 'undefined', 100))
         .then(
             function (){
                 window.addAfterPageLoadedEvent(
                     function(){
-                                window.WORKARENA_LOAD_COMPLETE = true;
+                                signalMilestone('load_complete');
                                 waLog('WorkArena detected gsft_main load completed.')
                     }
                 );
@@ -62,11 +409,21 @@ function registerGsftMainLoaded(){
  * Function to wait for a condition to be met (asynchronous)
  * use as: waitForCondition(condition, 100).then(function)
  *
+ * The condition is checked immediately, and then polled until it is met.
+ *
  * @param {function} condition - function that returns true when condition is met
  * @param {number} pollInterval - interval in ms to poll condition
  */
 function waitForCondition(condition, pollInterval=100) {
     return new Promise((resolve, reject) => {
+        try {
+            if (condition()) {
+                resolve();
+                return;
+            }
+        } catch (e) {
+            // The condition can't be evaluated yet, keep polling
+        }
         const interval = setInterval(() => {
             if (condition()) {
                 clearInterval(interval);
@@ -148,7 +505,7 @@ function runOnlyInGsftMain(func){
         waLog(`gsft_main detected. Proceeding...`, funcName, 'info');
 
         // Wait for the iframe to be fully loaded
-        waitForCondition(() => window.WORKARENA_LOAD_COMPLETE === true, 100)
+        getMilestone(window, 'load_complete').promise
         .then(
             function(){
                 waLog(`gsft_main has finished loading. Proceeding...`, funcName, 'info');
@@ -175,3 +532,157 @@ async function runInGsftMainOnlyAndProtectByURL(func, url){
     // Run the protected function in gsft_main
     runOnlyInGsftMain(protectedFunc);
 }
+
+
+/**
+ * Function to get the state of the list visible on the page in a single call
+ *
+ * The list is searched for in gsft_main if it is present, and in the page otherwise.
+ *
+ * @param {boolean} withRows - whether to include the text of the visible rows
+ *
+ * @returns {object} - title, table, query, fields, order by, sort direction and total number of rows of the list,
+ *                     along with the number of lists on the page, the id of the list and (optionally) its rows
+ */
+function getListState(withRows = false) {
+    const win = (window.gsft_main && window.gsft_main.GlideList2) ? window.gsft_main : window;
+    const lists = win.document.querySelectorAll('table.data_list_table');
+    if (win.GlideList2 === undefined || lists.length === 0) {
+        throw new Error('No list found on page.');
+    }
+
+    const listId = lists[0].getAttribute('data-list_id');
+    const list = win.GlideList2.get(listId);
+    const table = list.getTableName();
+    const state = {
+        list_id: listId,
+        list_count: lists.length,
+        in_gsft_main: win !== window,
+        title: list.getTitle(),
+        table: table,
+        query: list.getQuery(),
+        fields: list.fields,
+        order_by: list.getOrderBy(),
+        sort_dir: list.sortDir,
+        row_count: list.grandTotalRows,
+    };
+
+    if (withRows) {
+        // Map the system name of each column to its position in the rows
+        const columns = Array.from(win.document.querySelectorAll(`#hdr_${table} th`))
+                             .map((th, i) => [th.getAttribute('name'), i])
+                             .filter(([name, _]) => name);
+        state.rows = Array.from(win.document.querySelectorAll(`.list2_body [record_class=${table}]`))
+                          .map(row => {
+                              const cells = row.querySelectorAll('td');
+                              const values = {sys_id: row.getAttribute('sys_id')};
+                              for (const [name, i] of columns) {
+                                  values[name] = cells[i] ? cells[i].innerText : null;
+                              }
+                              return values;
+                          });
+    }
+
+    return state;
+}
+
+
+/**
+ * Function to get the state of a form in a single call
+ *
+ * @param {Window} win - window that contains the form (e.g., gsft_main)
+ * @param {string} table - name of the table of the form
+ * @param {string[]} fieldNames - names of fields to describe in addition to the elements of the form
+ *
+ * @returns {object} - the elements and editable fields of the form (empty if the form API is not available) and, for
+ *                     each field, its label, visibility, mandatory flag, whether it has a rendered display element,
+ *                     the field it depends on (from that element) and the id of the section that contains it.
+ *                     Fields that are not elements of the form only get the information of their display element.
+ */
+function getFormState(win, table, fieldNames = []) {
+    const gForm = win.g_form;
+    const elements = gForm ? gForm.elements : [];
+    const elementNames = new Set(elements.map(e => e.fieldName));
+    const names = new Set([...elementNames, ...fieldNames]);
+
+    const fields = {};
+    for (const name of names) {
+        // Fields that are not rendered on the form are not visible
+        const field = {
+            label: null,
+            visible: false,
+            mandatory: null,
+            has_display: false,
+            dependent_on_field: null,
+            section: null,
+        };
+        fields[name] = field;
+
+        try {
+            const display = win.document.querySelector(`#sys_display.${table}.${name}`);
+            if (display) {
+                field.has_display = true;
+                field.dependent_on_field = display.getAttribute('data-dependent');
+            }
+
+            // The Glide form API is only reliable for the fields rendered on the form
+            if (!elementNames.has(name)) {
+                continue;
+            }
+            field.label = gForm.getLabelOf(name);
+            field.visible = gForm.isVisible(gForm.getGlideUIElement(name), gForm.getControl(name));
+            field.mandatory = gForm.isMandatory(name);
+            const element = gForm.getElement(name);
+            const section = element ? element.closest('[id^="section-"]') : null;
+            field.section = section ? section.id : null;
+        } catch (e) {
+            // Not a valid selector, or a field the Glide form API can't describe: keep what we have
+        }
+    }
+
+    return {
+        elements: elements,
+        editable_fields: gForm ? gForm.getEditableFields() : [],
+        fields: fields,
+    };
+}
+
+
+/**
+ * Function to extract all the Highcharts charts of a window in a single call
+ *
+ * @param {Window} win - window that contains the charts (e.g., gsft_main)
+ *
+ * @returns {object[]} - for each chart with a title: its title (aria label), the id of the element that contains it,
+ *                       whether that element is on the page (sometimes rendering breaks), the types of its series and
+ *                       its series with their points
+ */
+function getHighchartsCharts(win) {
+    return win.Highcharts.charts
+        .filter(chart => chart && chart.renderTo.ariaLabel)
+        .map(chart => {
+            const id = chart.renderTo.id;
+            let rendered = false;
+            try {
+                rendered = findElementInShadowDOM(`#${id}`, win.document) !== null;
+            } catch (e) {
+                // Not a valid selector
+            }
+            return {
+                title: chart.renderTo.ariaLabel,
+                id: id,
+                rendered: rendered,
+                types: chart.types,
+                series: chart.series.map(series => ({
+                    name: series.name,
+                    data: series.data.map(point => ({
+                        label_cat: point.category,
+                        label_name: point.name,
+                        label_origx: point.origXValue,
+                        count: point.y,
+                        percent: point.percent
+                    }))
+                })),
+            };
+        });
+}
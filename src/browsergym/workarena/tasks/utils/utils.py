@@ -1,8 +1,18 @@
 import logging
 import playwright.sync_api
+import time
 
+from contextlib import contextmanager
+from typing import List, Union
 from urllib import parse
 
+from ...config import (
+    SNOW_AWAIT_READY_GRACE_PERIOD,
+    SNOW_BROWSER_TIMEOUT,
+    SNOW_CHEAT_WAIT_TIMEOUT,
+    SNOW_REQUESTS_QUIET_PERIOD,
+)
+
 
 def check_url_suffix_match(page: playwright.sync_api.Page, expected_url: str, task) -> bool:
     """
@@ -20,6 +30,203 @@ def check_url_suffix_match(page: playwright.sync_api.Page, expected_url: str, ta
     return True
 
 
+def await_ready(
+    page: playwright.sync_api.Page,
+    milestones: List[str] = ["load_complete"],
+    apis: List[str] = [],
+    frame: str = "gsft_main",
+    timeout: float = None,
+) -> None:
+    """
+    Wait until milestones are reached and APIs are available in a frame, in a single call to the page
+
+    Parameters:
+    -----------
+    page: playwright.sync_api.Page
+        The page to wait on
+    milestones: list[str]
+        The milestones signalled by the page scripts (see WORKARENA_MILESTONE_FLAGS in js_utils.js), e.g.,
+        "load_complete" (the frame has finished loading) or "highcharts_loaded" (all the charts are rendered)
+    apis: list[str]
+        The global variables that must be defined in the frame (e.g., "g_form", "GlideList2")
+    frame: str
+        The name of the frame (None for the page itself)
+    timeout: float
+        Maximum time to wait, in milliseconds (defaults to SNOW_BROWSER_TIMEOUT)
+
+    Notes:
+    ------
+    The milestones are pushed by the page (see awaitReady in js_utils.js) instead of being polled from Python.
+
+    """
+    logging.debug(f"Waiting for {frame or 'page'} to be ready ({', '.join(milestones + apis)})")
+    timeout = timeout if timeout is not None else SNOW_BROWSER_TIMEOUT
+    # XXX: awaitReady returns a promise (truthy), so wait_for_function doesn't poll it and resolves when it does.
+    # Its own deadline comes a bit later than ours, so that Playwright's TimeoutError is what the caller sees.
+    page.wait_for_function(
+        "([frame, milestones, apis, timeout]) => awaitReady(frame, milestones, apis, timeout)",
+        arg=[frame, milestones, apis, timeout + SNOW_AWAIT_READY_GRACE_PERIOD],
+        timeout=timeout,
+    )
+    logging.debug(f"Detected {frame or 'page'} ready")
+
+
+@contextmanager
+def bounded_wait(description: str, timeout: float = SNOW_CHEAT_WAIT_TIMEOUT):
+    """
+    Bound an event-driven wait and report what was awaited
+
+    Parameters:
+    -----------
+    description: str
+        What is awaited (e.g., "the new sort condition"), used in the logs and in the error raised on timeout
+    timeout: float
+        Maximum time to wait, in milliseconds
+
+    Yields:
+    -------
+    float
+        The timeout, to be passed to the Playwright waits of the block
+
+    Notes:
+    ------
+    Raises a playwright.sync_api.TimeoutError that names the awaited event if the block times out.
+
+    Usage:
+    ------
+    with bounded_wait("the record preview") as timeout:
+        frame.get_by_text("Open Record").wait_for(timeout=timeout)
+
+    """
+    start = time.perf_counter()
+    try:
+        yield timeout
+    except playwright.sync_api.TimeoutError as e:
+        raise playwright.sync_api.TimeoutError(
+            f"Timed out after {timeout} ms waiting for {description}."
+        ) from e
+    logging.debug(f"Waited {time.perf_counter() - start:.3f}s for {description}")
+
+
+def remaining_timeout(timeout: float, start: float) -> float:
+    """
+    Get what remains of a timeout shared by several successive waits
+
+    Parameters:
+    -----------
+    timeout: float
+        The timeout shared by the waits, in milliseconds
+    start: float
+        When the first wait started (time.perf_counter())
+
+    Returns:
+    --------
+    float
+        The remaining time, in milliseconds (at least 1 ms, since Playwright disables timeouts of 0)
+
+    Usage:
+    ------
+    with bounded_wait("the problem form") as timeout:
+        start = time.perf_counter()
+        frame.wait_for_url("**/problem.do*", timeout=timeout)
+        await_ready(page, apis=["g_form"], timeout=remaining_timeout(timeout, start))
+
+    """
+    return max(timeout - (time.perf_counter() - start) * 1000, 1)
+
+
+def wait_for_condition(
+    target: Union[playwright.sync_api.Page, playwright.sync_api.Frame],
+    expression: str,
+    description: str,
+    arg=None,
+    timeout: float = SNOW_CHEAT_WAIT_TIMEOUT,
+) -> None:
+    """
+    Wait until a JavaScript predicate holds in a page or frame (see bounded_wait)
+
+    Parameters:
+    -----------
+    target: playwright.sync_api.Page or playwright.sync_api.Frame
+        The page or frame in which the predicate is evaluated
+    expression: str
+        The predicate (a function that takes arg)
+    description: str
+        What is awaited, used in the logs and in the error raised on timeout
+    arg: any
+        The argument of the predicate
+    timeout: float
+        Maximum time to wait, in milliseconds
+
+    """
+    with bounded_wait(description, timeout) as timeout:
+        target.wait_for_function(expression, arg=arg, timeout=timeout)
+
+
+def wait_for_requests_settled(
+    page: playwright.sync_api.Page,
+    description: str,
+    frame: str = "gsft_main",
+    quiet_period: float = SNOW_REQUESTS_QUIET_PERIOD,
+    timeout: float = SNOW_CHEAT_WAIT_TIMEOUT,
+) -> None:
+    """
+    Wait until the requests made by the scripts of a frame have settled (e.g., after a field triggered an update)
+
+    Parameters:
+    -----------
+    page: playwright.sync_api.Page
+        The page to wait on
+    description: str
+        What is awaited, used in the logs and in the error raised on timeout
+    frame: str
+        The name of the frame (None for the page itself)
+    quiet_period: float
+        Time during which no request must have started or ended, in milliseconds
+    timeout: float
+        Maximum time to wait, in milliseconds
+
+    Notes:
+    ------
+    The requests are tracked by the JS utilities (see WORKARENA_PENDING_REQUESTS in js_utils.js).
+
+    """
+    wait_for_condition(
+        page,
+        "([frame, quietPeriod]) => requestsSettled(frame ? window[frame] : window, quietPeriod)",
+        description,
+        arg=[frame, quiet_period],
+        timeout=timeout,
+    )
+
+
+def get_list_state(page: playwright.sync_api.Page, with_rows: bool = False) -> dict:
+    """
+    Get the state of the list visible on the page in a single round trip (see getListState in js_utils.js)
+
+    Parameters:
+    -----------
+    page: playwright.sync_api.Page
+        The page on which the list is visible (in gsft_main or directly in the page)
+    with_rows: bool
+        Whether to include the text of the visible rows, as a list of mappings from column names to values
+
+    Returns:
+    --------
+    dict
+        The title, table, query, fields, order_by, sort_dir and row_count of the list, along with the number of lists
+        on the page (list_count), the id of the list (list_id), whether it is in gsft_main (in_gsft_main) and its rows
+        (if requested)
+
+    Notes:
+    ------
+    Raises a playwright.sync_api.Error if no list is found on the page. The JS utilities must have been injected in
+    the page (see AbstractServiceNowTask.setup).
+
+    """
+    return page.evaluate("withRows => getListState(withRows)", with_rows)
+
+
 def prettyprint_enum(items, conjunction="and"):
     """
     Pretty print a list of items with a conjunction
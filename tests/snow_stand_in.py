@@ -0,0 +1,186 @@
+"""
+A minimal in-memory stand-in for the ServiceNow Table and Batch REST APIs, used to test the API
+helpers without a live instance.
+
+Only supports the subset of features used by the tests: ^-separated "field=value" and "fieldINa,b"
+queries, sysparm_fields, sysparm_display_value=all (display values are the raw values), the UI
+metadata API, counts and maximums of the Aggregate API and the Batch API.
+
+"""
+
+import base64
+import json
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+from uuid import uuid4
+
+
+class SNowStandIn:
+    """
+    In-memory ServiceNow REST API served on localhost
+
+    Usage:
+    ------
+    with SNowStandIn(tables={"sys_user_role": [{"name": "admin"}]}) as stand_in:
+        instance = SNowInstance(snow_url=stand_in.url, snow_credentials=("admin", "admin"))
+
+    """
+
+    def __init__(self, tables: dict = {}, ui_meta: dict = {}) -> None:
+        # Column information returned by /api/now/ui/meta/<table>, indexed by table
+        self.ui_meta = ui_meta
+        self.tables = {}
+        for table, records in tables.items():
+            for record in records:
+                self._insert(table, record)
+        # (method, path) of every HTTP request received
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                url = urlparse(self.path)
+                with stand_in.lock:
+                    stand_in.calls.append((self.command, url.path))
+                    status, response = stand_in.handle(
+                        self.command, url.path, dict(parse_qsl(url.query)), body
+                    )
+                payload = json.dumps(response).encode() if response is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @staticmethod
+    def _to_str(value) -> str:
+        # Booleans are returned as "true"/"false", like the real API
+        return str(value).lower() if isinstance(value, bool) else str(value)
+
+    def _insert(self, table: str, record: dict) -> dict:
+        record = {"sys_id": uuid4().hex, **{k: self._to_str(v) for k, v in record.items()}}
+        self.tables.setdefault(table, {})[record["sys_id"]] = record
+        return record
+
+    @staticmethod
+    def _matches(record: dict, query: str) -> bool:
+        for condition in filter(None, query.split("^")):
+            if "=" in condition:
+                field, value = condition.split("=", 1)
+                if record.get(field) != value:
+                    return False
+            elif "IN" in condition:
+                field, values = condition.split("IN", 1)
+                if record.get(field) not in values.split(","):
+                    return False
+        return True
+
+    @staticmethod
+    def _select(record: dict, params: dict) -> dict:
+        if not params.get("sysparm_fields"):
+            selected = dict(record)
+        else:
+            selected = {f: record.get(f, "") for f in params["sysparm_fields"].split(",")}
+        if params.get("sysparm_display_value") == "all":
+            selected = {f: {"value": v, "display_value": v} for f, v in selected.items()}
+        return selected
+
+    def handle(self, method: str, path: str, params: dict, body) -> tuple:
+        """
+        Handle a REST call and return its (status code, JSON response)
+
+        """
+        if path == "/api/now/v1/batch":
+            return 200, self._handle_batch(body)
+        if path.startswith("/api/now/ui/meta/"):
+            table = path[len("/api/now/ui/meta/") :]
+            return 200, {"result": {"columns": self.ui_meta.get(table, {})}}
+
+        if path.startswith("/api/now/stats/"):
+            table = path[len("/api/now/stats/") :]
+            query = params.get("sysparm_query", "")
+            matches = [r for r in self.tables.get(table, {}).values() if self._matches(r, query)]
+            stats = {}
+            if params.get("sysparm_count") == "true":
+                stats["count"] = str(len(matches))
+            if params.get("sysparm_max_fields"):
+                stats["max"] = {
+                    f: max((r.get(f, "") for r in matches), default="")
+                    for f in params["sysparm_max_fields"].split(",")
+                }
+            return 200, {"result": {"stats": stats}}
+
+        parts = path[len("/api/now/table/") :].split("/")
+        table, sys_id = parts[0], parts[1] if len(parts) > 1 else None
+        records = self.tables.setdefault(table, {})
+
+        if method == "POST":
+            return 201, {"result": self._insert(table, body)}
+        if sys_id is not None and sys_id not in records:
+            return 404, {"error": {"message": "No Record found"}}
+        if method == "GET" and sys_id is None:
+            query = params.get("sysparm_query", "")
+            return 200, {
+                "result": [
+                    self._select(r, params) for r in records.values() if self._matches(r, query)
+                ]
+            }
+        if method == "GET":
+            return 200, {"result": self._select(records[sys_id], params)}
+        if method in ("PUT", "PATCH"):
+            records[sys_id].update({k: self._to_str(v) for k, v in body.items()})
+            return 200, {"result": dict(records[sys_id])}
+        if method == "DELETE":
+            del records[sys_id]
+            return 204, None
+        return 405, {"error": {"message": "Method not supported"}}
+
+    def _handle_batch(self, batch: dict) -> dict:
+        serviced = []
+        # Serve the requests in reverse order, since the real API does not guarantee any order
+        for rest_request in reversed(batch["rest_requests"]):
+            url = urlparse(rest_request["url"])
+            body = rest_request.get("body")
+            status, response = self.handle(
+                rest_request["method"],
+                url.path,
+                dict(parse_qsl(url.query)),
+                json.loads(base64.b64decode(body)) if body else None,
+            )
+            serviced.append(
+                {
+                    "id": rest_request["id"],
+                    "status_code": status,
+                    "body": (
+                        base64.b64encode(json.dumps(response).encode()).decode()
+                        if response is not None
+                        else ""
+                    ),
+                }
+            )
+        return {
+            "batch_request_id": batch["batch_request_id"],
+            "serviced_requests": serviced,
+            "unserviced_requests": [],
+        }
@@ -1,11 +1,18 @@
+import json
 import numpy as np
 import pytest
 import random
+import threading
 
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from time import sleep
 
-from browsergym.workarena.instance import SNowInstance
-from browsergym.workarena.api.utils import table_api_call
+from browsergym.workarena.instance import SNowInstance, close_http_sessions, get_http_session
+from browsergym.workarena.api.utils import (
+    get_read_after_write_stats,
+    reset_read_after_write_stats,
+    table_api_call,
+)
 from browsergym.workarena.api.user import create_user, set_user_preference
 
 
@@ -39,3 +46,97 @@ def test_set_user_preference(system):
     # Delete the user
     if not system:
         table_api_call(admin_instance, table=f"sys_user/{user}", method="DELETE")
+
+
+def test_http_session_is_shared():
+    close_http_sessions()
+    session = get_http_session("https://example.service-now.com/")
+
+    # The same pooled session is reused for all calls to the same instance
+    assert get_http_session("https://example.service-now.com") is session
+    assert get_http_session("https://other.service-now.com") is not session
+
+    close_http_sessions()
+    assert get_http_session("https://example.service-now.com") is not session
+
+
+def test_http_session_ignores_cookies():
+    class SetCookieHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Set-Cookie", "JSESSIONID=1234; Path=/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), SetCookieHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        # Cookies are never persisted, since the session is shared by users with different credentials
+        session = get_http_session(f"http://127.0.0.1:{server.server_port}")
+        session.get(f"http://127.0.0.1:{server.server_port}/").raise_for_status()
+        assert len(session.cookies) == 0
+    finally:
+        server.shutdown()
+        close_http_sessions()
+
+
+@pytest.mark.parametrize(
+    "consistency,post_has_fields,expected_confirmations",
+    [("trust_response", True, 0), ("trust_response", False, 1), ("confirm", True, 1)],
+)
+def test_table_api_call_read_after_write(
+    monkeypatch, consistency, post_has_fields, expected_confirmations
+):
+    # The created record only becomes visible to GET requests after a few polls
+    num_hidden_gets = [2]
+
+    class TableHandler(BaseHTTPRequestHandler):
+        def _reply(self, result):
+            body = json.dumps({"result": result}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            record = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            self._reply({"sys_id": "abc", **(record if post_has_fields else {})})
+
+        def do_GET(self):
+            num_hidden_gets[0] -= 1
+            self._reply([{"sys_id": "abc"}] if num_hidden_gets[0] < 0 else [])
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), TableHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(SNowInstance, "check_status", lambda self: None)
+    instance = SNowInstance(
+        snow_url=f"http://127.0.0.1:{server.server_port}", snow_credentials=("admin", "admin")
+    )
+    reset_read_after_write_stats()
+    try:
+        result = table_api_call(
+            instance,
+            table="incident",
+            json={"short_description": "test"},
+            method="POST",
+            consistency=consistency,
+        )["result"]
+        assert result["sys_id"] == "abc"
+
+        stats = get_read_after_write_stats()["incident"]
+        assert stats["checks"] == 1
+        assert stats["confirmations"] == expected_confirmations
+        assert stats["polls"] == (3 if expected_confirmations else 0)
+        assert stats["expired"] == 0
+        # Polling starts with short delays instead of a fixed 0.5 s sleep
+        assert stats["wait_time"] < 0.5
+    finally:
+        server.shutdown()
+        close_http_sessions()
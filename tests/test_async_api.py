@@ -0,0 +1,85 @@
+"""
+Tests for the async API, using a local stand-in for the ServiceNow REST API
+
+"""
+
+import asyncio
+import pytest
+import threading
+import time
+
+from browsergym.workarena.api import async_utils
+from browsergym.workarena.instance import SNowInstance, close_http_sessions
+
+from snow_stand_in import SNowStandIn
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    monkeypatch.setattr(SNowInstance, "check_status", lambda self: None)
+    with SNowStandIn(
+        tables={"incident": [{"number": f"INC{i}", "category": "software"} for i in range(20)]}
+    ) as stand_in:
+        stand_in.instance = SNowInstance(snow_url=stand_in.url, snow_credentials=("admin", "admin"))
+        yield stand_in
+        async_utils.set_instance_limits(stand_in.url)
+    close_http_sessions()
+
+
+def test_gather_sync(stand_in):
+    sys_ids = list(stand_in.tables["incident"])
+    records = async_utils.gather_sync(
+        *[
+            async_utils.table_api_call(
+                stand_in.instance, table="incident", params={"sysparm_query": f"sys_id={sys_id}"}
+            )
+            for sys_id in sys_ids
+        ]
+    )
+    # Results are returned in the order of the calls
+    assert [r["result"][0]["sys_id"] for r in records] == sys_ids
+
+    async_utils.gather_sync(
+        *[
+            async_utils.db_delete_from_table(stand_in.instance, sys_id=sys_id, table="incident")
+            for sys_id in sys_ids
+        ]
+    )
+    assert stand_in.tables["incident"] == {}
+
+
+def test_run_sync_in_running_loop(stand_in):
+    # Simulates calling the async API from a task while Playwright's event loop is running
+    async def main():
+        return async_utils.run_sync(async_utils.table_api_call(stand_in.instance, table="incident"))
+
+    assert len(asyncio.run(main())["result"]) == 20
+
+
+def test_concurrency_limit(stand_in):
+    async_utils.set_instance_limits(stand_in.url, max_concurrency=3)
+    in_flight = [0, 0]  # current, max
+    lock = threading.Lock()
+
+    def slow_call(instance):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+
+    async_utils.gather_sync(
+        *[async_utils.call_async(slow_call, stand_in.instance) for _ in range(12)]
+    )
+    assert in_flight[1] == 3
+
+
+def test_rate_limit(stand_in):
+    async_utils.set_instance_limits(stand_in.url, max_calls_per_second=50)
+    start = time.monotonic()
+    async_utils.gather_sync(
+        *[async_utils.call_async(lambda instance: None, stand_in.instance) for _ in range(6)]
+    )
+    # 6 calls at 50 calls per second are spread over at least 100 ms
+    assert time.monotonic() - start >= 0.1
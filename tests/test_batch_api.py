@@ -0,0 +1,111 @@
+"""
+Tests for the Batch API helpers, using a local stand-in for the ServiceNow REST API
+
+"""
+
+import numpy as np
+import pytest
+
+from requests.exceptions import HTTPError
+
+from browsergym.workarena.api.batch import (
+    batch_api_call,
+    batch_create_records,
+    batch_delete_records,
+    batch_update_records,
+)
+from browsergym.workarena.api.incident import create_incidents
+from browsergym.workarena.api.user import create_users
+from browsergym.workarena.instance import SNowInstance, close_http_sessions
+
+from snow_stand_in import SNowStandIn
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    monkeypatch.setattr(SNowInstance, "check_status", lambda self: None)
+    with SNowStandIn(
+        tables={
+            "sys_user_role": [{"name": "admin"}, {"name": "itil"}],
+            "m2m_theme_style": [
+                {"theme.name": "WorkArena", "style.type": "variant", "style.sys_id": "1"},
+                {"theme.name": "WorkArena", "style.type": "variant", "style.sys_id": "2"},
+            ],
+        }
+    ) as stand_in:
+        stand_in.instance = SNowInstance(snow_url=stand_in.url, snow_credentials=("admin", "admin"))
+        yield stand_in
+    close_http_sessions()
+
+
+def test_batch_create_update_delete(stand_in):
+    instance = stand_in.instance
+    records = [{"short_description": f"incident {i}"} for i in range(7)]
+
+    created = batch_create_records(instance, table="incident", records=records, batch_size=3)
+    # Results are returned in order, even if the batch is serviced out of order
+    assert [r["short_description"] for r in created] == [r["short_description"] for r in records]
+    # 7 records with a batch size of 3 is 3 HTTP calls
+    assert stand_in.calls == [("POST", "/api/now/v1/batch")] * 3
+
+    updated = batch_update_records(
+        instance, table="incident", updates={r["sys_id"]: {"state": "2"} for r in created}
+    )
+    assert all(r["state"] == "2" for r in updated)
+
+    batch_delete_records(instance, table="incident", sys_ids=[r["sys_id"] for r in created])
+    assert stand_in.tables["incident"] == {}
+
+
+def test_batch_api_call_errors(stand_in):
+    requests = [
+        {"table": "incident", "method": "POST", "json": {"number": "INC1"}},
+        {"table": "incident/does_not_exist", "method": "DELETE"},
+    ]
+    with pytest.raises(HTTPError):
+        batch_api_call(stand_in.instance, requests=requests)
+
+    outcomes = batch_api_call(stand_in.instance, requests=requests, raise_on_error=False)
+    assert outcomes[0]["status_code"] == 201
+    assert outcomes[0]["result"]["number"] == "INC1"
+    assert outcomes[1]["status_code"] == 404
+
+
+def test_create_incidents(stand_in):
+    incidents = create_incidents(
+        stand_in.instance,
+        incidents=[
+            {
+                "incident_number": f"INC{i}",
+                "caller_sys_id": "caller",
+                "category": "software",
+                "impact": 2,
+                "urgency": 3,
+                "priority": 4,
+            }
+            for i in range(5)
+        ],
+    )
+    assert [incident["number"] for incident in incidents] == [f"INC{i}" for i in range(5)]
+    assert len(stand_in.tables["incident"]) == 5
+
+
+def test_create_users(stand_in):
+    users = create_users(
+        stand_in.instance,
+        users=[{"first_name": "Ada", "last_name": "Lovelace"}, {}],
+        user_roles=["admin", "itil"],
+        random=np.random.RandomState(0),
+    )
+    assert len(users) == 2
+    user_name, password, sys_id = users[0]
+    assert user_name.startswith("Ada.Lovelace.")
+    assert stand_in.tables["sys_user"][sys_id]["user_password"] == password
+
+    # Each user has all the roles and a UI theme preference
+    assert len(stand_in.tables["sys_user_has_role"]) == 4
+    preferences = stand_in.tables["sys_user_preference"].values()
+    assert sorted(p["user"] for p in preferences) == sorted(u[2] for u in users)
+
+    # Users, roles and preferences are created with one call each, whatever the number of users
+    assert stand_in.calls.count(("POST", "/api/now/v1/batch")) == 3
@@ -0,0 +1,124 @@
+"""
+Tests for the benchmark harness instrumentation (run against a local stand-in of the REST API)
+
+"""
+
+import csv
+import json
+import os
+import time
+
+import pytest
+
+from browsergym.workarena.api import utils as api_utils
+from browsergym.workarena.api.utils import table_api_call
+from browsergym.workarena.bench import (
+    PhaseRecorder,
+    instrument,
+    summarize,
+    summarize_idle,
+    write_results,
+)
+from browsergym.workarena.instance import SNowInstance, close_http_sessions
+
+from snow_stand_in import SNowStandIn
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    monkeypatch.setattr(SNowInstance, "check_status", lambda self: None)
+    with SNowStandIn(tables={"incident": [{"number": "INC0001"}]}) as stand_in:
+        stand_in.instance = SNowInstance(snow_url=stand_in.url, snow_credentials=("admin", "admin"))
+        yield stand_in
+    close_http_sessions()
+
+
+def test_instrument(stand_in):
+    recorder = PhaseRecorder()
+    with instrument(recorder):
+        with recorder.phase("setup"):
+            with recorder.phase("setup_goal"):
+                table_api_call(instance=stand_in.instance, table="incident")
+                # Modules that imported sleep directly are instrumented as well
+                api_utils.sleep(0.01)
+            time.sleep(0.01)
+        with recorder.phase("validate"):
+            table_api_call(instance=stand_in.instance, table="incident")
+    # Patches are removed
+    assert api_utils.sleep is time.sleep and time.sleep.__name__ == "sleep"
+
+    setup, setup_goal, validate = (recorder.phases[p] for p in ["setup", "setup_goal", "validate"])
+    assert setup["rest_calls"] == setup_goal["rest_calls"] == validate["rest_calls"] == 1
+    assert setup["rest_bytes"] > 0
+    assert setup_goal["sleep_time"] >= 0.01 and setup["sleep_time"] >= 0.02
+    assert validate["sleep_time"] == 0 and validate["navigations"] == 0
+    assert setup["duration"] >= setup_goal["duration"] >= 0.01
+
+
+def test_idle_sites(stand_in):
+    recorder = PhaseRecorder()
+    with instrument(recorder):
+        with recorder.phase("cheat"):
+            # Waits are attributed to the innermost WorkArena caller
+            api_utils._poll_for_record(
+                stand_in.instance, "incident", {"sysparm_query": "number=INC0001"}, max_retries=1
+            )
+            time.sleep(0.01)
+    (site,) = [site for site in recorder.idle_sites if site != "other"]
+    assert site.startswith(f"api{os.sep}utils.py:")
+    assert recorder.idle_sites["other"] >= 0.01
+    assert recorder.phases["cheat"]["sleep_time"] == pytest.approx(
+        sum(recorder.idle_sites.values())
+    )
+
+    episodes = [
+        {
+            "task": "a",
+            "task_class": "TaskA",
+            "seed": seed,
+            "error": None,
+            "phases": {"setup": {"sleep_time": 1.0}, "cheat": {"sleep_time": 2.0 + seed}},
+            "idle_sites": {"tasks/a.py:1": 1.0, "tasks/a.py:2": 2.0 + seed},
+        }
+        for seed in range(2)
+    ] + [{"task": "b", "task_class": "TaskB", "seed": 0, "error": "failed", "phases": {}}]
+    (row,) = summarize_idle(episodes)
+    assert row["task_class"] == "TaskA" and row["n"] == 2
+    assert row["idle_time"] == pytest.approx(3.5)
+    assert row["phases"]["cheat"] == pytest.approx(2.5) and row["phases"]["validate"] == 0
+    assert list(row["sites"]) == ["tasks/a.py:2", "tasks/a.py:1"]
+
+
+def test_summarize(tmp_path):
+    episodes = [
+        {
+            "task": task,
+            "seed": seed,
+            "error": None if seed < 100 else "failed",
+            "phases": {
+                "validate": {
+                    "duration": float(seed),
+                    "rest_calls": 2,
+                    "rest_bytes": 10,
+                    "navigations": 0,
+                    "sleep_time": 0.0,
+                }
+            },
+        }
+        for task in ["a", "b"]
+        for seed in [*range(100), 100]
+    ]
+    rows = {(row["task"], row["phase"]): row for row in summarize(episodes)}
+    assert set(rows) == {("a", "validate"), ("b", "validate"), ("all", "validate")}
+    assert rows["a", "validate"]["n"] == 100 and rows["all", "validate"]["n"] == 200
+    assert rows["a", "validate"]["p50"] == pytest.approx(49.5)
+    assert rows["a", "validate"]["p99"] == pytest.approx(98.01)
+    assert rows["all", "validate"]["rest_calls"] == 2
+
+    results = {"metadata": {}, "summary": list(rows.values()), "episodes": episodes}
+    write_results(results, str(tmp_path / "results.json"))
+    with open(tmp_path / "results.json") as f:
+        assert json.load(f) == results
+    write_results(results, str(tmp_path / "results.csv"))
+    with open(tmp_path / "results.csv") as f:
+        assert [row["task"] for row in csv.DictReader(f)] == ["a", "all", "b"]
@@ -0,0 +1,63 @@
+"""
+Tests for the pool of warm browsers
+
+"""
+
+import threading
+
+from browsergym.workarena import session_cache
+from browsergym.workarena.browser_pool import BrowserPool
+from browsergym.workarena.instance import SNowInstance
+from browsergym.workarena.session_cache import get_session_cache
+
+from snow_stand_in import SNowStandIn
+
+
+def test_browser_pool(monkeypatch):
+    logins = []
+
+    def login(instance, page):
+        # Stand-in for the login of ServiceNow, which sets a session cookie and a CSRF token
+        page.goto(instance.snow_url + "/login.do")
+        page.evaluate(
+            "() => { document.cookie = 'glide_session_store=1; path=/'; window.g_ck = 'token'; }"
+        )
+        logins.append(instance.snow_credentials[0])
+
+    monkeypatch.setattr(session_cache, "session_is_valid", lambda page, instance, token: True)
+    get_session_cache().clear()
+    with SNowStandIn() as stand_in:
+        admin = SNowInstance(snow_url=stand_in.url, snow_credentials=("admin", "admin"))
+        user = SNowInstance(snow_url=stand_in.url, snow_credentials=("user", "user"))
+        pool = BrowserPool()
+        try:
+            for instance in [admin, admin, user]:
+                with pool.page(instance, login=login) as page:
+                    page.goto(stand_in.url + "/stats.do")
+                    assert page.evaluate("document.cookie") == "glide_session_store=1"
+                    assert len(page.context.pages) == 1
+            # Contexts are fresh but share the browser, and users log in once
+            assert pool.stats == {"launches": 1, "contexts": 3, "logins": 2}
+            assert logins == ["admin", "user"]
+
+            with pool.page() as page:
+                page.goto(stand_in.url + "/stats.do")
+                assert page.evaluate("document.cookie") == ""
+
+            # A crashed browser is launched again
+            pool.browser().close()
+            with pool.page():
+                pass
+            assert pool.stats["launches"] == 2
+
+            # Each worker (thread) has its own browser
+            browsers = []
+            worker = threading.Thread(
+                target=lambda: (browsers.append(pool.browser()), pool.close())
+            )
+            worker.start()
+            worker.join()
+            assert browsers[0] is not pool.browser() and pool.stats["launches"] == 3
+        finally:
+            pool.close()
+            get_session_cache().clear()
@@ -0,0 +1,142 @@
+"""
+Tests for the record/replay cassettes of REST traffic (recorded against the local emulator)
+
+"""
+
+import pytest
+import requests
+
+from browsergym.workarena.api.utils import db_delete_from_table, table_api_call, table_column_info
+from browsergym.workarena.cassette import (
+    Cassette,
+    CassetteAdapter,
+    CassetteMissError,
+    normalize_request,
+)
+from browsergym.workarena.emulator import SNowEmulator
+from browsergym.workarena.instance import SNowInstance, close_http_sessions
+from browsergym.workarena.tasks import base
+
+# Any REST call that is not replayed would fail to resolve this host
+SNOW_URL = "http://workarena-cassette.invalid"
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    close_http_sessions()
+    yield Cassette(str(tmp_path / "cassette.sqlite"))
+    close_http_sessions()
+
+
+def run_episode(description_suffix: str = "") -> list:
+    instance = SNowInstance(snow_url=SNOW_URL, snow_credentials=("admin", "admin"))
+    tag = str(base.uuid4())
+    created = table_api_call(
+        instance=instance,
+        table="incident",
+        json={"short_description": f"{tag}{description_suffix}"},
+        method="POST",
+    )["result"]
+    found = table_api_call(
+        instance=instance,
+        table="incident",
+        params={"sysparm_query": f"short_descriptionLIKE{tag}", "sysparm_fields": "sys_id"},
+    )["result"]
+    columns = table_column_info(instance, "incident", use_cache=False)
+    db_delete_from_table(instance, created["sys_id"], "incident")
+    remaining = table_api_call(
+        instance=instance,
+        table="incident",
+        params={"sysparm_query": f"short_descriptionLIKE{tag}", "sysparm_fields": "sys_id"},
+    )["result"]
+    return [created["sys_id"], found, sorted(columns), remaining]
+
+
+def test_record_and_replay(cassette):
+    emulator = SNowEmulator(tables={"incident": [{"short_description": "other"}]})
+    with emulator.mount(SNOW_URL):
+        with cassette.episode("episode", SNOW_URL, mode="record"):
+            recorded = run_episode()
+    assert recorded[1] == [{"sys_id": recorded[0]}] and recorded[3] == []
+    assert cassette.episodes() == ["episode"]
+
+    # The emulator is no longer mounted, so calls can only be served by the cassette. The identical queries made
+    # before and after the deletion are replayed in order.
+    with cassette.episode("episode", SNOW_URL, mode="replay") as adapter:
+        assert run_episode() == recorded
+    assert adapter.loose_hits == 0 and adapter.hits == len(adapter.interactions)
+
+    # Calls whose body differs are matched without their body
+    with cassette.episode("episode", SNOW_URL, mode="replay") as adapter:
+        assert run_episode(description_suffix=" (edited)") == recorded
+    assert adapter.loose_hits == 1
+
+    with pytest.raises(CassetteMissError):
+        with cassette.episode("other episode", SNOW_URL, mode="replay"):
+            pass
+    with cassette.episode("episode", SNOW_URL, mode="replay"):
+        instance = SNowInstance(snow_url=SNOW_URL, snow_credentials=("admin", "admin"))
+        with pytest.raises(CassetteMissError):
+            table_api_call(instance=instance, table="problem")
+
+
+def test_deduplication(cassette):
+    emulator = SNowEmulator()
+    with emulator.mount(SNOW_URL):
+        for name in ["a", "b", "a"]:
+            with cassette.episode(name, SNOW_URL, mode="auto"):
+                instance = SNowInstance(snow_url=SNOW_URL, snow_credentials=("admin", "admin"))
+                table_api_call(instance=instance, table="incident")
+    # Episode "a" was replayed the second time
+    assert emulator.call_count == 2
+    # The responses of the health check and of the query are shared by both episodes
+    assert cassette.db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 2
+
+    # Bodies are dropped once no episode uses them
+    with emulator.mount(SNOW_URL):
+        with cassette.episode("a", SNOW_URL, mode="record"):
+            pass
+        assert cassette.db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 2
+        with cassette.episode("b", SNOW_URL, mode="record"):
+            pass
+    assert cassette.load_episode("a") == cassette.load_episode("b") == []
+    assert cassette.db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 0
+
+
+def test_replay_order_across_matches():
+    interactions = []
+    for i, body in enumerate([b'{"a": 1}', b'{"a": 2}', b'{"a": 3}']):
+        key, loose_key = normalize_request("POST", SNOW_URL + "/api/now/table/incident", body, None)
+        interactions.append(
+            {
+                "key": key,
+                "loose_key": loose_key,
+                "status": 201,
+                "content_type": "application/json",
+                "body": str(i).encode(),
+                "elapsed": 0,
+            }
+        )
+    adapter = CassetteAdapter("replay", interactions)
+    replay = lambda body: adapter.send(
+        requests.Request("POST", SNOW_URL + "/api/now/table/incident", data=body).prepare()
+    ).content
+
+    # Calls replayed with an exact match are not replayed again with a loose match
+    assert replay(b'{"a": 1}') == b"0"
+    assert replay(b'{"a": 4}') == b"1"
+    assert replay(b'{"a": 3}') == b"2"
+    assert replay(b'{"a": 5}') == b"2"
+    assert (adapter.hits, adapter.loose_hits) == (2, 2)
+
+
+def test_normalize_request():
+    key, loose_key = normalize_request(
+        "get", "http://x/api/now/table/incident?b=2&a=1", b'{"y": 1, "x": 2}', None
+    )
+    assert (key, loose_key) == normalize_request(
+        "GET", "http://y/api/now/table/incident/?a=1&b=2", b'{"x":2,"y":1}', None
+    )
+    assert (
+        key != normalize_request("GET", "http://x/api/now/table/incident?a=1&b=2", b"{}", None)[0]
+    )
@@ -50,6 +50,45 @@ def test_knapsack(mode: str, num_items_in_solution: int = 2):
         assert len(selected_indices) == len(investments)
 
 
+@pytest.mark.parametrize("seed", range(5))
+def test_knapsack_solvers_agree(seed: int):
+    random = np.random.RandomState(seed)
+    knapsack = KnapsackInstanceGenarator(random=random, num_items=3, max_capacity=150000)
+    for _ in range(200):
+        # Small returns and capacities produce many ties, which exercise the counting of solutions
+        max_capacity = random.randint(0, 60)
+        investments = [
+            (random.randint(0, max_capacity + 3) * random.choice([1, 3]), random.randint(0, 20))
+            for _ in range(random.randint(1, 8))
+        ]
+        assert knapsack.solve_knapsack(investments, max_capacity) == knapsack.solve_knapsack_python(
+            investments, max_capacity
+        )
+
+    # Instances of the size used by the tasks
+    for num_items in [3, 6, 9]:
+        investments = [
+            (random.randint(150000 // (num_items * 2), 75000), random.randint(75000, 115000))
+            for _ in range(num_items)
+        ]
+        assert knapsack.solve_knapsack(investments, 150000) == knapsack.solve_knapsack_python(
+            investments, 150000
+        )
+
+
+@pytest.mark.parametrize("num_items", [3, 6])
+def test_knapsack_batched(num_items: int):
+    knapsack = KnapsackInstanceGenarator(
+        random=np.random.RandomState(0), num_items=num_items, max_capacity=150000, batch_size=8
+    )
+    for _ in range(5):
+        investments, max_return, selected_indices = knapsack.get_instance()
+        assert len(investments) == num_items
+        assert sum(investments[i][0] for i in selected_indices) <= 150000
+        assert sum(investments[i][0] for i in range(num_items)) > 150000
+        assert knapsack.solve_knapsack(investments, 150000) == (max_return, 1, selected_indices)
+
+
 config_generator_and_config_path = [
     [get_infeasible_form_config, CREATE_USER_CONFIG_PATH],
     [get_infeasible_service_catalog_config, ORDER_APPLE_MAC_BOOK_PRO15_TASK_CONFIG_PATH],
@@ -0,0 +1,57 @@
+"""
+Tests for the process-level store of static JSON files
+
+"""
+
+import json
+import numpy as np
+import pytest
+
+from browsergym.workarena.config import ALL_MENU_PATH, CREATE_USER_CONFIG_PATH
+from browsergym.workarena.config_store import (
+    choose_config,
+    get_configs,
+    get_json,
+    prewarm_config_store,
+)
+
+
+@pytest.mark.parametrize("path", [ALL_MENU_PATH, CREATE_USER_CONFIG_PATH])
+def test_configs_match_file(path):
+    with open(path, "r") as f:
+        expected = json.load(f)
+    configs = get_configs(path)
+    assert len(configs) == len(expected)
+    assert list(configs) == expected
+    assert configs[-1] == expected[-1]
+    assert configs[3:10:2] == expected[3:10:2]
+    with pytest.raises(IndexError):
+        configs[len(expected)]
+    # The file is only indexed once per process
+    assert get_configs(path) is configs
+
+
+def test_configs_are_read_only(tmp_path):
+    path = tmp_path / "configs.json"
+    path.write_text(json.dumps([{"name": "Zoë", "values": [1, "a,]"]}, ["é"], "x"]), "utf-8")
+
+    configs = get_configs(str(path))
+    assert list(configs) == [{"name": "Zoë", "values": [1, "a,]"]}, ["é"], "x"]
+    configs[0]["name"] = "changed"
+    assert configs[0]["name"] == "Zoë"
+
+    document = get_json(str(path))
+    document.append("changed")
+    assert len(get_json(str(path))) == 3
+
+
+def test_choose_config_matches_random_choice():
+    configs = get_configs(ALL_MENU_PATH)
+    expected = list(configs)
+    random, expected_random = np.random.RandomState(42), np.random.RandomState(42)
+    for _ in range(10):
+        assert choose_config(random, configs) == expected_random.choice(expected)
+
+
+def test_prewarm():
+    assert prewarm_config_store() > 0
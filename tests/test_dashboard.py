@@ -0,0 +1,111 @@
+"""
+Tests for the extraction of charts in dashboard tasks (with a stand-in for the page)
+
+"""
+
+import pytest
+
+from tenacity import RetryError
+
+from browsergym.workarena.instance import SNowInstance
+from browsergym.workarena.tasks.dashboard import SingleChartValueRetrievalTask, clear_chart_cache
+
+CHARTS = [
+    {
+        "title": "Highcharts interactive chart. Incidents by priority.",
+        "id": "chart-1",
+        "rendered": True,
+        "types": ["pie"],
+        "series": [
+            {
+                "name": "Priority",
+                "data": [
+                    {
+                        "label_cat": None,
+                        "label_name": "1 - Critical ",
+                        "label_origx": None,
+                        "count": 0,
+                        "percent": None,
+                    },
+                    {
+                        "label_cat": None,
+                        "label_name": "2 - High",
+                        "label_origx": None,
+                        "count": 3,
+                        "percent": 100,
+                    },
+                ],
+            }
+        ],
+    },
+    {"title": "Highcharts interactive chart. Broken.", "id": "chart-2", "rendered": False},
+]
+
+
+class PageStandIn:
+    def __init__(self, url, charts):
+        self.url = url
+        self.charts = charts
+        self.n_evaluate = 0
+
+    def frame(self, name):
+        return None
+
+    def evaluate(self, expression):
+        assert expression == "getHighchartsCharts(window.gsft_main)"
+        self.n_evaluate += 1
+        return self.charts
+
+
+@pytest.fixture
+def task(monkeypatch):
+    clear_chart_cache()
+    task = SingleChartValueRetrievalTask.__new__(SingleChartValueRetrievalTask)
+    task.iframe_id = "gsft_main"
+    task.instance = SNowInstance.__new__(SNowInstance)
+    task.instance.snow_url = "https://instance.service-now.com"
+    task.report_filter = ("2024-01-01", "12:00:00")
+    monkeypatch.setattr(task, "_wait_for_ready", lambda page: None)
+    yield task
+    clear_chart_cache()
+
+
+def test_chart_extraction_is_cached(task):
+    page = PageStandIn("https://instance.service-now.com/report", CHARTS)
+    assert task._get_charts(page) == [("Incidents by priority", "chart-1")]
+    chart_type, chart_data, element_id = task._get_chart_by_title(page, "incidents by priority")
+    assert (chart_type, element_id) == ("pie", "chart-1")
+    assert chart_data == [
+        {
+            "name": "Priority",
+            "data": [
+                {"count": 0, "percent": 0, "label": "1 - Critical"},
+                {"count": 3, "percent": 100, "label": "2 - High"},
+            ],
+        }
+    ]
+    # The cached charts are not modified by reading them
+    assert task._get_chart_by_title(page)[1] == chart_data
+    assert page.n_evaluate == 1
+
+    # Other pages and other report filters are extracted separately
+    other_page = PageStandIn("https://instance.service-now.com/dashboard", CHARTS)
+    task._get_charts(other_page)
+    assert other_page.n_evaluate == 1
+    task.report_filter = ("2024-02-01", "12:00:00")
+    task._get_charts(page)
+    assert page.n_evaluate == 2
+
+
+def test_missing_chart_is_not_cached(task):
+    page = PageStandIn("https://instance.service-now.com/report", CHARTS)
+    with pytest.raises(RetryError):
+        task._get_chart_by_title.retry_with(wait=lambda *args: 0)(task, page, "missing")
+    # The charts were extracted again at each attempt
+    assert page.n_evaluate == 3
+
+    # Pages on which no chart is found are not cached
+    empty_page = PageStandIn("https://instance.service-now.com/empty", [])
+    assert task._get_charts(empty_page) == []
+    assert task._get_charts(empty_page) == []
+    assert empty_page.n_evaluate == 2
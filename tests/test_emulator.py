@@ -0,0 +1,218 @@
+"""
+Tests for the local emulator of the ServiceNow REST APIs
+
+"""
+
+import pytest
+import requests
+
+from datetime import datetime
+
+from browsergym.workarena.api.batch import batch_api_call
+from browsergym.workarena.api.utils import table_api_call, table_column_info
+from browsergym.workarena.emulator import SNowEmulator, evaluate_javascript_value
+from browsergym.workarena.instance import SNowInstance, close_http_sessions
+
+NOW = datetime(2024, 5, 17, 14, 30, 15).timestamp()
+
+
+@pytest.fixture
+def emulator():
+    close_http_sessions()
+    users = [
+        {"user_name": "beth.anglin", "first_name": "Beth", "last_name": "Anglin", "active": True},
+        {"user_name": "fred.luddy", "first_name": "Fred", "last_name": "Luddy", "active": False},
+        {"user_name": "abel.tuter", "first_name": "Abel", "last_name": "Tuter", "active": True},
+    ]
+    emulator = SNowEmulator(
+        tables={"sys_user": users},
+        ui_meta={
+            "incident": {
+                "caller_id": {"name": "caller_id", "type": "reference", "reference": "sys_user"},
+                "priority": {
+                    "name": "priority",
+                    "type": "choice",
+                    "choices": [
+                        {"value": "1", "label": "1 - Critical"},
+                        {"value": "2", "label": "2 - High"},
+                    ],
+                },
+            }
+        },
+        clock=lambda: NOW,
+    )
+    yield emulator
+    close_http_sessions()
+
+
+def _query(instance, table, query, **params):
+    return table_api_call(
+        instance=instance, table=table, params={"sysparm_query": query, **params}
+    )["result"]
+
+
+def test_encoded_queries(emulator):
+    with emulator.mount() as instance:
+        user_names = lambda query, **params: [
+            r["user_name"] for r in _query(instance, "sys_user", query, **params)
+        ]
+        assert user_names("") == ["beth.anglin", "fred.luddy", "abel.tuter"]
+        assert user_names("active=true") == ["beth.anglin", "abel.tuter"]
+        assert user_names("first_name=beth") == ["beth.anglin"]  # Case-insensitive
+        assert user_names("first_name!=Beth^active=true") == ["abel.tuter"]
+        assert user_names("first_nameSTARTSWITHf^ORlast_nameLIKEtut") == [
+            "fred.luddy",
+            "abel.tuter",
+        ]
+        assert user_names("first_nameENDSWITHel^NQuser_nameINfred.luddy,nobody") == [
+            "fred.luddy",
+            "abel.tuter",
+        ]
+        assert user_names("user_nameNOT INfred.luddy^first_nameNOT LIKEet") == ["abel.tuter"]
+        assert user_names("emailISEMPTY^ORDERBYDESCuser_name") == [
+            "fred.luddy",
+            "beth.anglin",
+            "abel.tuter",
+        ]
+        assert user_names("emailISNOTEMPTY") == []
+        assert user_names("ORDERBYlast_name", sysparm_limit=1, sysparm_offset=1) == ["fred.luddy"]
+        assert user_names("sys_created_on>=javascript:gs.minutesAgoStart(5)") == user_names("")
+        assert user_names("sys_created_on<javascript:gs.daysAgoStart(1)") == []
+
+        # Invalid queries are rejected
+        with pytest.raises(requests.HTTPError):
+            user_names("first_name~Beth")
+        for params in ({"sysparm_limit": "all"}, {"sysparm_offset": "x"}):
+            with pytest.raises(requests.HTTPError):
+                user_names("", **params)
+            assert emulator.handle("GET", "/api/now/table/sys_user", params)[0] == 400
+
+
+def test_records_and_display_values(emulator):
+    with emulator.mount() as instance:
+        beth = _query(instance, "sys_user", "user_name=beth.anglin")[0]
+        assert beth["name"] == "Beth Anglin"
+
+        # System fields are filled in and numbers are generated
+        incident = table_api_call(
+            instance=instance,
+            table="incident",
+            json={
+                "short_description": "Printer on fire",
+                "caller_id": beth["sys_id"],
+                "priority": "1",
+            },
+            method="POST",
+        )["result"]
+        assert incident["number"] == "INC0010001"
+        assert incident["sys_created_on"] == "2024-05-17 14:30:15"
+        assert incident["caller_id"] == {
+            "link": f"{instance.snow_url}/api/now/table/sys_user/{beth['sys_id']}",
+            "value": beth["sys_id"],
+        }
+
+        params = {"sysparm_fields": "number,caller_id,caller_id.user_name,priority"}
+        display = table_api_call(
+            instance=instance,
+            table=f"incident/{incident['sys_id']}",
+            params={
+                **params,
+                "sysparm_display_value": "true",
+                "sysparm_exclude_reference_link": "true",
+            },
+        )["result"]
+        assert display == {
+            "number": "INC0010001",
+            "caller_id": "Beth Anglin",
+            "caller_id.user_name": "beth.anglin",
+            "priority": "1 - Critical",
+        }
+        both = _query(
+            instance,
+            "incident",
+            "caller_id.user_name=beth.anglin",
+            **params,
+            sysparm_display_value="all",
+        )
+        assert both[0]["priority"] == {"display_value": "1 - Critical", "value": "1"}
+
+        # Display values can be used as input
+        updated = table_api_call(
+            instance=instance,
+            table=f"incident/{incident['sys_id']}",
+            params={
+                "sysparm_input_display_value": "true",
+                "sysparm_exclude_reference_link": "true",
+            },
+            json={"priority": "2 - High", "caller_id": "Fred Luddy"},
+            method="PATCH",
+        )["result"]
+        assert updated["priority"] == "2"
+        assert (
+            updated["caller_id"]
+            == _query(instance, "sys_user", "user_name=fred.luddy")[0]["sys_id"]
+        )
+        assert updated["sys_mod_count"] == "1"
+
+        table_api_call(instance=instance, table=f"incident/{incident['sys_id']}", method="DELETE")
+        assert _query(instance, "incident", "") == []
+        with pytest.raises(requests.HTTPError):
+            table_api_call(instance=instance, table=f"incident/{incident['sys_id']}")
+
+        # Column information
+        columns = table_column_info(instance, "incident", use_cache=False)
+        assert columns["priority"]["choices"] == {"1": "1 - Critical", "2": "2 - High"}
+
+
+def test_batch_and_authentication(emulator):
+    with emulator.mount() as instance:
+        outcomes = batch_api_call(
+            instance,
+            [
+                {
+                    "table": "sys_user",
+                    "method": "POST",
+                    "json": {"user_name": "new.user", "user_password": "pwd"},
+                },
+                {"table": "sys_user", "params": {"sysparm_query": "user_name=beth.anglin"}},
+            ],
+        )
+        assert [o["status_code"] for o in outcomes] == [201, 200]
+        assert outcomes[1]["result"][0]["user_name"] == "beth.anglin"
+
+        # Users created through the API can authenticate, others cannot
+        user = SNowInstance(snow_url=instance.snow_url, snow_credentials=("new.user", "pwd"))
+        created = table_api_call(
+            instance=user, table="problem", json={"short_description": "x"}, method="POST"
+        )
+        assert created["result"]["sys_created_by"] == "new.user"
+        intruder = SNowInstance(snow_url=instance.snow_url, snow_credentials=("new.user", "wrong"))
+        with pytest.raises(requests.HTTPError):
+            table_api_call(instance=intruder, table="problem")
+
+
+def test_serve_on_localhost(emulator, tmp_path):
+    with emulator.serve() as url:
+        instance = SNowInstance(snow_url=url, snow_credentials=("admin", "admin"))
+        assert len(_query(instance, "sys_user", "active=true")) == 2
+        table_api_call(instance=instance, table="sys_user", json={"user_name": "x"}, method="POST")
+    assert len(emulator.query("sys_user")) == 4
+
+    # Records persist in the database
+    path = str(tmp_path / "emulator.sqlite")
+    SNowEmulator(tables={"incident": [{"short_description": "a"}]}, database=path)
+    assert SNowEmulator(database=path).query("incident")[0]["short_description"] == "a"
+
+
+def test_javascript_values():
+    now = datetime(2024, 5, 17, 14, 30, 15)
+    assert evaluate_javascript_value("abc", now) == "abc"
+    assert (
+        evaluate_javascript_value("javascript:gs.minutesAgoStart(10)", now) == "2024-05-17 14:20:00"
+    )
+    assert evaluate_javascript_value("javascript:gs.daysAgoStart(2)", now) == "2024-05-15 00:00:00"
+    assert evaluate_javascript_value("javascript:gs.daysAgoEnd(0)", now) == "2024-05-17 23:59:59"
+    assert (
+        evaluate_javascript_value("javascript:gs.dateGenerate('2024-01-01','end')", now)
+        == "2024-01-01 23:59:59"
+    )
@@ -0,0 +1,93 @@
+"""
+Tests for the encoded query parser
+
+"""
+
+import pytest
+
+from browsergym.workarena.encoded_query import (
+    Condition,
+    encoded_queries_equivalent,
+    evaluate_encoded_query,
+    normalize_encoded_query,
+    parse_encoded_query,
+)
+
+
+def test_parse_encoded_query():
+    query = parse_encoded_query(
+        "active=true^priority=1^ORpriority=2^NQnameLIKEa^^b^ORDERBYDESCnumber^EQ"
+    )
+    assert query.groups == (
+        (
+            (Condition("active", "=", "true"),),
+            (Condition("priority", "=", "1"), Condition("priority", "=", "2")),
+        ),
+        ((Condition("name", "LIKE", "a^b"),),),
+    )
+    assert query.order_by == (("number", True),)
+    assert str(query) == "active=true^priority=1^ORpriority=2^NQnameLIKEa^^b^ORDERBYDESCnumber"
+
+    # Operators that share a prefix
+    assert parse_encoded_query(
+        "emailISEMPTY^stateIN1,2^nameNOT INa^nameNOT LIKEb^x.yISNOTEMPTY"
+    ).conditions == [
+        Condition("email", "ISEMPTY"),
+        Condition("state", "IN", "1,2"),
+        Condition("name", "NOT IN", "a"),
+        Condition("name", "NOT LIKE", "b"),
+        Condition("x.y", "ISNOTEMPTY"),
+    ]
+    assert parse_encoded_query("").groups == ()
+
+
+@pytest.mark.parametrize("query", ["name", "Name=a", "emailISEMPTYx", "name~a"])
+def test_parse_invalid_encoded_query(query):
+    with pytest.raises(ValueError):
+        parse_encoded_query(query)
+
+
+@pytest.mark.parametrize(
+    "query, other_query",
+    [
+        ("a=1^b=2", "b=2^a=1"),
+        ("a=1^ORa=2", "a=2^NQa=1"),
+        ("a=1^b=2^ORb=3", "a=1^b=3^NQb=2^a=1"),
+        ("aISEMPTY^bEMPTYSTRING^c=", "a=^bISEMPTY^cEMPTYSTRING^"),
+        ("aIN2,1^b= x ", "aIN1,2^b=x"),
+    ],
+)
+def test_equivalent_encoded_queries(query, other_query):
+    assert encoded_queries_equivalent(query, other_query)
+    assert normalize_encoded_query(query) == normalize_encoded_query(other_query)
+
+
+@pytest.mark.parametrize(
+    "query, other_query",
+    [("a=1^b=2", "a=1^ORb=2"), ("a=1", "a!=1"), ("a=1^ORDERBYb", "a=1^ORDERBYDESCb")],
+)
+def test_different_encoded_queries(query, other_query):
+    assert not encoded_queries_equivalent(query, other_query)
+
+
+def test_parse_encoded_query_is_cached():
+    assert parse_encoded_query("a=1^b=2") is parse_encoded_query("a=1^b=2")
+
+
+def test_evaluate_encoded_query():
+    rows = [
+        {"number": "INC3", "priority": "1 - Critical", "assigned_to": "Beth Anglin", "count": "10"},
+        {"number": "INC1", "priority": "2 - High", "assigned_to": "", "count": "9"},
+        {"number": "INC2", "priority": "1 - Critical", "count": "2"},
+    ]
+    numbers = lambda query: [r["number"] for r in evaluate_encoded_query(query, rows)]
+    assert numbers("") == ["INC3", "INC1", "INC2"]
+    assert numbers("ORDERBYnumber") == ["INC1", "INC2", "INC3"]
+    assert numbers("priority=1 - critical^ORDERBYDESCnumber") == ["INC3", "INC2"]
+    assert numbers("assigned_toISEMPTY^ORassigned_toLIKEbeth") == ["INC3", "INC1", "INC2"]
+    assert numbers("assigned_toISNOTEMPTY^NQnumberININC2,INC4") == ["INC3", "INC2"]
+    assert numbers("count>5^numberSTARTSWITHinc") == ["INC3", "INC1"]
+    assert numbers("numberNOT ININC1^priorityNOT LIKEcritical") == []
+    assert numbers("ORDERBYpriority^ORDERBYDESCnumber") == ["INC3", "INC2", "INC1"]
+    with pytest.raises(ValueError):
+        numbers("sys_created_on>javascript:gs.daysAgo(1)")
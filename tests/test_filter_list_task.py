@@ -1,5 +1,7 @@
 import pytest
 from playwright.sync_api import Page
+from browsergym.workarena.api.references import ReferenceResolver
+from browsergym.workarena.tasks import list as list_tasks
 from browsergym.workarena.tasks.list import FilterIncidentListTask
 
 
@@ -79,3 +81,91 @@ def test_invalid_filter_list_task(page: Page, query, expected_message):
     task.teardown()
     print(info["message"])
     assert done is False and reward == 0.0 and expected_message in info["message"]
+
+
+@pytest.mark.parametrize(
+    "query, filter_kind, expected_message",
+    [
+        ("assigned_toISEMPTY^description=Description", "AND", "Correct filter"),
+        ("description= Description^assigned_to=^", "AND", "Correct filter"),
+        ("assigned_toEMPTYSTRING^ORdescription=Description", "OR", "Correct filter"),
+        ("assigned_toEMPTYSTRING^NQdescription=Description", "OR", "Correct filter"),
+        ("assigned_toISEMPTY^description=Description", "OR", "kind of filter used is incorrect"),
+        ("assigned_toISEMPTY^description=x^ORdescription=Description", "OR", "kind of filter"),
+        ("", "AND", "There are no filters yet"),
+        ("assignment_groupEMPTYSTRING", "AND", "Incorrect number of filter conditions"),
+        ("assigned_toISEMPTY^descriptionSTARTSWITHD", "AND", "Unexpected operator"),
+        ("assigned_toISEMPTY^description~D", "AND", "Unexpected operator"),
+        ("assigned_toEMPTYSTRING^short_description=Description", "AND", "Incorrect filter columns"),
+        ("assigned_toISEMPTY^description=My Description", "AND", "Incorrect filter values"),
+    ],
+)
+def test_validate_filter_list_query(monkeypatch, query, filter_kind, expected_message):
+    """
+    Validate filters without a live instance, by providing the query of the list directly
+
+    """
+    monkeypatch.setattr(list_tasks, "check_url_suffix_match", lambda *args, **kwargs: True)
+    task = FilterIncidentListTask.__new__(FilterIncidentListTask)
+    task.start_url = ""
+    task.filter_columns = ["assigned_to", "description"]
+    task.filter_values = ["", "Description"]
+    task.filter_kind = filter_kind
+    task.filter_len = 2
+    task.list_info = {
+        "columns": {
+            "assigned_to": {"type": "reference"},
+            "description": {"type": "string"},
+            "short_description": {"type": "string"},
+        }
+    }
+    # No reference needs to be resolved, since the reference column is filtered on an empty value
+    task.reference_resolver = ReferenceResolver(instance=None)
+    task._wait_for_ready = lambda page: None
+    task._extract_list_info = lambda page: {"query": query}
+
+    reward, done, _, info = task.validate(page=None, chat_messages=[])
+    assert expected_message in info["message"]
+    assert (reward, done) == ((1, True) if expected_message == "Correct filter" else (0, False))
+
+
+@pytest.mark.parametrize(
+    "data, expected_message",
+    [
+        ([{"assigned_to": "Beth Anglin", "description": "Description"}], "Correct filter"),
+        ([{"assigned_to": "beth anglin", "description": "Description"}], "Correct filter"),
+        ([{"assigned_to": "Fred Luddy", "description": "Description"}], "Incorrect filter values"),
+    ],
+)
+def test_validate_filter_list_records(monkeypatch, data, expected_message):
+    """
+    AND filters on referenced records are validated on the records of the list, without resolving the references
+
+    """
+    monkeypatch.setattr(list_tasks, "check_url_suffix_match", lambda *args, **kwargs: True)
+    task = FilterIncidentListTask.__new__(FilterIncidentListTask)
+    task.start_url = ""
+    task.filter_columns = ["assigned_to", "description"]
+    task.filter_values = ["Beth Anglin", "Description"]
+    task.filter_kind = "AND"
+    task.filter_len = 2
+    task.list_info = {
+        "columns": {
+            "assigned_to": {
+                "type": "reference",
+                "reference": "sys_user",
+                "reference_attributes": {"display_field": "name"},
+            },
+            "description": {"type": "string"},
+        }
+    }
+    task.reference_resolver = None
+    task._wait_for_ready = lambda page: None
+    task._extract_list_info = lambda page: {
+        "query": "assigned_to=46d44a23a9fe19810012d100cca80666^description=Description"
+    }
+    task._load_list_data = lambda list_info: data
+
+    reward, done, _, info = task.validate(page=None, chat_messages=[])
+    assert expected_message in info["message"]
+    assert (reward, done) == ((1, True) if expected_message == "Correct filter" else (0, False))
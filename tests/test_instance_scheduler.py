@@ -0,0 +1,122 @@
+"""
+Tests for the load-aware scheduler of the instance pool
+
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from browsergym.workarena import instance as instance_module
+from browsergym.workarena.instance import SNowInstance
+from browsergym.workarena.instance_scheduler import InstanceScheduler
+
+INSTANCES = [{"url": f"https://pool-{i}.service-now.com", "password": "pwd"} for i in range(3)]
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return InstanceScheduler(max_concurrency=2, state_dir=str(tmp_path))
+
+
+def test_least_loaded_routing(scheduler):
+    # Episodes are spread over the instances, then limited by the concurrency cap
+    leases = [scheduler.lease(INSTANCES, timeout=0) for _ in range(6)]
+    assert sorted(load["in_flight"] for load in scheduler.load().values()) == [2, 2, 2]
+    with pytest.raises(RuntimeError):
+        scheduler.lease(INSTANCES, timeout=0)
+
+    # A freed instance gets the next episode
+    lease_id, entry = leases[0]
+    scheduler.release(lease_id)
+    scheduler.release(lease_id)
+    assert scheduler.lease(INSTANCES, timeout=0)[1] == entry
+
+
+def test_latency_and_health(scheduler):
+    scheduler.report(INSTANCES[0]["url"], latency=2.0)
+    scheduler.report(INSTANCES[1]["url"], latency=0.5)
+    scheduler.report(INSTANCES[2]["url"], healthy=False)
+    assert scheduler.load()[INSTANCES[2]["url"]]["healthy"] is False
+
+    # The fastest healthy instance is preferred when loads are equal, unhealthy ones come last
+    routed = [scheduler.lease(INSTANCES, timeout=0)[1]["url"] for _ in range(6)]
+    assert routed[:4] == [INSTANCES[1]["url"], INSTANCES[0]["url"]] * 2
+    assert routed[4:] == [INSTANCES[2]["url"]] * 2
+
+    # The latency is a moving average
+    scheduler.report(INSTANCES[1]["url"], latency=1.5)
+    assert scheduler.load()[INSTANCES[1]["url"]]["latency"] == pytest.approx(0.8)
+
+
+def test_leases_are_shared_by_processes(scheduler):
+    # Leases of a live process are kept, those of dead processes are reclaimed
+    script = (
+        "import sys\n"
+        "from browsergym.workarena.instance_scheduler import InstanceScheduler\n"
+        "InstanceScheduler(max_concurrency=2, state_dir=sys.argv[1]).lease(\n"
+        f"    {INSTANCES[:1]!r}, timeout=0\n"
+        ")\n"
+        "print('leased', flush=True)\n"
+        "sys.stdin.read()\n"
+    )
+    state_dir = os.path.dirname(scheduler.state_path)
+    worker = subprocess.Popen(
+        [sys.executable, "-c", script, state_dir],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert worker.stdout.readline().strip() == "leased"
+        assert scheduler.load()[INSTANCES[0]["url"]]["in_flight"] == 1
+    finally:
+        worker.communicate("")
+    assert scheduler.load()[INSTANCES[0]["url"]]["in_flight"] == 0
+
+
+def test_instance_leases_from_pool(scheduler, monkeypatch):
+    monkeypatch.delenv("SNOW_INSTANCE_URL", raising=False)
+    monkeypatch.setattr(instance_module, "fetch_instances", lambda: INSTANCES)
+    monkeypatch.setattr("browsergym.workarena.instance_scheduler._SCHEDULER", scheduler)
+
+    # The scheduler is opt-in: instances are picked at random without a lease by default
+    monkeypatch.setattr(SNowInstance, "check_status", lambda self: None)
+    assert SNowInstance().lease_id is None
+    assert scheduler.load() == {}
+    monkeypatch.setattr(instance_module, "SNOW_INSTANCE_SCHEDULER_ENABLED", True)
+
+    # Instances that fail their status check are avoided
+    def check_status(self):
+        if self.snow_url == INSTANCES[0]["url"]:
+            raise RuntimeError("ServiceNow instance is hibernating.")
+
+    monkeypatch.setattr(SNowInstance, "check_status", check_status)
+    instances = [SNowInstance() for _ in range(4)]
+    assert INSTANCES[0]["url"] not in [instance.snow_url for instance in instances]
+    assert not scheduler.load()[INSTANCES[0]["url"]]["healthy"]
+    assert sum(load["in_flight"] for load in scheduler.load().values()) == 4
+
+    instances[0].release()
+    instances[0].release()
+    del instances[1]
+    assert sum(load["in_flight"] for load in scheduler.load().values()) == 2
+
+    # Released instances don't release their lease again once garbage collected
+    releases = []
+    monkeypatch.setattr(scheduler, "release", releases.append)
+    del instances[0]
+    assert releases == []
+
+    # Leases are released whatever the error raised by the status check
+    monkeypatch.undo()
+    monkeypatch.delenv("SNOW_INSTANCE_URL", raising=False)
+    monkeypatch.setattr(instance_module, "fetch_instances", lambda: INSTANCES[1:])
+    monkeypatch.setattr(instance_module, "SNOW_INSTANCE_SCHEDULER_ENABLED", True)
+    monkeypatch.setattr("browsergym.workarena.instance_scheduler._SCHEDULER", scheduler)
+    monkeypatch.setattr(SNowInstance, "check_status", lambda self: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        SNowInstance()
+    assert sum(load["in_flight"] for load in scheduler.load().values()) == 2
@@ -0,0 +1,140 @@
+"""
+Tests for the cached knowledge base integrity check (run against a local stand-in of the REST API)
+
+"""
+
+import json
+import pytest
+
+from browsergym.workarena import install
+from browsergym.workarena.config_store import get_configs
+from browsergym.workarena.instance import SNowInstance, close_http_sessions
+
+from snow_stand_in import SNowStandIn
+
+
+KB_DATA = [{"article": f"<p>Article &amp; text {i}</p>"} for i in range(3)]
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    monkeypatch.setattr(SNowInstance, "check_status", lambda self: None)
+    monkeypatch.setattr(install, "_KB_VERDICTS", {})
+    with SNowStandIn(
+        tables={
+            "kb_knowledge_base": [
+                {"title": "Test KB", **{setting: "true" for setting in install._KB_SETTINGS}}
+            ]
+        }
+    ) as stand_in:
+        kb_id = next(iter(stand_in.tables["kb_knowledge_base"]))
+        for i, entry in enumerate(KB_DATA):
+            stand_in._insert(
+                "kb_knowledge",
+                {
+                    "kb_knowledge_base": kb_id,
+                    "short_description": f"Article {i + 1}",
+                    "text": entry["article"],
+                    "sys_updated_on": "2024-01-01 00:00:00",
+                },
+            )
+        stand_in.instance = SNowInstance(snow_url=stand_in.url, snow_credentials=("admin", "admin"))
+        yield stand_in
+    close_http_sessions()
+
+
+@pytest.fixture
+def full_checks(monkeypatch):
+    calls = []
+    check_knowledge_base = install.check_knowledge_base
+
+    def _check_knowledge_base(**kwargs):
+        calls.append(kwargs["kb_name"])
+        return check_knowledge_base(**kwargs)
+
+    monkeypatch.setattr(install, "check_knowledge_base", _check_knowledge_base)
+    return calls
+
+
+def test_verdict_is_cached_and_revalidated(stand_in, full_checks, monkeypatch):
+    instance = stand_in.instance
+    kb_id = next(iter(stand_in.tables["kb_knowledge_base"]))
+
+    assert install.check_knowledge_base_cached(instance, "Test KB", KB_DATA) == (
+        kb_id,
+        False,
+        False,
+    )
+    assert full_checks == ["Test KB"]
+
+    # Within the TTL, the verdict is reused without contacting the instance
+    n_calls = len(stand_in.calls)
+    assert install.check_knowledge_base_cached(instance, "Test KB", KB_DATA) == (
+        kb_id,
+        False,
+        False,
+    )
+    assert len(stand_in.calls) == n_calls
+
+    # After the TTL, the verdict is revalidated without a full check nor downloading the articles
+    monkeypatch.setattr(install, "SNOW_KB_INTEGRITY_TTL", 0)
+    n_calls = len(stand_in.calls)
+    assert install.check_knowledge_base_cached(instance, "Test KB", KB_DATA) == (
+        kb_id,
+        False,
+        False,
+    )
+    assert full_checks == ["Test KB"]
+    assert ("GET", "/api/now/table/kb_knowledge") not in stand_in.calls[n_calls:]
+
+    # Modifying an article triggers a full check
+    article = next(iter(stand_in.tables["kb_knowledge"].values()))
+    article.update({"text": "corrupted", "sys_updated_on": "2024-01-02 00:00:00"})
+    assert install.check_knowledge_base_cached(instance, "Test KB", KB_DATA) == (kb_id, True, True)
+    assert full_checks == ["Test KB"] * 2
+
+    # A different content is never trusted based on the verdict for another content
+    article["text"] = KB_DATA[int(article["short_description"].split(" ")[1]) - 1]["article"]
+    assert install.check_knowledge_base_cached(instance, "Test KB", KB_DATA[:2])[1:] == (True, True)
+
+
+def test_recorded_verdict(stand_in, full_checks):
+    instance = stand_in.instance
+    install.record_knowledge_base_integrity(instance, "Test KB", KB_DATA)
+
+    # The verdict recorded at install time is trusted after a cheap revalidation
+    assert install.check_knowledge_base_cached(instance, "Test KB", KB_DATA)[1:] == (False, False)
+    assert full_checks == []
+
+    # Articles were added since the verdict was recorded
+    kb_id = next(iter(stand_in.tables["kb_knowledge_base"]))
+    stand_in._insert("kb_knowledge", {"kb_knowledge_base": kb_id, "sys_updated_on": ""})
+    install._KB_VERDICTS.clear()
+    assert install.check_knowledge_base_cached(instance, "Test KB", KB_DATA)[1:] == (True, True)
+    assert full_checks == ["Test KB"]
+
+
+def test_verdict_without_fingerprint_is_not_cached(stand_in, full_checks, monkeypatch):
+    # E.g., the knowledge base can't be summarized, but the full check passes
+    monkeypatch.setattr(install, "_get_knowledge_base_fingerprint", lambda instance, kb_name: None)
+    monkeypatch.setattr(
+        install, "check_knowledge_base", lambda **kwargs: (full_checks.append(1), False, False)
+    )
+    for _ in range(2):
+        assert install.check_knowledge_base_cached(stand_in.instance, "Test KB", KB_DATA)[1:] == (
+            False,
+            False,
+        )
+    assert full_checks == [1, 1]
+
+
+def test_content_hash_of_loaded_configs(tmp_path, monkeypatch):
+    path = tmp_path / "kb.json"
+    path.write_text(json.dumps(KB_DATA))
+    kb_data = get_configs(str(path))
+    content_hash = install._get_knowledge_base_content_hash(KB_DATA)
+    assert install._get_knowledge_base_content_hash(kb_data) == content_hash
+
+    # The hash of a loaded config is computed once
+    monkeypatch.setattr(install.hashlib, "sha256", None)
+    assert install._get_knowledge_base_content_hash(kb_data) == content_hash
@@ -0,0 +1,67 @@
+"""
+Tests for the reference resolver (run against a local stand-in of the REST API)
+
+"""
+
+import pytest
+
+from browsergym.workarena.api.references import ReferenceResolver, clear_reference_cache
+from browsergym.workarena.instance import SNowInstance
+
+from snow_stand_in import SNowStandIn
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    monkeypatch.setattr(SNowInstance, "check_status", lambda self: None)
+    clear_reference_cache()
+    users = [{"name": f"User {i}", "user_name": f"user.{i}"} for i in range(5)]
+    with SNowStandIn(tables={"sys_user": users}) as stand_in:
+        yield stand_in
+    clear_reference_cache()
+
+
+def test_resolve_batches_and_memoizes(stand_in):
+    instance = SNowInstance(snow_url=stand_in.url, snow_credentials=("admin", "admin"))
+    sys_ids = list(stand_in.tables["sys_user"])
+    expected = {sys_id: stand_in.tables["sys_user"][sys_id]["name"] for sys_id in sys_ids}
+
+    resolver = ReferenceResolver(instance)
+    # Duplicates and unknown sys_ids are fetched once, in a single query
+    assert resolver.resolve("sys_user", "name", sys_ids[:3] + sys_ids[:1] + ["missing"]) == {
+        **{sys_id: expected[sys_id] for sys_id in sys_ids[:3]},
+        "missing": None,
+    }
+    assert len(stand_in.calls) == 1
+
+    # Only the unresolved sys_ids are fetched
+    assert resolver.resolve("sys_user", "name", sys_ids) == expected
+    assert len(stand_in.calls) == 2
+    assert resolver.resolve("sys_user", "name", sys_ids) == expected
+    assert len(stand_in.calls) == 2
+
+    # Other resolvers of the process reuse the resolved references, unless asked not to
+    assert ReferenceResolver(instance).resolve("sys_user", "name", sys_ids) == expected
+    assert len(stand_in.calls) == 2
+    assert (
+        ReferenceResolver(instance, use_shared_cache=False).resolve("sys_user", "name", sys_ids)
+        == expected
+    )
+    assert len(stand_in.calls) == 3
+
+
+def test_resolve_many(stand_in):
+    instance = SNowInstance(snow_url=stand_in.url, snow_credentials=("admin", "admin"))
+    sys_ids = list(stand_in.tables["sys_user"])
+
+    resolved = ReferenceResolver(instance).resolve_many(
+        {("sys_user", "name"): sys_ids[:2], ("sys_user", "user_name"): sys_ids[2:]},
+        display_value=False,
+    )
+    assert resolved == {
+        ("sys_user", "name"): {s: stand_in.tables["sys_user"][s]["name"] for s in sys_ids[:2]},
+        ("sys_user", "user_name"): {
+            s: stand_in.tables["sys_user"][s]["user_name"] for s in sys_ids[2:]
+        },
+    }
+    assert len(stand_in.calls) == 2
@@ -0,0 +1,98 @@
+"""
+Tests for the cache of authenticated sessions (with a stand-in for the pages and their contexts)
+
+"""
+
+import pytest
+
+from browsergym.workarena import session_cache
+from browsergym.workarena.instance import SNowInstance
+from browsergym.workarena.session_cache import SessionCache, login_with_cache
+
+
+class ContextStandIn:
+    def __init__(self) -> None:
+        self.jar = []
+
+    def add_cookies(self, cookies: list) -> None:
+        self.jar.extend(cookies)
+
+    def clear_cookies(self) -> None:
+        self.jar = []
+
+    def cookies(self, url: str) -> list:
+        return list(self.jar)
+
+
+class PageStandIn:
+    def __init__(self) -> None:
+        self.context = ContextStandIn()
+        self.token = None
+
+    def evaluate(self, expression: str):
+        return self.token
+
+
+@pytest.fixture
+def valid_sessions(monkeypatch):
+    monkeypatch.setattr(SNowInstance, "check_status", lambda self: None)
+    # The sessions (cookie values) that the instance still considers valid
+    valid = set()
+    monkeypatch.setattr(
+        session_cache,
+        "session_is_valid",
+        lambda page, instance, token: any(c["value"] in valid for c in page.context.jar),
+    )
+    return valid
+
+
+def test_login_with_cache(valid_sessions):
+    cache = SessionCache(size=2)
+    logins = []
+
+    def login(instance, page):
+        session = f"{instance.snow_credentials[0]}-{len(logins)}"
+        page.context.add_cookies([{"name": "JSESSIONID", "value": session}])
+        page.token = "token"
+        valid_sessions.add(session)
+        logins.append(session)
+
+    admin, beth, fred = (
+        SNowInstance(snow_url="https://x.service-now.com", snow_credentials=(user, "pwd"))
+        for user in ["admin", "beth", "fred"]
+    )
+
+    assert not login_with_cache(admin, PageStandIn(), login=login, cache=cache)
+    page = PageStandIn()
+    assert login_with_cache(admin, page, login=login, cache=cache)
+    assert page.context.jar == [{"name": "JSESSIONID", "value": "admin-0"}]
+    assert cache.stats == {"hits": 1, "invalid": 0, "stores": 1}
+
+    # Sessions that are no longer valid (e.g., expired or impersonating) are replaced by a new login
+    valid_sessions.clear()
+    page = PageStandIn()
+    assert not login_with_cache(admin, page, login=login, cache=cache)
+    assert page.context.jar == [{"name": "JSESSIONID", "value": "admin-1"}]
+    assert cache.stats == {"hits": 1, "invalid": 1, "stores": 2}
+
+    # The least recently used sessions are dropped
+    for instance in [beth, fred]:
+        login_with_cache(instance, PageStandIn(), login=login, cache=cache)
+    assert not login_with_cache(admin, PageStandIn(), login=login, cache=cache)
+    assert logins == ["admin-0", "admin-1", "beth-2", "fred-3", "admin-4"]
+
+    # Sessions expire, and can be forgotten
+    cache.forget(fred)
+    assert not login_with_cache(fred, PageStandIn(), login=login, cache=cache)
+    cache.ttl = 0
+    assert not login_with_cache(fred, PageStandIn(), login=login, cache=cache)
+    assert len(logins) == 7
+
+
+def test_sessions_without_token_are_not_cached(valid_sessions):
+    cache = SessionCache()
+    instance = SNowInstance(snow_url="https://x.service-now.com", snow_credentials=("a", "pwd"))
+    login = lambda instance, page: None
+    assert not login_with_cache(instance, PageStandIn(), login=login, cache=cache)
+    assert not login_with_cache(instance, PageStandIn(), login=login, cache=cache)
+    assert cache.stats["stores"] == 0
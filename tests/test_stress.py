@@ -0,0 +1,33 @@
+"""
+Tests for the comparison of the execution profiles (the stress test itself requires an instance)
+
+"""
+
+import pytest
+
+from browsergym.workarena.stress import compare_profiles, fisher_exact_less
+
+
+def test_fisher_exact_less():
+    # All of the reference episodes succeed, but only half of the others
+    assert fisher_exact_less(5, 10, 10, 10) == pytest.approx(3003 / 184756)
+    assert fisher_exact_less(10, 10, 10, 10) == pytest.approx(1.0)
+    assert fisher_exact_less(0, 1, 1, 1) == pytest.approx(0.5)
+
+
+def test_compare_profiles():
+    episodes = [
+        {"task": task, "profile": profile, "error": None if success else "failed"}
+        for task, profile, successes in [
+            ("a", "default", 20),
+            ("a", "fast", 19),
+            ("b", "default", 20),
+            ("b", "fast", 10),
+        ]
+        for success in [True] * successes + [False] * (20 - successes)
+    ]
+    rows = {row["task"]: row for row in compare_profiles(episodes)}
+    assert rows["a"]["profiles"]["fast"] == {"n": 20, "successes": 19, "success_rate": 0.95}
+    assert rows["a"]["regressions"] == [] and rows["a"]["p_values"]["fast"] > 0.05
+    assert rows["b"]["regressions"] == ["fast"]
+    assert "default" not in rows["b"]["p_values"]
@@ -0,0 +1,83 @@
+"""
+Tests for the table metadata cache, using a local stand-in for the ServiceNow REST API
+
+"""
+
+import pytest
+
+from browsergym.workarena.api import table_metadata
+from browsergym.workarena.api.table_metadata import (
+    TableMetadataCache,
+    invalidate_table_metadata,
+)
+from browsergym.workarena.api.utils import table_column_info
+from browsergym.workarena.instance import SNowInstance, close_http_sessions
+
+from snow_stand_in import SNowStandIn
+
+
+@pytest.fixture
+def stand_in(monkeypatch, tmp_path):
+    monkeypatch.setattr(SNowInstance, "check_status", lambda self: None)
+    monkeypatch.setattr(table_metadata, "_CACHE", TableMetadataCache(cache_dir=str(tmp_path)))
+    with SNowStandIn(
+        tables={
+            "sys_properties": [{"name": "workarena.installation.date", "value": "2024-01-01"}],
+            "sys_dictionary": [
+                {"name": "incident", "element": "caller_id", "dependent_on_field": ""},
+            ],
+        },
+        ui_meta={
+            "incident": {
+                "caller_id": {"label": "Caller", "type": "reference"},
+                "state": {"label": "State", "choices": [{"value": "1", "label": "New"}]},
+            }
+        },
+    ) as stand_in:
+        stand_in.instance = SNowInstance(snow_url=stand_in.url, snow_credentials=("admin", "admin"))
+        yield stand_in
+        invalidate_table_metadata()
+    close_http_sessions()
+
+
+def test_table_column_info_is_cached(stand_in):
+    info = table_column_info(stand_in.instance, "incident")
+    assert info["state"]["choices"] == {"1": "New"}
+    assert info["caller_id"]["dependent_on_field"] == ""
+
+    # Callers can modify the returned information without corrupting the cache
+    info["state"]["label"] = "Modified"
+
+    assert table_column_info(stand_in.instance, "incident")["state"]["label"] == "State"
+    assert stand_in.calls.count(("GET", "/api/now/ui/meta/incident")) == 1
+
+    # Invalidation forces the metadata to be fetched again
+    invalidate_table_metadata(stand_in.instance, table="incident")
+    table_column_info(stand_in.instance, "incident")
+    assert stand_in.calls.count(("GET", "/api/now/ui/meta/incident")) == 2
+
+
+def test_disk_tier_and_ttl(tmp_path):
+    key = ("https://example.service-now.com", "incident", "2024-01-01")
+    TableMetadataCache(cache_dir=str(tmp_path)).set(key, {"state": {"label": "State"}})
+
+    # Another process (i.e., a new cache using the same directory) reads the on-disk entry
+    assert TableMetadataCache(cache_dir=str(tmp_path)).get(key) == {"state": {"label": "State"}}
+    # ... unless it has expired
+    assert TableMetadataCache(cache_dir=str(tmp_path), ttl=-1).get(key) is None
+    # ... or the release of the instance changed
+    assert TableMetadataCache(cache_dir=str(tmp_path)).get(key[:2] + ("2025-01-01",)) is None
+
+    TableMetadataCache(cache_dir=str(tmp_path)).invalidate(snow_url=key[0])
+    assert TableMetadataCache(cache_dir=str(tmp_path)).get(key) is None
+
+
+def test_memory_tier_is_lru():
+    cache = TableMetadataCache(max_size=2, cache_dir=None)
+    for table in ["a", "b"]:
+        cache.set(("url", table, "release"), {})
+    cache.get(("url", "a", "release"))
+    cache.set(("url", "c", "release"), {})
+    # "b" is the least recently used entry
+    assert cache.get(("url", "b", "release")) is None
+    assert cache.get(("url", "a", "release")) == {}
@@ -0,0 +1,91 @@
+"""
+Tests for the user pool (run against a local stand-in of the REST API)
+
+"""
+
+import json
+import numpy as np
+import pytest
+
+from browsergym.workarena.api.user_pool import UserPool
+from browsergym.workarena.instance import SNowInstance, close_http_sessions
+
+from snow_stand_in import SNowStandIn
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    monkeypatch.setattr(SNowInstance, "check_status", lambda self: None)
+    with SNowStandIn(
+        tables={
+            "sys_user_role": [{"name": "admin"}],
+            "m2m_theme_style": [
+                {"theme.name": "WorkArena", "style.type": "variant", "style.sys_id": str(i)}
+                for i in range(5)
+            ],
+        }
+    ) as stand_in:
+        stand_in.instance = SNowInstance(snow_url=stand_in.url, snow_credentials=("admin", "admin"))
+        yield stand_in
+    close_http_sessions()
+
+
+def _preferences(stand_in, user_sys_id):
+    return [
+        p
+        for p in stand_in.tables.get("sys_user_preference", {}).values()
+        if p["user"] == user_sys_id
+    ]
+
+
+def test_lease_and_release(stand_in, tmp_path):
+    pool = UserPool(stand_in.instance, size=2, state_dir=str(tmp_path))
+    pool.fill(background=False)
+    assert len(stand_in.tables["sys_user"]) == 2
+    # Pooled users have no preferences until they are leased
+    assert stand_in.tables["sys_user_preference"] == {}
+
+    random, expected_random = np.random.RandomState(0), np.random.RandomState(0)
+    user_name, _, sys_id = pool.lease(random=random)
+    pool.fill().join()
+    # The pool reused a user and refilled itself in the background
+    assert stand_in.tables["sys_user"][sys_id]["user_name"] == user_name
+    assert len(stand_in.tables["sys_user"]) == 3
+
+    # The lease draws the same random numbers as create_user
+    expected_random.randint(1000, 9999)
+    theme = expected_random.choice(list(stand_in.tables["m2m_theme_style"].values()))
+    assert [p["value"] for p in _preferences(stand_in, sys_id)] == [theme["style.sys_id"]]
+    assert random.randint(1000, 9999) == expected_random.randint(1000, 9999)
+
+    # Other processes share the state of the pool
+    other_pool = UserPool(stand_in.instance, size=2, state_dir=str(tmp_path))
+    assert other_pool.lease()[2] != sys_id
+    other_pool.fill().join()
+
+    pool.release(sys_id)
+    assert _preferences(stand_in, sys_id) == []
+    with open(pool.state_path) as f:
+        assert json.load(f)["users"][sys_id]["lease"] is None
+
+
+def test_reclaim_leaked_users(stand_in, tmp_path):
+    pool = UserPool(stand_in.instance, size=1, state_dir=str(tmp_path))
+    pool.fill(background=False)
+    _, _, sys_id = pool.lease()
+    pool.fill().join()
+
+    # Simulate a crash of the process holding the lease
+    with pool._state() as state:
+        state["users"][sys_id]["lease"]["pid"] = 2**22 + 1
+    assert pool.reclaim() == [sys_id]
+    assert sys_id not in stand_in.tables["sys_user"]
+
+    # The leases of live processes of this host never expire, those of other hosts do
+    _, _, sys_id = pool.lease()
+    pool.fill().join()
+    pool.lease_ttl = 0
+    assert pool.reclaim() == []
+    with pool._state() as state:
+        state["users"][sys_id]["lease"]["host"] = "other-host"
+    assert pool.reclaim() == [sys_id]
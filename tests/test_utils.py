@@ -1,11 +1,20 @@
+import pathlib
 import pytest
 
 # bugfix: use same playwright instance in browsergym and pytest
 from utils import setup_playwright
 
+import playwright.sync_api
+
 from playwright.sync_api import Page
 
+from browsergym.workarena.config import SNOW_JS_UTILS_FILEPATH
 from browsergym.workarena.instance import SNowInstance
+from browsergym.workarena.tasks.utils.utils import (
+    await_ready,
+    get_list_state,
+    wait_for_requests_settled,
+)
 from browsergym.workarena.utils import ui_login, url_login
 
 
@@ -30,3 +39,202 @@ def test_login_wrong_credentials(login_func, page: Page):
     instance = SNowInstance(snow_credentials=("wrong", "wrong"))
     with pytest.raises(RuntimeError):
         login_func(instance=instance, page=page)
+
+
+# A list page with a minimal stand-in for the Glide list API
+LIST_PAGE = """
+<table class="data_list_table" data-list_id="incident">
+    <thead id="hdr_incident"><tr><th></th><th name="number"></th><th name="priority"></th></tr></thead>
+    <tbody class="list2_body">
+        <tr record_class="incident" sys_id="a"><td></td><td>INC1</td><td>1 - Critical</td></tr>
+        <tr record_class="incident" sys_id="b"><td></td><td>INC2</td><td>2 - High</td></tr>
+    </tbody>
+</table>
+<script>
+    window.GlideList2 = {
+        get: (id) => ({
+            getTitle: () => "Incidents",
+            getTableName: () => id,
+            getQuery: () => "active=true",
+            getOrderBy: () => "number",
+            sortDir: "DESC",
+            fields: "number,priority",
+            grandTotalRows: 2,
+        }),
+    };
+</script>
+"""
+
+
+def test_get_list_state(page: Page):
+    """
+    Test reading the state of a list in a single call
+
+    """
+    page.set_content(LIST_PAGE)
+    page.add_script_tag(path=SNOW_JS_UTILS_FILEPATH)
+    state = get_list_state(page)
+    assert state["list_id"] == "incident" and state["list_count"] == 1
+    assert not state["in_gsft_main"]
+    assert (state["title"], state["table"], state["query"], state["fields"]) == (
+        "Incidents",
+        "incident",
+        "active=true",
+        "number,priority",
+    )
+    assert (state["order_by"], state["sort_dir"], state["row_count"]) == ("number", "DESC", 2)
+    assert "rows" not in state
+
+    assert get_list_state(page, with_rows=True)["rows"] == [
+        {"sys_id": "a", "number": "INC1", "priority": "1 - Critical"},
+        {"sys_id": "b", "number": "INC2", "priority": "2 - High"},
+    ]
+
+
+# A form page with a minimal stand-in for the Glide form API
+FORM_PAGE = """
+<div id="section-main">
+    <input id="short_description">
+    <input id="sys_display" class="incident caller_id" data-dependent="company">
+</div>
+<script>
+    window.g_form = {
+        elements: [{fieldName: "short_description", type: "string", mandatory: true}],
+        getEditableFields: () => ["short_description"],
+        getLabelOf: (name) => name.replace("_", " "),
+        getGlideUIElement: (name) => name,
+        getControl: (name) => document.getElementById(name),
+        getElement: (name) => document.getElementById(name),
+        isVisible: (element, control) => control.offsetParent !== null,
+        isMandatory: (name) => name === "short_description",
+    };
+</script>
+"""
+
+
+def test_get_form_state(page: Page):
+    """
+    Test reading the state of a form in a single call
+
+    """
+    page.set_content(FORM_PAGE)
+    page.add_script_tag(path=SNOW_JS_UTILS_FILEPATH)
+    # The Glide form API is only called for the elements of the form (isVisible throws for other fields)
+    state = page.evaluate("getFormState(window, 'incident', ['caller_id', 'not_rendered'])")
+    assert state["elements"][0]["fieldName"] == "short_description"
+    assert state["editable_fields"] == ["short_description"]
+    assert state["fields"]["short_description"] == {
+        "label": "short description",
+        "visible": True,
+        "mandatory": True,
+        "has_display": False,
+        "dependent_on_field": None,
+        "section": "section-main",
+    }
+    assert state["fields"]["caller_id"]["has_display"]
+    assert state["fields"]["caller_id"]["dependent_on_field"] == "company"
+    assert not state["fields"]["caller_id"]["visible"]
+    assert state["fields"]["not_rendered"]["has_display"] is False
+    assert state["fields"]["not_rendered"]["visible"] is False
+
+
+def test_await_ready(page: Page):
+    """
+    Test waiting for milestones signalled by the page
+
+    """
+    page.set_content("<p>Loading</p>")
+    page.add_script_tag(path=SNOW_JS_UTILS_FILEPATH)
+    page.evaluate(
+        """() => {
+            setTimeout(() => { window.g_form = {}; }, 100);
+            setTimeout(() => signalMilestone('load_complete'), 200);
+        }"""
+    )
+    await_ready(page, apis=["g_form"], frame=None, timeout=5000)
+    assert page.evaluate("window.WORKARENA_LOAD_COMPLETE")
+
+    # Milestones that are never reached time out
+    with pytest.raises(playwright.sync_api.TimeoutError):
+        await_ready(page, milestones=["highcharts_loaded"], frame=None, timeout=500)
+    # ... and the page stops waiting as well
+    assert page.evaluate("awaitReady(null, ['highcharts_loaded'], [], 100)") is False
+
+
+def test_wait_for_requests_settled(page: Page):
+    """
+    Test waiting for the requests made by the page scripts to settle
+
+    """
+    page.set_content("<p>Loading</p>")
+    # A stand-in for fetch whose requests take 300 ms, installed before the requests are tracked
+    page.evaluate(
+        "() => { window.fetch = () => new Promise((resolve) => setTimeout(resolve, 300)); }"
+    )
+    page.add_script_tag(path=SNOW_JS_UTILS_FILEPATH)
+
+    page.evaluate("() => { fetch('/api/now/table/incident'); fetch('/amb/connect'); }")
+    assert page.evaluate("WORKARENA_PENDING_REQUESTS.count") == 1  # Long polls are not tracked
+    assert not page.evaluate("requestsSettled(window, 0)")
+    wait_for_requests_settled(page, "the requests", frame=None, quiet_period=100, timeout=5000)
+    assert page.evaluate("WORKARENA_PENDING_REQUESTS.count") == 0
+
+    # Requests that never settle time out, with a message that names the awaited event
+    page.evaluate("() => { window.WORKARENA_PENDING_REQUESTS.count += 1; }")
+    with pytest.raises(playwright.sync_api.TimeoutError, match="the stuck request"):
+        wait_for_requests_settled(page, "the stuck request", frame=None, timeout=500)
+
+
+def test_shadow_dom_lookup_benchmark(page: Page):
+    """
+    Test (and benchmark) the lookup of elements in nested shadow DOMs
+
+    """
+    page.set_content((pathlib.Path(__file__).parent / "shadow_dom_benchmark.html").read_text())
+    page.add_script_tag(path=SNOW_JS_UTILS_FILEPATH)
+    results = page.evaluate("runShadowDOMBenchmark()")
+    assert results["n_shadow_roots"] == 4 + 4**2 + 4**3 + 4**4
+    assert results["found_all"] and results["same_results"]
+    assert results["mutations_detected"]
+    assert results["indexed_ms"] < results["naive_ms"]
+
+
+def test_shadow_dom_lookup_edge_cases(page: Page):
+    """
+    Test the lookup of elements in shadow DOMs from element roots, after removals and with pseudo-classes
+
+    """
+    page.set_content("<div id='outer'><div id='inner'></div></div><div id='other'></div>")
+    page.add_script_tag(path=SNOW_JS_UTILS_FILEPATH)
+    results = page.evaluate(
+        """() => {
+            const attach = (host, html) => { host.attachShadow({mode: 'open'}).innerHTML = html; };
+            attach(document.getElementById('inner'), "<input id='box' type='checkbox'>");
+            attach(document.getElementById('other'), "<span id='elsewhere'></span>");
+            const outer = document.getElementById('outer');
+            const results = {
+                // Element roots search the shadow roots under them only
+                under_element: findElementInShadowDOM('#box', outer) !== null,
+                outside_element: findElementInShadowDOM('#elsewhere', outer) === null,
+            };
+
+            // State-dependent selectors are not cached (checking a box doesn't mutate the DOM)
+            results.unchecked = findElementInShadowDOM('#box:checked') === null;
+            findElementInShadowDOM('#box').checked = true;
+            results.checked = findElementInShadowDOM('#box:checked') !== null;
+
+            // Removed shadow roots are forgotten
+            document.getElementById('other').remove();
+            results.removed = findElementInShadowDOM('#elsewhere') === null;
+            results.n_roots = WORKARENA_SHADOW_DOM.roots.size;
+            return results;
+        }"""
+    )
+    assert results == {
+        "under_element": True,
+        "outside_element": True,
+        "unchecked": True,
+        "checked": True,
+        "removed": True,
+        "n_roots": 1,
+    }